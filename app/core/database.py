@@ -1,48 +1,150 @@
-from sqlalchemy import create_engine
+import threading
+from typing import AsyncIterator
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 from app.core.config import settings
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-)
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-Base = declarative_base()
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
-
-
-
-
-
-
-
-
-
-
+IS_SQLITE = "sqlite" in settings.DATABASE_URL
 
 
+def engine_options(url: str = settings.DATABASE_URL) -> dict:
+    """إعدادات connection pool من Settings (قاعدة SQLite في الذاكرة لا تستخدم QueuePool)"""
+    is_sqlite = "sqlite" in url
+    options = {
+        "connect_args": {"check_same_thread": False} if is_sqlite else {},
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+    if is_sqlite and ":memory:" in url:
+        return options
+    options.update(
+        poolclass=QueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    )
+    return options
 
 
+engine = create_engine(settings.DATABASE_URL, **engine_options())
 
 
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """PRAGMAs لكل اتصال SQLite جديد (WAL + انتظار القفل + ذاكرة الصفحات)"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+        if settings.SQLITE_JOURNAL_MODE:
+            cursor.execute(f"PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}")
+        if settings.SQLITE_SYNCHRONOUS:
+            cursor.execute(f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}")
+        # القيمة السالبة تعني KiB بدلاً من عدد الصفحات
+        cursor.execute(f"PRAGMA cache_size = -{abs(int(settings.SQLITE_CACHE_SIZE_KB))}")
+    finally:
+        cursor.close()
 
 
+if IS_SQLITE:
+    event.listen(engine, "connect", set_sqlite_pragmas)
 
 
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+Base = declarative_base()
 
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
 
 
+# ========== المحرك غير المتزامن (AsyncEngine / AsyncSession) ==========
+# للمسارات async التي لا تمر عبر threadpool. يُنشأ عند أول استخدام حتى لا يكون
+# aiosqlite / asyncpg مطلوباً لتشغيل بقية التطبيق.
+
+_async_engine = None
+_AsyncSessionLocal = None
+_async_lock = threading.Lock()
+
+
+def get_async_database_url() -> str:
+    """ASYNC_DATABASE_URL أو اشتقاقه من DATABASE_URL (sqlite -> aiosqlite, postgresql -> asyncpg)"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    url = settings.DATABASE_URL
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith("postgresql+psycopg2:"):
+        return url.replace("postgresql+psycopg2:", "postgresql+asyncpg:", 1)
+    if url.startswith("postgresql:"):
+        return url.replace("postgresql:", "postgresql+asyncpg:", 1)
+    return url
+
+
+def get_async_engine():
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        with _async_lock:
+            if _async_engine is None:
+                options = engine_options()
+                # AsyncEngine يختار AsyncAdaptedQueuePool بنفسه
+                options.pop("poolclass", None)
+                new_engine = create_async_engine(get_async_database_url(), **options)
+                if IS_SQLITE:
+                    event.listen(new_engine.sync_engine, "connect", set_sqlite_pragmas)
+                _AsyncSessionLocal = async_sessionmaker(
+                    new_engine, autoflush=False, expire_on_commit=False
+                )
+                _async_engine = new_engine
+    return _async_engine
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    get_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
 
 
+async def dispose_async_engine():
+    """إغلاق اتصالات المحرك غير المتزامن عند إيقاف التطبيق"""
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _AsyncSessionLocal = None
+
+
+def get_pool_stats() -> dict:
+    """حالة connection pool لهذا الـworker (لتحديد عدد الـworkers وحجم pool)"""
+    pool = engine.pool
+    stats = {
+        "pool_class": type(pool).__name__,
+        "dialect": engine.dialect.name,
+        "status": pool.status(),
+    }
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=pool.overflow(),
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            timeout_seconds=settings.DB_POOL_TIMEOUT_SECONDS,
+            recycle_seconds=settings.DB_POOL_RECYCLE_SECONDS,
+        )
+    if _async_engine is not None:
+        stats["async_pool_status"] = _async_engine.pool.status()
+    if IS_SQLITE:
+        with engine.connect() as conn:
+            stats["sqlite"] = {
+                "journal_mode": conn.exec_driver_sql("PRAGMA journal_mode").scalar(),
+                "synchronous": conn.exec_driver_sql("PRAGMA synchronous").scalar(),
+                "busy_timeout_ms": conn.exec_driver_sql("PRAGMA busy_timeout").scalar(),
+                "cache_size": conn.exec_driver_sql("PRAGMA cache_size").scalar(),
+            }
+    return stats
@@ -1,62 +1,157 @@
+from dataclasses import dataclass
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import get_async_db, get_db
 from app.core.security import decode_access_token
 from app.features.user.model import User
 from app.models.enums import UserRole
 from datetime import datetime
+from typing import Optional
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
-) -> User:
-    """الحصول على المستخدم الحالي من Token"""
-    credentials_exception = HTTPException(
+
+@dataclass(frozen=True)
+class CurrentUser:
+    """بيانات المصادقة المختصرة للمستخدم الحالي (ما تحتاجه الصلاحيات فقط)."""
+    id: int
+    role: UserRole
+    is_active: Optional[bool]
+    suspended_until: Optional[datetime]
+
+
+# ذاكرة مؤقتة لبيانات المصادقة حسب user_id (تُمسح عند تغيير الدور/التفعيل/الإيقاف/الحذف)
+auth_user_cache = TTLCache(
+    ttl_seconds=settings.AUTH_USER_CACHE_TTL_SECONDS,
+    max_size=settings.AUTH_USER_CACHE_MAX_SIZE,
+)
+
+
+def invalidate_user_cache(user_id: int) -> None:
+    """مسح بيانات المصادقة المخزنة لمستخدم بعد تعديل صلاحياته أو حالته."""
+    auth_user_cache.invalidate(user_id)
+
+
+def _load_current_user(db: Session, user_id: int) -> Optional[CurrentUser]:
+    row = (
+        db.query(User.id, User.role, User.is_active, User.suspended_until)
+        .filter(User.id == user_id)
+        .first()
+    )
+    if row is None:
+        return None
+    return CurrentUser(id=row.id, role=row.role, is_active=row.is_active, suspended_until=row.suspended_until)
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
+
+
+def _user_id_from_token(token: str) -> int:
+    """استخراج user_id من JWT (أو رفع 401)"""
+    credentials_exception = _credentials_exception()
+
     if not token:
         print("No token provided")
         raise credentials_exception
-    
+
     payload = decode_access_token(token)
     if payload is None:
         print(f"Failed to decode token: {token[:50]}...")
         raise credentials_exception
-    
+
     user_id_str = payload.get("sub")
     if user_id_str is None:
         raise credentials_exception
-    
+
     try:
-        user_id: int = int(user_id_str)
+        return int(user_id_str)
     except (ValueError, TypeError):
         raise credentials_exception
-    
-    user = db.query(User).filter(User.id == user_id).first()
+
+
+def _check_user_access(user: Optional[CurrentUser]) -> CurrentUser:
     if user is None:
-        raise credentials_exception
+        raise _credentials_exception()
 
-    # تعطيل/إيقاف مؤقت
-    if not getattr(user, "is_active", True):
+    # تعطيل/إيقاف مؤقت (يُفحص في كل طلب لأن الإيقاف مرتبط بالوقت)
+    if not user.is_active:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="الحساب غير مفعل")
-    suspended_until = getattr(user, "suspended_until", None)
+    suspended_until = user.suspended_until
     if suspended_until and suspended_until > datetime.now():
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"الحساب موقوف مؤقتاً حتى {suspended_until.isoformat(sep=' ', timespec='minutes')}",
         )
-    
+
     return user
 
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+) -> CurrentUser:
+    """الحصول على المستخدم الحالي من Token"""
+    user_id = _user_id_from_token(token)
+    user = auth_user_cache.get_or_load(user_id, lambda: _load_current_user(db, user_id))
+    return _check_user_access(user)
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    db: AsyncSession = Depends(get_async_db),
+) -> CurrentUser:
+    """نفس get_current_user للمسارات async (AsyncSession، بدون threadpool)"""
+    user_id = _user_id_from_token(token)
+    user = auth_user_cache.get(user_id)
+    if user is None:
+        row = (
+            await db.execute(
+                select(User.id, User.role, User.is_active, User.suspended_until).where(User.id == user_id)
+            )
+        ).first()
+        if row is not None:
+            user = CurrentUser(id=row.id, role=row.role, is_active=row.is_active, suspended_until=row.suspended_until)
+            auth_user_cache.set(user_id, user)
+    return _check_user_access(user)
+
+
+def get_current_user_record(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db),
+) -> User:
+    """سجل المستخدم الكامل من قاعدة البيانات (للنقاط التي تعرض أو تعدل بيانات المستخدم نفسه)."""
+    user = db.query(User).filter(User.id == current_user.id).first()
+    if user is None:
+        invalidate_user_cache(current_user.id)
+        raise _credentials_exception()
+    return user
+
+
+async def get_current_user_record_async(
+    current_user: CurrentUser = Depends(get_current_user_async),
+    db: AsyncSession = Depends(get_async_db),
+) -> User:
+    """سجل المستخدم الكامل عبر AsyncSession"""
+    user = await db.get(User, current_user.id)
+    if user is None:
+        invalidate_user_cache(current_user.id)
+        raise _credentials_exception()
+    return user
+
+
 def require_role(allowed_roles: list[UserRole]):
     """مصادقة الصلاحيات"""
-    def role_checker(current_user: User = Depends(get_current_user)):
+    def role_checker(current_user: CurrentUser = Depends(get_current_user)):
         if current_user.role not in allowed_roles:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -66,6 +161,13 @@ def require_role(allowed_roles: list[UserRole]):
     return role_checker
 
 
-
-
-
+def require_role_async(allowed_roles: list[UserRole]):
+    """مصادقة الصلاحيات للمسارات async"""
+    async def role_checker(current_user: CurrentUser = Depends(get_current_user_async)):
+        if current_user.role not in allowed_roles:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Not enough permissions"
+            )
+        return current_user
+    return role_checker
@@ -0,0 +1,34 @@
+"""
+أدوات HTTP caching: ETag + Cache-Control + رد 304 عند تطابق If-None-Match.
+"""
+import hashlib
+from typing import Optional
+from fastapi import Request, Response
+
+
+def make_etag(content: bytes) -> str:
+    return '"' + hashlib.blake2b(content, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """مقارنة If-None-Match مع ETag (تقبل قائمة قيم و * و W/)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [value.strip() for value in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def cached_response(
+    request: Request,
+    content: bytes,
+    media_type: str,
+    cache_control: str,
+    etag: Optional[str] = None,
+) -> Response:
+    """رد بمحتوى جاهز مع ETag، أو 304 بدون جسم إذا كانت نسخة العميل مطابقة"""
+    etag = etag or make_etag(content)
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type=media_type, headers=headers)
@@ -0,0 +1,375 @@
+"""
+ترحيلات قاعدة البيانات ذات الإصدارات (بديل فحوصات PRAGMA عند استيراد main.py).
+
+- جدول schema_migrations يحفظ رقم كل ترحيل تم تطبيقه.
+- الترحيلات مرتبة وكل ترحيل idempotent (يمكن إعادة تشغيله بأمان على قاعدة بيانات قديمة).
+- التشغيل مرة واحدة قبل بدء الـworkers:  python -m app.core.migrations
+  الحالة فقط:                            python -m app.core.migrations status
+- عند الإقلاع يكتفي كل worker بفحص رقم الإصدار (استعلام واحد) عبر ensure_schema_up_to_date().
+"""
+import sys
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+from sqlalchemy.schema import CreateTable
+from app.core.config import settings
+from app.core.database import Base, engine
+
+MIGRATIONS_TABLE = "schema_migrations"
+
+# مفتاح القفل الاستشاري في PostgreSQL (حتى لا يطبق runner-ان الترحيلات في نفس الوقت)
+_PG_LOCK_KEY = 74201
+# انتظار runner آخر يطبق ترحيلاً على SQLite (إعادة بناء جدول كبير قد تطول)
+_SQLITE_MIGRATION_LOCK_TIMEOUT_MS = 10 * 60 * 1000
+
+
+def _import_models():
+    """تسجيل كل الجداول في Base.metadata (الـCLI لا يمر عبر main.py)"""
+    from app.features.user import model as _user  # noqa: F401
+    from app.features.license_type import model as _license_type  # noqa: F401
+    from app.features.license import model as _license  # noqa: F401
+    from app.features.exam_type import model as _exam_type  # noqa: F401
+    from app.features.exam import model as _exam  # noqa: F401
+    from app.features.violation_type import model as _violation_type  # noqa: F401
+    from app.features.violation import model as _violation  # noqa: F401
+    from app.features.license_renewal import model as _license_renewal  # noqa: F401
+    from app.features.license_replacement import model as _license_replacement  # noqa: F401
+    from app.features.notification import model as _notification  # noqa: F401
+    from app.features.stored_file import model as _stored_file  # noqa: F401
+    from app.core import replica as _replica  # noqa: F401
+
+
+# ========== أدوات مساعدة للترحيلات ==========
+
+def _is_sqlite(conn: Connection) -> bool:
+    return conn.dialect.name == "sqlite"
+
+
+def _existing_columns(conn: Connection, table_name: str) -> Dict[str, dict]:
+    insp = inspect(conn)
+    if not insp.has_table(table_name):
+        return {}
+    return {col["name"]: col for col in insp.get_columns(table_name)}
+
+
+def _column_ddl(conn: Connection, table_name: str, column_name: str) -> str:
+    """تعريف العمود من النموذج لاستخدامه في ALTER TABLE ADD COLUMN"""
+    column = Base.metadata.tables[table_name].c[column_name]
+    ddl = f'"{column.name}" {column.type.compile(dialect=conn.dialect)}'
+    default = column.default.arg if column.default is not None and column.default.is_scalar else None
+    if default is not None:
+        literal = int(default) if isinstance(default, bool) else default
+        ddl += f" DEFAULT {literal!r}" if isinstance(literal, str) else f" DEFAULT {literal}"
+        if not column.nullable:
+            ddl += " NOT NULL"
+    fk = next(iter(column.foreign_keys), None)
+    if fk is not None:
+        ddl += f' REFERENCES "{fk.column.table.name}" ("{fk.column.name}")'
+    return ddl
+
+
+def _add_columns(conn: Connection, table_name: str, column_names: List[str]):
+    """إضافة الأعمدة الناقصة فقط (الجدول غير الموجود يُنشأ من create_all في الترحيل الأول)"""
+    existing = _existing_columns(conn, table_name)
+    if not existing:
+        return
+    for name in column_names:
+        if name not in existing:
+            conn.exec_driver_sql(f'ALTER TABLE "{table_name}" ADD COLUMN {_column_ddl(conn, table_name, name)}')
+
+
+def _rebuild_sqlite_table(conn: Connection, table_name: str):
+    """
+    إعادة بناء جدول SQLite حسب تعريف النموذج الحالي (لتغييرات لا يدعمها ALTER TABLE
+    مثل إزالة NOT NULL أو إضافة FK). الطريقة الموصى بها: جدول جديد، نسخ، حذف، إعادة تسمية.
+    """
+    table = Base.metadata.tables[table_name]
+    old_columns = _existing_columns(conn, table_name)
+    common = ", ".join(f'"{c.name}"' for c in table.columns if c.name in old_columns)
+    tmp_name = f"_new_{table_name}"
+    tmp_table = table.to_metadata(Base.metadata, name=tmp_name)
+    try:
+        conn.exec_driver_sql(f'DROP TABLE IF EXISTS "{tmp_name}"')
+        conn.execute(CreateTable(tmp_table))
+        conn.exec_driver_sql(f'INSERT INTO "{tmp_name}" ({common}) SELECT {common} FROM "{table_name}"')
+        conn.exec_driver_sql(f'DROP TABLE "{table_name}"')
+        conn.exec_driver_sql(f'ALTER TABLE "{tmp_name}" RENAME TO "{table_name}"')
+    finally:
+        Base.metadata.remove(tmp_table)
+    for index in table.indexes:
+        index.create(bind=conn, checkfirst=True)
+
+
+# ========== الترحيلات (بالترتيب، لا تُعدل بعد نشرها؛ أضف ترحيلاً جديداً في النهاية) ==========
+
+def _m001_initial_schema(conn: Connection):
+    # قاعدة بيانات جديدة: كل الجداول. قاعدة قديمة: الجداول الناقصة فقط (مثل license_types)
+    Base.metadata.create_all(bind=conn)
+
+
+def _m002_licenses_public_profile(conn: Connection):
+    _add_columns(conn, "licenses", [
+        "chronic_disease", "emergency_contact_name", "emergency_contact_phone",
+        "place_of_birth", "residence_address",
+    ])
+
+
+def _m003_licenses_license_type(conn: Connection):
+    _add_columns(conn, "licenses", ["license_type_id", "license_category"])
+
+
+def _m004_users_suspension(conn: Connection):
+    _add_columns(conn, "users", ["suspended_until", "suspension_reason"])
+
+
+def _m005_licenses_audit(conn: Connection):
+    _add_columns(conn, "licenses", ["issued_by_user_id"])
+
+
+def _m006_licenses_dept_approval(conn: Connection):
+    _add_columns(conn, "licenses", [
+        "dept_approval_requested", "dept_approval_requested_at", "dept_approval_requested_by_user_id",
+        "dept_approval_approved", "dept_approval_approved_at", "dept_approval_approved_by_user_id",
+        "dept_approval_notes",
+    ])
+
+
+def _m007_licenses_signature(conn: Connection):
+    _add_columns(conn, "licenses", ["signature_image_path"])
+
+
+def _m008_license_replacements_barcode_snapshot(conn: Connection):
+    _add_columns(conn, "license_replacements", ["old_barcode", "new_barcode"])
+
+
+def _m009_exams_audit(conn: Connection):
+    _add_columns(conn, "exams", ["created_by_user_id", "scheduled_by_user_id"])
+
+
+def _m010_exam_types_price(conn: Connection):
+    _add_columns(conn, "exam_types", ["price"])
+
+
+def _m011_exams_payment(conn: Connection):
+    _add_columns(conn, "exams", ["paid_at", "paid_by_user_id", "paid_amount"])
+
+
+def _m012_license_renewals_vision_exam(conn: Connection):
+    _add_columns(conn, "license_renewals", [
+        "vision_exam_date", "vision_exam_result", "vision_exam_conducted_by_user_id", "renewal_fee",
+    ])
+
+
+def _m013_violations_paid_by(conn: Connection):
+    _add_columns(conn, "violations", ["paid_by_user_id"])
+
+
+def _m014_violations_violation_type_fk(conn: Connection):
+    _add_columns(conn, "violations", ["violation_type_id"])
+    if not _is_sqlite(conn):
+        return
+    # عمود أُضيف سابقاً بدون FK حقيقي
+    create_sql = conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type='table' AND name='violations'"
+    ).scalar() or ""
+    if "REFERENCES violation_types" not in create_sql and '"violation_types"' not in create_sql:
+        _rebuild_sqlite_table(conn, "violations")
+
+
+def _m015_users_username(conn: Connection):
+    _add_columns(conn, "users", ["username"])
+
+
+def _m016_users_national_id_nullable(conn: Connection):
+    column = _existing_columns(conn, "users").get("national_id")
+    if column is not None and not column["nullable"]:
+        if _is_sqlite(conn):
+            _rebuild_sqlite_table(conn, "users")
+        else:
+            conn.exec_driver_sql('ALTER TABLE "users" ALTER COLUMN "national_id" DROP NOT NULL')
+
+
+def _m017_users_fcm_token(conn: Connection):
+    _add_columns(conn, "users", ["fcm_token"])
+
+
+def _m018_violations_audit_fields(conn: Connection):
+    _add_columns(conn, "violations", [
+        "cancelled_at", "cancelled_by_user_id", "cancellation_reason",
+        "modified_at", "modified_by_user_id", "modification_reason",
+    ])
+
+
+def _m019_indexes(conn: Connection):
+    # create_all لا يضيف الفهارس الجديدة للجداول الموجودة مسبقاً (فهارس ترقيم الصفحات وغيرها)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=conn, checkfirst=True)
+
+
+def _m020_replica_heartbeat(conn: Connection):
+    Base.metadata.tables["replica_heartbeat"].create(bind=conn, checkfirst=True)
+
+
+def _m021_license_changes(conn: Connection):
+    Base.metadata.tables["license_changes"].create(bind=conn, checkfirst=True)
+
+
+def _m022_stored_files(conn: Connection):
+    Base.metadata.tables["stored_files"].create(bind=conn, checkfirst=True)
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "initial_schema", _m001_initial_schema),
+    (2, "licenses_public_profile", _m002_licenses_public_profile),
+    (3, "licenses_license_type", _m003_licenses_license_type),
+    (4, "users_suspension", _m004_users_suspension),
+    (5, "licenses_audit", _m005_licenses_audit),
+    (6, "licenses_dept_approval", _m006_licenses_dept_approval),
+    (7, "licenses_signature", _m007_licenses_signature),
+    (8, "license_replacements_barcode_snapshot", _m008_license_replacements_barcode_snapshot),
+    (9, "exams_audit", _m009_exams_audit),
+    (10, "exam_types_price", _m010_exam_types_price),
+    (11, "exams_payment", _m011_exams_payment),
+    (12, "license_renewals_vision_exam", _m012_license_renewals_vision_exam),
+    (13, "violations_paid_by", _m013_violations_paid_by),
+    (14, "violations_violation_type_fk", _m014_violations_violation_type_fk),
+    (15, "users_username", _m015_users_username),
+    (16, "users_national_id_nullable", _m016_users_national_id_nullable),
+    (17, "users_fcm_token", _m017_users_fcm_token),
+    (18, "violations_audit_fields", _m018_violations_audit_fields),
+    (19, "indexes", _m019_indexes),
+    (20, "replica_heartbeat", _m020_replica_heartbeat),
+    (21, "license_changes", _m021_license_changes),
+    (22, "stored_files", _m022_stored_files),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ========== التشغيل ==========
+
+def get_current_version(bind: Optional[Engine] = None) -> int:
+    """رقم آخر ترحيل مطبق (0 إذا لم يوجد جدول schema_migrations) - استعلام واحد"""
+    bind = bind or engine
+    try:
+        with bind.connect() as conn:
+            return conn.execute(text(f"SELECT MAX(version) FROM {MIGRATIONS_TABLE}")).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        return 0
+
+
+def _ensure_migrations_table(conn: Connection):
+    conn.exec_driver_sql(
+        f"CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} ("
+        "version INTEGER PRIMARY KEY, "
+        "name VARCHAR NOT NULL, "
+        "applied_at TIMESTAMP NOT NULL)"
+    )
+
+
+def _applied_versions(conn: Connection) -> set:
+    return {row[0] for row in conn.execute(text(f"SELECT version FROM {MIGRATIONS_TABLE}"))}
+
+
+def upgrade(bind: Optional[Engine] = None) -> List[int]:
+    """
+    تطبيق الترحيلات غير المطبقة بالترتيب. يعيد أرقام الترحيلات التي طُبقت.
+    عدة runners في نفس الوقت: PostgreSQL بـ advisory lock، و SQLite بـ BEGIN IMMEDIATE لكل ترحيل
+    (قفل الكتابة) مع إعادة قراءة schema_migrations داخل القفل قبل التطبيق.
+    """
+    _import_models()
+    bind = bind or engine
+    applied_now = []
+    with bind.connect() as conn:
+        sqlite = _is_sqlite(conn)
+        driver_connection = conn.connection.driver_connection if sqlite else None
+        previous_isolation = None
+        if sqlite:
+            # إعادة بناء الجداول تتطلب تعطيل فحص FK (خارج أي معاملة)
+            conn.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            # BEGIN يدوياً: sqlite3 لا يبدأ معاملة قبل DDL في الوضع الافتراضي
+            previous_isolation = driver_connection.isolation_level
+            driver_connection.isolation_level = None
+            conn.exec_driver_sql(f"PRAGMA busy_timeout = {_SQLITE_MIGRATION_LOCK_TIMEOUT_MS}")
+        elif conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _PG_LOCK_KEY})
+        try:
+            _ensure_migrations_table(conn)
+            conn.commit()
+            done = _applied_versions(conn)
+            conn.commit()
+            for version, name, migrate in MIGRATIONS:
+                if version in done:
+                    continue
+                if sqlite:
+                    conn.exec_driver_sql("BEGIN IMMEDIATE")
+                    if version in _applied_versions(conn):
+                        # runner آخر طبقه أثناء انتظار القفل
+                        conn.commit()
+                        continue
+                print(f"Running DB migration {version:03d}: {name} ...")
+                try:
+                    migrate(conn)
+                    conn.execute(
+                        text(f"INSERT INTO {MIGRATIONS_TABLE} (version, name, applied_at) VALUES (:v, :n, :t)"),
+                        {"v": version, "n": name, "t": datetime.now()},
+                    )
+                    conn.commit()
+                except IntegrityError:
+                    # runner آخر سجل نفس الترحيل (الترحيلات idempotent)
+                    conn.rollback()
+                    continue
+                except Exception:
+                    conn.rollback()
+                    print(f"❌ DB migration {version:03d} ({name}) failed")
+                    raise
+                applied_now.append(version)
+        finally:
+            if sqlite:
+                conn.exec_driver_sql(f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}")
+                driver_connection.isolation_level = previous_isolation
+            elif conn.dialect.name == "postgresql":
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _PG_LOCK_KEY})
+                conn.commit()
+    return applied_now
+
+
+def ensure_schema_up_to_date():
+    """
+    فحص الإقلاع: استعلام واحد لرقم الإصدار.
+    إذا كانت قاعدة البيانات متأخرة: تطبيق الترحيلات (DB_AUTO_MIGRATE) أو إيقاف التشغيل برسالة واضحة.
+    """
+    current = get_current_version()
+    if current >= LATEST_VERSION:
+        return
+    if not settings.DB_AUTO_MIGRATE:
+        raise RuntimeError(
+            f"Database schema is at version {current}, expected {LATEST_VERSION}. "
+            "Run: python -m app.core.migrations"
+        )
+    applied = upgrade()
+    if applied:
+        print(f"✓ Applied {len(applied)} DB migration(s), schema version {LATEST_VERSION}")
+
+
+def _print_status():
+    current = get_current_version()
+    print(f"Schema version: {current} / {LATEST_VERSION}")
+    for version, name, _ in MIGRATIONS:
+        mark = "✓" if version <= current else " "
+        print(f"  [{mark}] {version:03d} {name}")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+    if command == "status":
+        _print_status()
+    elif command == "upgrade":
+        applied = upgrade()
+        print(f"✓ Schema version {LATEST_VERSION} ({len(applied)} migration(s) applied)")
+    else:
+        print("Usage: python -m app.core.migrations [upgrade|status]")
+        sys.exit(2)
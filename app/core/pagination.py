@@ -0,0 +1,140 @@
+"""
+ترقيم الصفحات بالمؤشر (Keyset / cursor pagination)
+
+المؤشر نص base64 يحمل قيمة عمود الترتيب و id لآخر عنصر في الصفحة السابقة،
+وتُعاد معلومات الصفحة في الترويسات حتى يبقى شكل الاستجابة (قائمة) كما هو للتطبيقات الحالية:
+- X-Next-Cursor: مؤشر الصفحة التالية (غير موجود إذا كانت هذه آخر صفحة)
+- X-Total-Count: العدد الكلي (فقط عند include_total=true)
+"""
+import base64
+import binascii
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+from fastapi import HTTPException, Query, Response
+from sqlalchemy import String, and_, literal, or_, select, type_coerce
+from sqlalchemy.orm import Query as ORMQuery
+
+from app.core.config import settings
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+TOTAL_COUNT_HEADER = "X-Total-Count"
+PAGINATION_HEADERS = [NEXT_CURSOR_HEADER, TOTAL_COUNT_HEADER]
+
+
+@dataclass
+class PageParams:
+    limit: int
+    cursor: Optional[str] = None
+    include_total: bool = False
+
+
+@dataclass
+class Page:
+    items: List[Any]
+    next_cursor: Optional[str] = None
+    total: Optional[int] = None
+
+
+def page_params(
+    limit: int = Query(
+        settings.PAGE_SIZE_DEFAULT,
+        ge=1,
+        le=settings.PAGE_SIZE_MAX,
+        description="عدد العناصر في الصفحة",
+    ),
+    cursor: Optional[str] = Query(None, description="مؤشر الصفحة التالية (من ترويسة X-Next-Cursor)"),
+    include_total: bool = Query(False, description="إرجاع العدد الكلي في ترويسة X-Total-Count"),
+) -> PageParams:
+    return PageParams(limit=limit, cursor=cursor, include_total=include_total)
+
+
+def encode_cursor(sort_value: Optional[str], row_id: int) -> str:
+    raw = json.dumps([sort_value, row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[str], int]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if sort_value is not None and not isinstance(sort_value, str):
+            raise ValueError("invalid sort value")
+        return sort_value, int(row_id)
+    except (ValueError, TypeError, binascii.Error, json.JSONDecodeError):
+        raise HTTPException(status_code=400, detail="مؤشر الصفحة غير صالح")
+
+
+def _is_sqlite(query: ORMQuery) -> bool:
+    return query.session.get_bind().dialect.name == "sqlite"
+
+
+def _cursor_value_param(query: ORMQuery, value: str):
+    # في SQLite تُخزَّن التواريخ كنص بأكثر من صيغة (CURRENT_TIMESTAMP بدون أجزاء الثانية، و ORM معها)،
+    # لذلك نقارن بالنص الخام المخزن كما هو حتى تتطابق المقارنة مع ترتيب ORDER BY ويُستخدم الفهرس.
+    if _is_sqlite(query):
+        return literal(value, String())
+    return datetime.fromisoformat(value)
+
+
+def _raw_sort_value(query: ORMQuery, sort_column, id_column, row) -> Optional[str]:
+    if _is_sqlite(query):
+        return query.session.execute(
+            select(type_coerce(sort_column, String)).where(id_column == getattr(row, id_column.key))
+        ).scalar()
+    value = getattr(row, sort_column.key)
+    return value.isoformat() if value is not None else None
+
+
+def _keyset_condition(query: ORMQuery, sort_column, id_column, cursor: str, descending: bool):
+    value, last_id = decode_cursor(cursor)
+    after_id = id_column < last_id if descending else id_column > last_id
+    if sort_column is None:
+        return after_id
+    # القيم الفارغة (NULL) تأتي دائماً في آخر الترتيب
+    if value is None:
+        return and_(sort_column.is_(None), after_id)
+    param = _cursor_value_param(query, value)
+    beyond = sort_column < param if descending else sort_column > param
+    return or_(beyond, and_(sort_column == param, after_id), sort_column.is_(None))
+
+
+def paginate(
+    query: ORMQuery,
+    page: PageParams,
+    id_column,
+    sort_column=None,
+    descending: bool = False,
+) -> Page:
+    """
+    تطبيق ترقيم الصفحات على استعلام ORM مرتب حسب (sort_column, id).
+    sort_column عمود تاريخ/وقت (أو None للترتيب حسب id فقط).
+    """
+    total = query.order_by(None).count() if page.include_total else None
+
+    if page.cursor:
+        query = query.filter(_keyset_condition(query, sort_column, id_column, page.cursor, descending))
+
+    order_by = []
+    if sort_column is not None:
+        order_by.append(sort_column.desc().nullslast() if descending else sort_column.asc().nullslast())
+    order_by.append(id_column.desc() if descending else id_column.asc())
+
+    rows = query.order_by(None).order_by(*order_by).limit(page.limit + 1).all()
+    next_cursor = None
+    if len(rows) > page.limit:
+        rows = rows[: page.limit]
+        last = rows[-1]
+        sort_value = _raw_sort_value(query, sort_column, id_column, last) if sort_column is not None else None
+        next_cursor = encode_cursor(sort_value, getattr(last, id_column.key))
+
+    return Page(items=rows, next_cursor=next_cursor, total=total)
+
+
+def apply_page_headers(response: Response, page: Page) -> None:
+    if page.next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = page.next_cursor
+    if page.total is not None:
+        response.headers[TOTAL_COUNT_HEADER] = str(page.total)
@@ -0,0 +1,77 @@
+"""
+قوائم خفيفة: اختيار الأعمدة المطلوبة فقط في SQL بدل تحميل الكائن كاملاً.
+
+- fields=id,full_name,status : أعمدة محددة (من قائمة مسموحة لكل مورد)
+- view=summary               : مجموعة أعمدة مختصرة جاهزة لجداول العرض
+- بدونهما: الاستجابة الكاملة كما هي (التوافق مع التطبيقات الحالية)
+
+id يُضاف دائماً، وعمود الترتيب يُقرأ عند الحاجة لمؤشر الصفحة التالية ولا يُعاد إلا إذا طُلب.
+"""
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException, Query
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.pagination import Page, apply_page_headers
+
+VIEW_FULL = "full"
+VIEW_SUMMARY = "summary"
+
+
+@dataclass
+class ProjectionParams:
+    fields: Optional[str] = None
+    view: str = VIEW_FULL
+
+
+def projection_params(
+    fields: Optional[str] = Query(None, description="أعمدة محددة مفصولة بفاصلة (مثال: id,full_name,status)"),
+    view: str = Query(VIEW_FULL, pattern="^(full|summary)$", description="full أو summary (أعمدة مختصرة)"),
+) -> ProjectionParams:
+    return ProjectionParams(fields=fields, view=view)
+
+
+def model_columns(model, names: Sequence[str]) -> Dict[str, Any]:
+    """أعمدة الجدول بالأسماء المطلوبة (الأسماء التي ليست أعمدة تُتجاهل)"""
+    table_columns = model.__table__.columns
+    return {name: getattr(model, name) for name in names if name in table_columns}
+
+
+def resolve_fields(
+    params: ProjectionParams,
+    allowed: Dict[str, Any],
+    summary: Sequence[str],
+) -> Optional[List[str]]:
+    """أسماء الأعمدة المطلوبة، أو None للاستجابة الكاملة"""
+    if params.fields:
+        names = list(dict.fromkeys(name.strip() for name in params.fields.split(",") if name.strip()))
+        unknown = [name for name in names if name not in allowed]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"حقول غير معروفة: {', '.join(unknown)}")
+    elif params.view == VIEW_SUMMARY:
+        names = list(summary)
+    else:
+        return None
+    if "id" not in names:
+        names.insert(0, "id")
+    return names
+
+
+def apply_projection(query, allowed: Dict[str, Any], names: Sequence[str], sort_column=None):
+    """استبدال كائنات ORM بالأعمدة المطلوبة فقط (مع عمود الترتيب لمؤشر الصفحة)"""
+    entities = [allowed[name].label(name) for name in names]
+    if sort_column is not None and sort_column.key not in names:
+        entities.append(sort_column.label(sort_column.key))
+    return query.with_entities(*entities)
+
+
+def projected_response(page: Page, names: Sequence[str]) -> JSONResponse:
+    """قائمة dict بالأعمدة المطلوبة فقط + ترويسات الصفحة"""
+    items = [{name: getattr(row, name) for name in names} for row in page.items]
+    # Decimal كنص مثل الاستجابة الكاملة (pydantic)
+    response = JSONResponse(content=jsonable_encoder(items, custom_encoder={Decimal: str}))
+    apply_page_headers(response, page)
+    return response
@@ -0,0 +1,155 @@
+"""
+توجيه القراءات إلى نسخة قراءة (read replica) مع الرجوع إلى القاعدة الرئيسية عند التأخر.
+
+- READ_REPLICA_URL في Settings (فارغ = كل القراءات على القاعدة الرئيسية).
+- قياس التأخر عبر جدول replica_heartbeat: القاعدة الرئيسية تحدّث الصف دورياً،
+  والتأخر = الوقت الحالي - آخر نبضة ظاهرة في النسخة. يعمل مع PostgreSQL streaming replication
+  ومع ملفي SQLite (النسخة تُحدَّث بالنسخ/الاستعادة) لأغراض الاختبار المحلي.
+- get_read_db: تبعية للمسارات القرائية فقط (تقارير، قوائم، إحصائيات).
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import Column, DateTime, Integer, create_engine, event, select, update
+from sqlalchemy.orm import Session, sessionmaker
+from app.core.config import settings
+from app.core.database import Base, SessionLocal, engine_options, set_sqlite_pragmas
+
+
+class ReplicaHeartbeat(Base):
+    """صف واحد (id=1) تحدّثه القاعدة الرئيسية لقياس تأخر النسخة"""
+    __tablename__ = "replica_heartbeat"
+
+    id = Column(Integer, primary_key=True)
+    updated_at = Column(DateTime, nullable=False)
+
+
+class ReadReplica:
+    _engine = None
+    _SessionLocal: Optional[sessionmaker] = None
+    _lock = threading.Lock()
+
+    # نتيجة آخر فحص للتأخر (تُعاد حتى READ_REPLICA_LAG_CHECK_INTERVAL_SECONDS)
+    _checked_at: float = 0.0
+    _usable: bool = False
+    _lag_seconds: Optional[float] = None
+    _last_error: Optional[str] = None
+
+    STATS: Dict[str, int] = {"replica_reads": 0, "primary_fallbacks": 0, "lag_checks": 0}
+
+    @staticmethod
+    def is_configured() -> bool:
+        return bool(settings.READ_REPLICA_URL)
+
+    @staticmethod
+    def _get_session_factory() -> sessionmaker:
+        if ReadReplica._SessionLocal is None:
+            with ReadReplica._lock:
+                if ReadReplica._SessionLocal is None:
+                    url = settings.READ_REPLICA_URL
+                    replica_engine = create_engine(url, **engine_options(url))
+                    if "sqlite" in url:
+                        event.listen(replica_engine, "connect", set_sqlite_pragmas)
+                    ReadReplica._engine = replica_engine
+                    ReadReplica._SessionLocal = sessionmaker(
+                        autocommit=False, autoflush=False, bind=replica_engine
+                    )
+        return ReadReplica._SessionLocal
+
+    @staticmethod
+    def measure_lag() -> Optional[float]:
+        """تأخر النسخة بالثواني (None إذا لم تصل أي نبضة بعد)"""
+        ReadReplica._get_session_factory()
+        with ReadReplica._engine.connect() as conn:
+            last_beat = conn.execute(
+                select(ReplicaHeartbeat.updated_at).where(ReplicaHeartbeat.id == 1)
+            ).scalar()
+        if last_beat is None:
+            return None
+        return max(0.0, (datetime.now() - last_beat).total_seconds())
+
+    @staticmethod
+    def is_usable() -> bool:
+        """هل يمكن القراءة من النسخة الآن؟ (متاحة وتأخرها ضمن READ_REPLICA_MAX_LAG_SECONDS)"""
+        if not ReadReplica.is_configured():
+            return False
+        now = time.monotonic()
+        if now - ReadReplica._checked_at < settings.READ_REPLICA_LAG_CHECK_INTERVAL_SECONDS:
+            return ReadReplica._usable
+        with ReadReplica._lock:
+            # خيط آخر أجرى الفحص أثناء الانتظار
+            if now - ReadReplica._checked_at < settings.READ_REPLICA_LAG_CHECK_INTERVAL_SECONDS:
+                return ReadReplica._usable
+            ReadReplica._checked_at = now
+        ReadReplica.STATS["lag_checks"] += 1
+        try:
+            lag = ReadReplica.measure_lag()
+            ReadReplica._lag_seconds = lag
+            ReadReplica._last_error = None if lag is not None else "no heartbeat on replica"
+            usable = lag is not None and lag <= settings.READ_REPLICA_MAX_LAG_SECONDS
+        except Exception as e:
+            ReadReplica._lag_seconds = None
+            ReadReplica._last_error = str(e)
+            usable = False
+        if usable != ReadReplica._usable:
+            if usable:
+                print(f"✓ Read replica is in sync (lag {ReadReplica._lag_seconds:.1f}s), routing reads to it")
+            else:
+                print(f"⚠️ Read replica unavailable or lagging ({ReadReplica._last_error or f'lag {ReadReplica._lag_seconds:.1f}s'}), reading from primary")
+        ReadReplica._usable = usable
+        return usable
+
+    @staticmethod
+    def open_session() -> Session:
+        """جلسة قراءة: النسخة إذا كانت صالحة، وإلا القاعدة الرئيسية"""
+        if ReadReplica.is_usable():
+            ReadReplica.STATS["replica_reads"] += 1
+            return ReadReplica._get_session_factory()()
+        if ReadReplica.is_configured():
+            ReadReplica.STATS["primary_fallbacks"] += 1
+        return SessionLocal()
+
+    @staticmethod
+    def write_heartbeat(db: Session):
+        """تحديث نبضة القاعدة الرئيسية (UPDATE ثم INSERT عند أول مرة)"""
+        now = datetime.now()
+        updated = db.execute(
+            update(ReplicaHeartbeat).where(ReplicaHeartbeat.id == 1).values(updated_at=now)
+        ).rowcount
+        if not updated:
+            db.add(ReplicaHeartbeat(id=1, updated_at=now))
+        db.commit()
+
+    @staticmethod
+    def get_status() -> Dict:
+        return {
+            "configured": ReadReplica.is_configured(),
+            "usable": ReadReplica._usable,
+            "lag_seconds": ReadReplica._lag_seconds,
+            "max_lag_seconds": settings.READ_REPLICA_MAX_LAG_SECONDS,
+            "last_error": ReadReplica._last_error,
+            "pool_status": ReadReplica._engine.pool.status() if ReadReplica._engine is not None else None,
+            **ReadReplica.STATS,
+        }
+
+
+def get_read_db():
+    """تبعية للمسارات القرائية فقط: لا تُستخدم مع أي كتابة (النسخة للقراءة فقط)"""
+    db = ReadReplica.open_session()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def run_replica_heartbeat():
+    """المهمة الدورية: كتابة نبضة في القاعدة الرئيسية"""
+    db = SessionLocal()
+    try:
+        ReadReplica.write_heartbeat(db)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
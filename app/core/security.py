@@ -1,9 +1,31 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Callable, Optional, TypeVar
 from jose import JWTError, jwt
 import bcrypt
 from app.core.config import settings
 
+T = TypeVar("T")
+
+# مجموعة خيوط مخصصة ومحدودة لعمليات bcrypt (حتى لا تستهلك threadpool الخاص بالطلبات الأخرى)
+_password_executor = ThreadPoolExecutor(
+    max_workers=max(1, settings.PASSWORD_HASH_MAX_WORKERS),
+    thread_name_prefix="password-hash",
+)
+_password_stats_lock = threading.Lock()
+_password_stats = {
+    "submitted": 0,
+    "completed": 0,
+    "in_flight": 0,
+    "queue_wait_total_ms": 0.0,
+    "queue_wait_max_ms": 0.0,
+    "queue_wait_last_ms": 0.0,
+    "run_total_ms": 0.0,
+}
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """التحقق من كلمة المرور"""
     try:
@@ -24,10 +46,63 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 
 def get_password_hash(password: str) -> str:
     """تشفير كلمة المرور"""
-    salt = bcrypt.gensalt()
+    salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
     hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
     return hashed.decode('utf-8')
 
+def password_needs_rehash(hashed_password: str) -> bool:
+    """هل تم إنشاء الـhash بعامل تكلفة (rounds) مختلف عن الإعداد الحالي؟"""
+    try:
+        # الصيغة: $2b$12$<salt+hash>
+        return int(hashed_password.split("$")[2]) != settings.BCRYPT_ROUNDS
+    except (AttributeError, IndexError, ValueError):
+        return False
+
+def _run_timed(func: Callable[..., T], submitted_at: float, *args) -> T:
+    started_at = time.perf_counter()
+    wait_ms = (started_at - submitted_at) * 1000
+    with _password_stats_lock:
+        _password_stats["queue_wait_total_ms"] += wait_ms
+        _password_stats["queue_wait_last_ms"] = wait_ms
+        _password_stats["queue_wait_max_ms"] = max(_password_stats["queue_wait_max_ms"], wait_ms)
+    try:
+        return func(*args)
+    finally:
+        with _password_stats_lock:
+            _password_stats["completed"] += 1
+            _password_stats["in_flight"] -= 1
+            _password_stats["run_total_ms"] += (time.perf_counter() - started_at) * 1000
+
+async def _run_in_password_pool(func: Callable[..., T], *args) -> T:
+    with _password_stats_lock:
+        _password_stats["submitted"] += 1
+        _password_stats["in_flight"] += 1
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, _run_timed, func, time.perf_counter(), *args)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """التحقق من كلمة المرور في مجموعة خيوط bcrypt المخصصة"""
+    return await _run_in_password_pool(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """تشفير كلمة المرور في مجموعة خيوط bcrypt المخصصة"""
+    return await _run_in_password_pool(get_password_hash, password)
+
+def get_password_hashing_stats() -> dict:
+    """إحصائيات مجموعة خيوط bcrypt (بما فيها وقت الانتظار في الطابور)"""
+    with _password_stats_lock:
+        stats = dict(_password_stats)
+    completed = stats["completed"] or 1
+    for key in ("queue_wait_total_ms", "queue_wait_max_ms", "queue_wait_last_ms", "run_total_ms"):
+        stats[key] = round(stats[key], 2)
+    stats.update({
+        "max_workers": _password_executor._max_workers,
+        "bcrypt_rounds": settings.BCRYPT_ROUNDS,
+        "queue_wait_avg_ms": round(stats["queue_wait_total_ms"] / completed, 2),
+        "run_avg_ms": round(stats["run_total_ms"] / completed, 2),
+    })
+    return stats
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """إنشاء JWT token"""
     to_encode = data.copy()
@@ -0,0 +1,112 @@
+"""
+مراحل إقلاع التطبيق وقياس زمنها.
+
+- pre-start (مرة واحدة قبل تشغيل الـworkers):  python -m app.core.startup
+  يطبق ترحيلات قاعدة البيانات وينشئ حساب admin الافتراضي.
+- كل worker: فحص إصدار المخطط (+ إنشاء admin إذا كان SEED_DEFAULT_ADMIN مفعلاً) داخل lifespan.
+- تقرير زمن الإقلاع: GET /api/v1/admin/metrics/startup
+"""
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+from app.core.config import settings
+
+_lock = threading.Lock()
+_phases: List[Dict] = []
+_ready_at: Optional[datetime] = None
+_total_ms: Optional[float] = None
+
+# بداية استيراد التطبيق (يُضبط من main.py قبل استيراد المسارات)
+_import_started: Optional[float] = None
+
+
+def mark_import_started(started_at: float):
+    global _import_started
+    _import_started = started_at
+
+
+def mark_import_finished():
+    """مرحلة "import": من بداية استيراد main.py حتى تسجيل كل المسارات"""
+    if _import_started is not None:
+        record_phase("import", time.perf_counter() - _import_started)
+
+
+def record_phase(name: str, seconds: float):
+    with _lock:
+        _phases.append({"name": name, "ms": round(seconds * 1000, 1)})
+
+
+@contextmanager
+def startup_phase(name: str):
+    """قياس مرحلة من مراحل الإقلاع"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_phase(name, time.perf_counter() - started)
+
+
+def mark_ready():
+    """نهاية الإقلاع: الـworker جاهز لاستقبال الطلبات"""
+    global _ready_at, _total_ms
+    _ready_at = datetime.now()
+    if _import_started is not None:
+        _total_ms = round((time.perf_counter() - _import_started) * 1000, 1)
+    report = get_startup_report()
+    phases = ", ".join(f"{p['name']}={p['ms']}ms" for p in report["phases"])
+    print(f"🚀 Worker ready in {report['total_ms']}ms ({phases})")
+
+
+def get_startup_report() -> Dict:
+    with _lock:
+        phases = list(_phases)
+    return {
+        "phases": phases,
+        # من بداية استيراد main.py حتى الجاهزية (أو مجموع المراحل إذا لم يُستورد main.py)
+        "total_ms": _total_ms if _total_ms is not None else round(sum(p["ms"] for p in phases), 1),
+        "ready_at": _ready_at.isoformat() if _ready_at else None,
+    }
+
+
+def ensure_default_admin():
+    from app.core.database import SessionLocal
+    from app.features.user.service import UserService
+
+    db = SessionLocal()
+    try:
+        UserService.ensure_default_admin(db)
+    except Exception as e:
+        print(f"Error creating default admin account: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def run_worker_startup():
+    """مراحل الإقلاع داخل كل worker (تُستدعى من lifespan)"""
+    from app.core.migrations import ensure_schema_up_to_date
+
+    with startup_phase("schema_check"):
+        ensure_schema_up_to_date()
+    if settings.SEED_DEFAULT_ADMIN:
+        with startup_phase("default_admin"):
+            ensure_default_admin()
+
+
+def run_prestart():
+    """خطوة pre-start: الترحيلات ثم حساب admin الافتراضي"""
+    from app.core.migrations import LATEST_VERSION, upgrade
+
+    with startup_phase("migrations"):
+        applied = upgrade()
+    print(f"✓ Schema version {LATEST_VERSION} ({len(applied)} migration(s) applied)")
+    with startup_phase("default_admin"):
+        ensure_default_admin()
+
+
+if __name__ == "__main__":
+    run_prestart()
+    for phase in get_startup_report()["phases"]:
+        print(f"  {phase['name']}: {phase['ms']}ms")
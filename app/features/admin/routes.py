@@ -1,8 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.core.database import get_db
-from app.core.dependencies import get_current_user, require_role
+from app.core.database import get_db, get_pool_stats
+from app.core.replica import ReadReplica, get_read_db
+from app.core.dependencies import CurrentUser, get_current_user, require_role, invalidate_user_cache
+from app.core.security import get_password_hashing_stats
+from app.core.startup import get_startup_report
+from app.core.pagination import PageParams, page_params, paginate, apply_page_headers
+from app.core.projection import ProjectionParams, apply_projection, projection_params, projected_response, resolve_fields
 from app.features.user.model import User
 from app.features.user.schema import UserCreate, UserResponse, UserUpdate, UserSuspendRequest
 from app.features.user.service import UserService
@@ -24,11 +29,17 @@ from app.features.license_type.schema import (
 )
 from app.features.license_type.service import LicenseTypeService
 from app.features.admin.service import AdminService
-from app.features.license.schema import LicenseResponse
+from app.features.notification.service import NotificationService
+from app.features.license.schema import LicenseResponse, LicenseListFilters
+from app.features.license.service import LicenseService
 from app.features.exam.schema import ExamResponse
+from app.features.exam.service import ExamService
 from app.features.violation.schema import ViolationResponse
+from app.features.violation.service import ViolationService
+from app.services.upload_storage import UploadStorage
 from app.models.enums import UserRole, LicenseStatus, ViolationStatus
-from datetime import datetime, timedelta
+from datetime import datetime, date, time, timedelta
+from sqlalchemy import or_
 
 router = APIRouter()
 
@@ -36,18 +47,37 @@ router = APIRouter()
 
 @router.get("/users", response_model=List[UserResponse])
 def get_all_users_admin(
+    response: Response,
+    page: PageParams = Depends(page_params),
+    role: Optional[str] = Query(None, description="الدور"),
+    is_active: Optional[bool] = Query(None, description="حالة التفعيل"),
+    search: Optional[str] = Query(None, description="الرقم الوطني / اسم المستخدم / الهاتف"),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN]))
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
 ):
     """الحصول على جميع المستخدمين"""
-    return db.query(User).all()
+    query = db.query(User)
+    if role:
+        try:
+            query = query.filter(User.role == UserRole(role))
+        except ValueError:
+            pass
+    if is_active is not None:
+        query = query.filter(User.is_active == is_active)
+    if search and search.strip():
+        term = f"%{search.strip()}%"
+        query = query.filter(or_(User.national_id.ilike(term), User.username.ilike(term), User.phone.ilike(term)))
+
+    result = paginate(query, page, User.id)
+    apply_page_headers(response, result)
+    return result.items
 
 @router.post("/users", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 def create_user_admin(
     user_data: UserCreate,
     role: UserRole,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN]))
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
 ):
     """إنشاء مستخدم جديد"""
     try:
@@ -62,7 +92,7 @@ def update_user_admin(
     user_data: UserUpdate,
     role: Optional[UserRole] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN]))
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
 ):
     """تحديث مستخدم"""
     user = UserService.get_user_by_id(db, user_id)
@@ -74,13 +104,14 @@ def update_user_admin(
         updated_user.role = role
         db.commit()
         db.refresh(updated_user)
+        invalidate_user_cache(user_id)
     return updated_user
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_user_admin(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN]))
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
 ):
     """حذف مستخدم"""
     if user_id == current_user.id:
@@ -92,13 +123,14 @@ def delete_user_admin(
     
     db.delete(user)
     db.commit()
+    invalidate_user_cache(user_id)
     return None
 
 @router.put("/users/{user_id}/toggle-active")
 def toggle_user_active(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN]))
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
 ):
     """تفعيل/تعطيل مستخدم"""
     if user_id == current_user.id:
@@ -111,6 +143,7 @@ def toggle_user_active(
     user.is_active = not user.is_active
     db.commit()
     db.refresh(user)
+    invalidate_user_cache(user_id)
     return {"message": f"تم {'تفعيل' if user.is_active else 'تعطيل'} المستخدم بنجاح", "is_active": user.is_active}
 
 
@@ -119,7 +152,7 @@ def suspend_user_temporarily(
     user_id: int,
     data: UserSuspendRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN])),
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN])),
 ):
     """
     إيقاف مؤقت (يُستخدم لمسؤول الرخص/المخالفات حسب طلب النظام).
@@ -139,6 +172,7 @@ def suspend_user_temporarily(
     user.suspension_reason = (data.reason.strip() if data.reason else None)
     db.commit()
     db.refresh(user)
+    invalidate_user_cache(user_id)
     return user
 
 
@@ -146,7 +180,7 @@ def suspend_user_temporarily(
 def unsuspend_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN])),
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN])),
 ):
     """إلغاء الإيقاف المؤقت"""
     if user_id == current_user.id:
@@ -160,6 +194,7 @@ def unsuspend_user(
     user.suspension_reason = None
     db.commit()
     db.refresh(user)
+    invalidate_user_cache(user_id)
     return user
 
 # ========== إدارة أنواع الامتحانات ==========
@@ -168,7 +203,7 @@ def unsuspend_user(
 def get_all_exam_types(
     include_inactive: bool = False,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN]))
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
 ):
     """الحصول على جميع أنواع الامتحانات"""
     return ExamTypeService.get_all_exam_types(db, include_inactive)
@@ -177,7 +212,7 @@ def get_all_exam_types(
 def create_exam_type(
     exam_type_data: ExamTypeCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN]))
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
 ):
     """إنشاء نوع امتحان جديد"""
     try:
@@ -190,7 +225,7 @@ def update_exam_type(
     exam_type_id: int,
     exam_type_data: ExamTypeUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN]))
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
 ):
     """تحديث نوع امتحان"""
     try:
@@ -205,7 +240,7 @@ def update_exam_type(
 def delete_exam_type(
     exam_type_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN]))
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
 ):
     """حذف نوع امتحان"""
     success = ExamTypeService.delete_exam_type(db, exam_type_id)
@@ -219,7 +254,7 @@ def delete_exam_type(
 def get_all_violation_types(
     include_inactive: bool = False,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN]))
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
 ):
     """الحصول على جميع أنواع المخالفات"""
     return ViolationTypeService.get_all_violation_types(db, include_inactive)
@@ -233,7 +268,7 @@ def get_all_violation_types(
 def create_violation_type(
     data: ViolationTypeCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN]))
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
 ):
     """إنشاء نوع مخالفة جديد"""
     try:
@@ -247,7 +282,7 @@ def update_violation_type(
     violation_type_id: int,
     data: ViolationTypeUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN]))
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
 ):
     """تحديث نوع مخالفة"""
     try:
@@ -263,7 +298,7 @@ def update_violation_type(
 def delete_violation_type(
     violation_type_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN]))
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
 ):
     """حذف نوع مخالفة"""
     success = ViolationTypeService.delete_violation_type(db, violation_type_id)
@@ -277,7 +312,7 @@ def delete_violation_type(
 def get_all_license_types_admin(
     include_inactive: bool = False,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN])),
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN])),
 ):
     """الحصول على جميع أنواع الرخص (للأدمن)"""
     return LicenseTypeService.list_license_types(db, include_inactive=include_inactive)
@@ -287,7 +322,7 @@ def get_all_license_types_admin(
 def create_license_type_admin(
     data: LicenseTypeCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN])),
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN])),
 ):
     """إنشاء نوع رخصة جديد"""
     try:
@@ -301,7 +336,7 @@ def update_license_type_admin(
     license_type_id: int,
     data: LicenseTypeUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN])),
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN])),
 ):
     """تحديث نوع رخصة"""
     try:
@@ -317,7 +352,7 @@ def update_license_type_admin(
 def delete_license_type_admin(
     license_type_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN])),
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN])),
 ):
     """حذف نوع رخصة"""
     ok = LicenseTypeService.delete_license_type(db, license_type_id)
@@ -335,7 +370,7 @@ def add_license_type_category_admin(
     license_type_id: int,
     data: LicenseTypeCategoryCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN])),
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN])),
 ):
     """إضافة فئة (A/B) لنوع رخصة"""
     cat = LicenseTypeService.add_category(db, license_type_id, data)
@@ -353,7 +388,7 @@ def update_license_type_category_admin(
     category_id: int,
     data: LicenseTypeCategoryUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN])),
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN])),
 ):
     """تحديث فئة (A/B)"""
     cat = LicenseTypeService.update_category(db, license_type_id, category_id, data)
@@ -370,7 +405,7 @@ def delete_license_type_category_admin(
     license_type_id: int,
     category_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN])),
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN])),
 ):
     """حذف فئة (A/B)"""
     ok = LicenseTypeService.delete_category(db, license_type_id, category_id)
@@ -382,44 +417,50 @@ def delete_license_type_category_admin(
 
 @router.get("/licenses", response_model=List[LicenseResponse])
 def get_all_licenses_admin(
-    status: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN]))
+    response: Response,
+    page: PageParams = Depends(page_params),
+    filters: LicenseListFilters = Depends(),
+    projection: ProjectionParams = Depends(projection_params),
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
 ):
-    """الحصول على جميع الرخص"""
+    """الحصول على جميع الرخص (fields= أو view=summary: الأعمدة المطلوبة فقط)"""
     from app.features.license.model import License
-    
-    query = db.query(License)
-    if status:
-        try:
-            license_status = LicenseStatus(status)
-            query = query.filter(License.status == license_status)
-        except ValueError:
-            pass
-    
-    licenses = query.order_by(License.application_date.desc()).all()
-    return licenses
+
+    allowed = LicenseService.projection_fields()
+    fields = resolve_fields(projection, allowed, LicenseService.SUMMARY_FIELDS)
+    query = LicenseService.apply_list_filters(db.query(License), filters)
+    if fields:
+        query = apply_projection(query, allowed, fields, sort_column=License.application_date)
+    else:
+        query = query.options(*LicenseService.response_load_options())
+    result = paginate(query, page, License.id, sort_column=License.application_date, descending=True)
+    if fields:
+        return projected_response(result, fields)
+    apply_page_headers(response, result)
+    return result.items
 
 
 @router.get("/licenses/signature/pending", response_model=List[LicenseResponse])
 def get_pending_license_signatures(
+    response: Response,
+    page: PageParams = Depends(page_params),
+    filters: LicenseListFilters = Depends(),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN])),
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN])),
 ):
     """الرخص المرحّلة من مسؤول الرخص بانتظار اعتماد/توقيع رئيس القسم."""
     from app.features.license.model import License
 
-    rows = (
-        db.query(License)
-        .filter(
-            License.status == LicenseStatus.ISSUED,
-            (License.dept_approval_requested == 1),
-            ((License.dept_approval_approved == 0) | (License.dept_approval_approved == None)),
-        )
-        .order_by(License.dept_approval_requested_at.desc().nullslast(), License.issued_date.desc().nullslast())
-        .all()
+    query = db.query(License).options(*LicenseService.response_load_options()).filter(
+        License.status == LicenseStatus.ISSUED,
+        (License.dept_approval_requested == 1),
+        ((License.dept_approval_approved == 0) | (License.dept_approval_approved == None)),
     )
-    return rows
+    query = LicenseService.apply_list_filters(query, filters)
+    result = paginate(query, page, License.id, sort_column=License.dept_approval_requested_at, descending=True)
+    apply_page_headers(response, result)
+    return result.items
 
 
 @router.post("/licenses/{license_id}/signature/approve", response_model=LicenseResponse)
@@ -427,13 +468,11 @@ def approve_license_signature(
     license_id: int,
     signature_image: Optional[UploadFile] = File(None),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN])),
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN])),
 ):
     """اعتماد/توقيع رخصة من رئيس القسم (بعد ترحيلها من مسؤول الرخص) مع رفع صورة التوقيع."""
     from datetime import datetime
     from app.features.license.model import License
-    import os
-    import uuid
 
     lic = db.query(License).filter(License.id == license_id).first()
     if not lic:
@@ -448,30 +487,18 @@ def approve_license_signature(
     if (lic.dept_approval_approved or 0) == 1:
         raise HTTPException(status_code=400, detail="تم اعتماد هذه الرخصة بالفعل")
 
-    # رفع صورة التوقيع إذا تم إرسالها
+    # رفع صورة التوقيع إذا تم إرسالها (المسار sync: النسخ على أجزاء داخل threadpool الخاص بالطلب)
     if signature_image:
-        # التحقق من نوع الملف
-        if not signature_image.content_type or not signature_image.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="يجب رفع صورة للتوقيع")
-        
-        # إنشاء مجلد لحفظ التوقيعات
-        signature_dir = "uploads/signatures"
-        os.makedirs(signature_dir, exist_ok=True)
-        
-        # إنشاء اسم فريد للملف
-        file_extension = signature_image.filename.split('.')[-1] if '.' in signature_image.filename else 'png'
-        unique_filename = f"signature_{license_id}_{uuid.uuid4().hex[:8]}.{file_extension}"
-        file_path = os.path.join(signature_dir, unique_filename)
-        
-        # حفظ الملف
         try:
-            with open(file_path, "wb") as buffer:
-                content = signature_image.file.read()
-                buffer.write(content)
-            
-            lic.signature_image_path = file_path
-            print(f"✓ Signature image saved: {file_path}")
-        except Exception as e:
+            lic.signature_image_path = UploadStorage.save(
+                signature_image.file,
+                "signature",
+                size_hint=signature_image.size,
+            )
+            print(f"✓ Signature image saved: {lic.signature_image_path}")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except OSError as e:
             print(f"⚠️ Error saving signature image: {e}")
             raise HTTPException(status_code=500, detail="حدث خطأ أثناء حفظ صورة التوقيع")
 
@@ -486,26 +513,57 @@ def approve_license_signature(
 
 @router.get("/exams", response_model=List[ExamResponse])
 def get_all_exams_admin(
+    response: Response,
+    page: PageParams = Depends(page_params),
+    result: Optional[str] = Query(None, description="النتيجة: passed / failed / pending"),
+    user_id: Optional[int] = None,
+    license_id: Optional[int] = None,
+    projection: ProjectionParams = Depends(projection_params),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN]))
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
 ):
-    """الحصول على جميع الامتحانات"""
+    """الحصول على جميع الامتحانات (fields= أو view=summary: الأعمدة المطلوبة فقط)"""
     from app.features.exam.model import Exam
     
-    exams = db.query(Exam).order_by(Exam.exam_date.desc()).all()
-    return exams
+    allowed = ExamService.projection_fields()
+    fields = resolve_fields(projection, allowed, ExamService.SUMMARY_FIELDS)
+    query = db.query(Exam)
+    if result:
+        query = query.filter(Exam.result == result)
+    if user_id:
+        query = query.filter(Exam.user_id == user_id)
+    if license_id:
+        query = query.filter(Exam.license_id == license_id)
+    if fields:
+        query = apply_projection(query, allowed, fields, sort_column=Exam.exam_date)
+
+    exams = paginate(query, page, Exam.id, sort_column=Exam.exam_date, descending=True)
+    if fields:
+        return projected_response(exams, fields)
+    apply_page_headers(response, exams)
+    return exams.items
 
 # ========== إدارة المخالفات ==========
 
 @router.get("/violations", response_model=List[ViolationResponse])
 def get_all_violations_admin(
+    response: Response,
+    page: PageParams = Depends(page_params),
     status: Optional[str] = None,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN]))
+    user_id: Optional[int] = None,
+    license_id: Optional[int] = None,
+    violation_type_id: Optional[int] = None,
+    date_from: Optional[date] = Query(None, description="تاريخ المخالفة من"),
+    date_to: Optional[date] = Query(None, description="تاريخ المخالفة إلى"),
+    projection: ProjectionParams = Depends(projection_params),
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
 ):
-    """الحصول على جميع المخالفات"""
+    """الحصول على جميع المخالفات (fields= أو view=summary: الأعمدة المطلوبة فقط)"""
     from app.features.violation.model import Violation
     
+    allowed = ViolationService.projection_fields()
+    fields = resolve_fields(projection, allowed, ViolationService.SUMMARY_FIELDS)
     query = db.query(Violation)
     if status:
         try:
@@ -513,17 +571,90 @@ def get_all_violations_admin(
             query = query.filter(Violation.status == violation_status)
         except ValueError:
             pass
-    
-    violations = query.order_by(Violation.violation_date.desc()).all()
-    return violations
+    if user_id:
+        query = query.filter(Violation.user_id == user_id)
+    if license_id:
+        query = query.filter(Violation.license_id == license_id)
+    if violation_type_id:
+        query = query.filter(Violation.violation_type_id == violation_type_id)
+    if date_from:
+        query = query.filter(Violation.violation_date >= datetime.combine(date_from, time.min))
+    if date_to:
+        query = query.filter(Violation.violation_date < datetime.combine(date_to + timedelta(days=1), time.min))
+    if fields:
+        query = apply_projection(query, allowed, fields, sort_column=Violation.violation_date)
+
+    violations = paginate(query, page, Violation.id, sort_column=Violation.violation_date, descending=True)
+    if fields:
+        return projected_response(violations, fields)
+    apply_page_headers(response, violations)
+    return violations.items
 
 # ========== التقارير والإحصائيات ==========
 
+@router.get("/notifications/outbox")
+def get_notification_outbox_stats(
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
+):
+    """حالة صندوق الإشعارات الصادرة (حسب الحالة + المستحق للإرسال)"""
+    return NotificationService.get_outbox_stats(db)
+
+
+@router.post("/notifications/outbox/requeue-dead")
+def requeue_dead_notifications(
+    ids: Optional[List[int]] = Query(None, description="معرفات محددة (اختياري، الافتراضي: الكل)"),
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
+):
+    """إعادة الإشعارات الفاشلة نهائياً (dead-letter) إلى طابور الإرسال"""
+    count = NotificationService.requeue_dead(db, ids)
+    return {"message": f"تمت إعادة {count} إشعار إلى طابور الإرسال", "requeued": count}
+
+
+@router.get("/metrics/password-hashing")
+def get_password_hashing_metrics(
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
+):
+    """إحصائيات مجموعة خيوط bcrypt (وقت الانتظار في الطابور ومدة التنفيذ) لهذا الـworker"""
+    return get_password_hashing_stats()
+
+@router.get("/metrics/db-pool")
+def get_db_pool_metrics(
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
+):
+    """حالة connection pool لقاعدة البيانات في هذا الـworker (المستخدم/المتاح/الإضافي)"""
+    return get_pool_stats()
+
+@router.get("/metrics/read-replica")
+def get_read_replica_metrics(
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
+):
+    """حالة نسخة القراءة: التأخر الحالي وعدد القراءات الموجهة إليها أو المعادة للقاعدة الرئيسية"""
+    return ReadReplica.get_status()
+
+@router.get("/metrics/startup")
+def get_startup_metrics(
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
+):
+    """زمن إقلاع هذا الـworker لكل مرحلة (import, schema_check, default_admin, background_jobs)"""
+    return get_startup_report()
+
+@router.get("/metrics/storage")
+def get_storage_metrics(
+    db: Session = Depends(get_db),
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
+):
+    """الملفات المرفوعة المسجلة: العدد والحجم وغير المستخدم، وإزالة التكرار في هذا الـworker"""
+    from app.features.stored_file.service import StoredFileService
+    return StoredFileService.get_stats(db)
+
 @router.get("/statistics")
 def get_system_statistics(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.SUPER_ADMIN]))
+    refresh: bool = Query(False, description="تجاهل النسخة المخزنة وإعادة الحساب"),
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(require_role([UserRole.SUPER_ADMIN]))
 ):
-    """الحصول على إحصائيات النظام الشاملة"""
-    return AdminService.get_system_statistics(db)
+    """الحصول على إحصائيات النظام الشاملة (نسخة مخزنة مؤقتاً مع حقل computed_at)"""
+    return AdminService.get_system_statistics(db, force_refresh=refresh)
 
@@ -1,51 +1,127 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func
+from app.core.config import settings
+from app.core.replica import ReadReplica
 from app.features.user.model import User
 from app.features.license.model import License
 from app.features.exam.model import Exam
 from app.features.violation.model import Violation
 from app.models.enums import LicenseStatus, ViolationStatus, UserRole
-from typing import Dict, Tuple
+from datetime import datetime
+from typing import Dict, Optional, Tuple
 import os
+import threading
+import time
 
 class AdminService:
+    # نسخة مخزنة مؤقتاً من إحصائيات لوحة التحكم (لوحة الأدمن تستعلم عنها بشكل متكرر)
+    _stats_snapshot: Optional[Dict] = None
+    _stats_computed_monotonic: float = 0.0
+    _stats_lock = threading.Lock()
+    _stats_refreshing = False
+
     @staticmethod
-    def get_system_statistics(db: Session) -> Dict:
-        """الحصول على إحصائيات النظام الشاملة"""
-        
-        # إحصائيات المستخدمين
-        total_users = db.query(func.count(User.id)).scalar()
-        active_users = db.query(func.count(User.id)).filter(User.is_active == True).scalar()
-        citizens = db.query(func.count(User.id)).filter(User.role == UserRole.CITIZEN).scalar()
-        license_officers = db.query(func.count(User.id)).filter(User.role == UserRole.LICENSE_OFFICER).scalar()
-        violation_officers = db.query(func.count(User.id)).filter(User.role == UserRole.VIOLATION_OFFICER).scalar()
-        
-        # إحصائيات الرخص
-        total_licenses = db.query(func.count(License.id)).scalar()
-        pending_licenses = db.query(func.count(License.id)).filter(License.status == LicenseStatus.PENDING).scalar()
-        approved_licenses = db.query(func.count(License.id)).filter(License.status == LicenseStatus.APPROVED).scalar()
-        issued_licenses = db.query(func.count(License.id)).filter(License.status == LicenseStatus.ISSUED).scalar()
-        rejected_licenses = db.query(func.count(License.id)).filter(License.status == LicenseStatus.REJECTED).scalar()
-        exam_passed = db.query(func.count(License.id)).filter(License.status == LicenseStatus.EXAM_PASSED).scalar()
-        exam_failed = db.query(func.count(License.id)).filter(License.status == LicenseStatus.EXAM_FAILED).scalar()
-        
-        # إحصائيات الامتحانات
-        total_exams = db.query(func.count(Exam.id)).scalar()
-        pending_exams = db.query(func.count(Exam.id)).filter(Exam.result == None).scalar()
-        passed_exams = db.query(func.count(Exam.id)).filter(Exam.result == "passed").scalar()
-        failed_exams = db.query(func.count(Exam.id)).filter(Exam.result == "failed").scalar()
-        
-        # إحصائيات المخالفات
-        total_violations = db.query(func.count(Violation.id)).scalar()
-        pending_violations = db.query(func.count(Violation.id)).filter(Violation.status == ViolationStatus.PENDING).scalar()
-        paid_violations = db.query(func.count(Violation.id)).filter(Violation.status == ViolationStatus.PAID).scalar()
-        appealed_violations = db.query(func.count(Violation.id)).filter(Violation.status == ViolationStatus.APPEALED).scalar()
-        
-        # حساب إجمالي المبالغ
-        total_fines = db.query(func.sum(Violation.fine_amount)).scalar() or 0
-        paid_fines = db.query(func.sum(Violation.fine_amount)).filter(Violation.status == ViolationStatus.PAID).scalar() or 0
-        pending_fines = db.query(func.sum(Violation.fine_amount)).filter(Violation.status == ViolationStatus.PENDING).scalar() or 0
-        
+    def get_system_statistics(db: Session, force_refresh: bool = False) -> Dict:
+        """
+        الحصول على إحصائيات النظام الشاملة من النسخة المخزنة مؤقتاً.
+        - خلال ADMIN_STATS_CACHE_TTL_SECONDS تُعاد النسخة كما هي
+        - بعدها تُعاد النسخة القديمة ويتم تحديثها في الخلفية (حتى ADMIN_STATS_MAX_STALE_SECONDS)
+        - إذا لم توجد نسخة أو أصبحت قديمة جداً تُحسب مباشرة
+        """
+        ttl = settings.ADMIN_STATS_CACHE_TTL_SECONDS
+        if ttl <= 0 or force_refresh:
+            return AdminService._store_statistics(AdminService.compute_system_statistics(db))
+
+        snapshot = AdminService._stats_snapshot
+        age = time.monotonic() - AdminService._stats_computed_monotonic
+        if snapshot is not None and age < ttl:
+            return snapshot
+        if snapshot is not None and age < settings.ADMIN_STATS_MAX_STALE_SECONDS:
+            AdminService._refresh_statistics_in_background()
+            return snapshot
+
+        with AdminService._stats_lock:
+            # طلب آخر قد يكون حسبها أثناء الانتظار
+            age = time.monotonic() - AdminService._stats_computed_monotonic
+            if AdminService._stats_snapshot is not None and age < ttl:
+                return AdminService._stats_snapshot
+            return AdminService._store_statistics(AdminService.compute_system_statistics(db))
+
+    @staticmethod
+    def _store_statistics(stats: Dict) -> Dict:
+        AdminService._stats_snapshot = stats
+        AdminService._stats_computed_monotonic = time.monotonic()
+        return stats
+
+    @staticmethod
+    def _refresh_statistics_in_background():
+        with AdminService._stats_lock:
+            if AdminService._stats_refreshing:
+                return
+            AdminService._stats_refreshing = True
+
+        def _refresh():
+            db = ReadReplica.open_session()
+            try:
+                stats = AdminService.compute_system_statistics(db)
+                with AdminService._stats_lock:
+                    AdminService._store_statistics(stats)
+            except Exception as e:
+                print(f"⚠️ Failed to refresh admin statistics: {e}")
+            finally:
+                db.close()
+                AdminService._stats_refreshing = False
+
+        threading.Thread(target=_refresh, name="admin-stats-refresh", daemon=True).start()
+
+    @staticmethod
+    def compute_system_statistics(db: Session) -> Dict:
+        """حساب إحصائيات النظام الشاملة باستعلامات تجميعية (GROUP BY) بدلاً من استعلام لكل حالة."""
+
+        # إحصائيات المستخدمين (حسب الدور والتفعيل)
+        users_by_role = {}
+        total_users = 0
+        active_users = 0
+        for role, is_active, count in (
+            db.query(User.role, User.is_active, func.count(User.id))
+            .group_by(User.role, User.is_active)
+            .all()
+        ):
+            total_users += count
+            if is_active:
+                active_users += count
+            users_by_role[role] = users_by_role.get(role, 0) + count
+
+        # إحصائيات الرخص (حسب الحالة)
+        licenses_by_status = dict(
+            db.query(License.status, func.count(License.id)).group_by(License.status).all()
+        )
+        total_licenses = sum(licenses_by_status.values())
+        pending_licenses = licenses_by_status.get(LicenseStatus.PENDING, 0)
+        approved_licenses = licenses_by_status.get(LicenseStatus.APPROVED, 0)
+        issued_licenses = licenses_by_status.get(LicenseStatus.ISSUED, 0)
+        rejected_licenses = licenses_by_status.get(LicenseStatus.REJECTED, 0)
+        exam_passed = licenses_by_status.get(LicenseStatus.EXAM_PASSED, 0)
+        exam_failed = licenses_by_status.get(LicenseStatus.EXAM_FAILED, 0)
+
+        # إحصائيات الامتحانات (حسب النتيجة)
+        exams_by_result = dict(
+            db.query(Exam.result, func.count(Exam.id)).group_by(Exam.result).all()
+        )
+        total_exams = sum(exams_by_result.values())
+
+        # إحصائيات المخالفات (العدد والمبالغ حسب الحالة)
+        violations_by_status = {
+            status: (count, float(fines or 0))
+            for status, count, fines in (
+                db.query(Violation.status, func.count(Violation.id), func.sum(Violation.fine_amount))
+                .group_by(Violation.status)
+                .all()
+            )
+        }
+        total_violations = sum(count for count, _ in violations_by_status.values())
+        total_fines = sum(fines for _, fines in violations_by_status.values())
+
         # إحصائيات المسؤولين الذين أصدروا الرخص
         licenses_by_officer = (
             db.query(
@@ -77,9 +153,9 @@ class AdminService:
                 "active": active_users,
                 "inactive": total_users - active_users,
                 "by_role": {
-                    "citizens": citizens,
-                    "license_officers": license_officers,
-                    "violation_officers": violation_officers
+                    "citizens": users_by_role.get(UserRole.CITIZEN, 0),
+                    "license_officers": users_by_role.get(UserRole.LICENSE_OFFICER, 0),
+                    "violation_officers": users_by_role.get(UserRole.VIOLATION_OFFICER, 0)
                 }
             },
             "licenses": {
@@ -99,21 +175,22 @@ class AdminService:
             },
             "exams": {
                 "total": total_exams,
-                "pending": pending_exams,
-                "passed": passed_exams,
-                "failed": failed_exams
+                "pending": exams_by_result.get(None, 0),
+                "passed": exams_by_result.get("passed", 0),
+                "failed": exams_by_result.get("failed", 0)
             },
             "violations": {
                 "total": total_violations,
-                "pending": pending_violations,
-                "paid": paid_violations,
-                "appealed": appealed_violations,
+                "pending": violations_by_status.get(ViolationStatus.PENDING, (0, 0.0))[0],
+                "paid": violations_by_status.get(ViolationStatus.PAID, (0, 0.0))[0],
+                "appealed": violations_by_status.get(ViolationStatus.APPEALED, (0, 0.0))[0],
                 "fines": {
                     "total": float(total_fines),
-                    "paid": float(paid_fines),
-                    "pending": float(pending_fines)
+                    "paid": violations_by_status.get(ViolationStatus.PAID, (0, 0.0))[1],
+                    "pending": violations_by_status.get(ViolationStatus.PENDING, (0, 0.0))[1]
                 }
-            }
+            },
+            "computed_at": datetime.now().isoformat()
         }
 
 
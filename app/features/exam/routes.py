@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.core.database import get_db
-from app.core.dependencies import get_current_user, require_role
+from app.core.dependencies import CurrentUser, get_current_user, require_role
 from app.features.user.model import User
 from app.models.enums import UserRole
 from app.features.exam.schema import ExamResponse, ExamCreate, ExamResult, ExamSchedule
@@ -14,7 +14,7 @@ router = APIRouter()
 def create_exam(
     exam_data: ExamCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER]))
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER]))
 ):
     """إنشاء امتحان جديد"""
     exam = ExamService.create_exam(db, exam_data, current_user.id)
@@ -23,7 +23,7 @@ def create_exam(
 @router.get("/my-exams", response_model=List[ExamResponse])
 def get_my_exams(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """الحصول على جميع امتحانات المستخدم الحالي"""
     exams = ExamService.get_user_exams(db, current_user.id)
@@ -32,7 +32,7 @@ def get_my_exams(
 @router.get("/pending/list", response_model=List[ExamResponse])
 def get_pending_exams(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER]))
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER]))
 ):
     """الحصول على الامتحانات المعلقة"""
     exams = ExamService.get_pending_exams(db)
@@ -43,7 +43,7 @@ def schedule_exam(
     exam_id: int,
     schedule_data: ExamSchedule,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER]))
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER]))
 ):
     """تحديد موعد الامتحان - فقط لمسؤول الرخص"""
     # حماية إضافية: التأكد من أن المستخدم ليس مواطن
@@ -63,7 +63,7 @@ def submit_exam_result(
     exam_id: int,
     result_data: ExamResult,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER]))
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER]))
 ):
     """تسجيل نتيجة الامتحان"""
     exam = ExamService.submit_exam_result(db, exam_id, result_data, current_user.id)
@@ -75,7 +75,7 @@ def submit_exam_result(
 def get_exam(
     exam_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """الحصول على امتحان"""
     exam = ExamService.get_exam_by_id(db, exam_id)
@@ -1,13 +1,23 @@
 from sqlalchemy.orm import Session
 from app.features.exam.model import Exam
 from app.features.license.model import License
-from app.features.exam.schema import ExamCreate, ExamResult, ExamSchedule
+from app.core.projection import model_columns
+from app.features.exam.schema import ExamCreate, ExamResponse, ExamResult, ExamSchedule
 from app.features.exam_type.model import ExamType
+from app.features.notification.service import NotificationService
 from app.models.enums import LicenseStatus
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, Dict, Optional, List
 
 class ExamService:
+    # أعمدة view=summary لقائمة الامتحانات
+    SUMMARY_FIELDS = ["id", "user_id", "license_id", "exam_type_id", "scheduled_date", "exam_date", "score", "result"]
+
+    @staticmethod
+    def projection_fields() -> Dict[str, Any]:
+        """الأعمدة المسموحة في fields= لقائمة الامتحانات"""
+        return model_columns(Exam, ExamResponse.model_fields)
+
     @staticmethod
     def create_exam(db: Session, exam_data: ExamCreate, examiner_id: int) -> Exam:
         """إنشاء امتحان جديد"""
@@ -41,39 +51,33 @@ class ExamService:
         
         db_exam.scheduled_date = schedule_data.scheduled_date
         db_exam.scheduled_by_user_id = scheduler_id
+
+        # إشعار عند تحديد موعد الامتحان (يُحفظ في صندوق الإشعارات مع نفس المعاملة)
+        exam_type = None
+        if db_exam.exam_type_id:
+            exam_type = db.query(ExamType).filter(ExamType.id == db_exam.exam_type_id).first()
+        
+        exam_type_name = exam_type.name if exam_type else "الامتحان"
+        scheduled_date_str = schedule_data.scheduled_date.strftime("%Y-%m-%d %H:%M")
+        
+        # المبلغ الثابت للامتحان: 10.5 دينار
+        exam_fee = 10.5
+        
+        NotificationService.enqueue(
+            db,
+            user_id=db_exam.user_id,
+            title="تم تحديد موعد الامتحان",
+            body=f"تم تحديد موعد {exam_type_name} في {scheduled_date_str}. يرجى الحضور في الموعد المحدد ودفع مبلغ {exam_fee} دينار عند الحضور.",
+            data={
+                "type": "exam_scheduled",
+                "exam_id": str(db_exam.id),
+                "scheduled_date": schedule_data.scheduled_date.isoformat(),
+                "exam_fee": str(exam_fee)
+            },
+        )
         db.commit()
         db.refresh(db_exam)
         
-        # إرسال إشعار عند تحديد موعد الامتحان
-        try:
-            from app.services.fcm_service import FCMService
-            
-            # الحصول على نوع الامتحان
-            exam_type = None
-            if db_exam.exam_type_id:
-                exam_type = db.query(ExamType).filter(ExamType.id == db_exam.exam_type_id).first()
-            
-            exam_type_name = exam_type.name if exam_type else "الامتحان"
-            scheduled_date_str = schedule_data.scheduled_date.strftime("%Y-%m-%d %H:%M")
-            
-            # المبلغ الثابت للامتحان: 10.5 دينار
-            exam_fee = 10.5
-            
-            FCMService.send_notification_to_user(
-                user_id=db_exam.user_id,
-                title="تم تحديد موعد الامتحان",
-                body=f"تم تحديد موعد {exam_type_name} في {scheduled_date_str}. يرجى الحضور في الموعد المحدد ودفع مبلغ {exam_fee} دينار عند الحضور.",
-                data={
-                    "type": "exam_scheduled",
-                    "exam_id": str(db_exam.id),
-                    "scheduled_date": schedule_data.scheduled_date.isoformat(),
-                    "exam_fee": str(exam_fee)
-                },
-                db=db
-            )
-        except Exception as e:
-            print(f"⚠️ Failed to send notification: {e}")
-        
         return db_exam
     
     @staticmethod
@@ -159,73 +163,46 @@ class ExamService:
                             db_license.expiry_date = LicenseService.calculate_expiry_date(db_license.license_type, db_license.issued_date)
                         db_license.status = LicenseStatus.ISSUED
         
+        # إشعار المواطن بنتيجة الامتحان (في نفس المعاملة)
+        exam_type_name = "الامتحان"
+        if db_exam.exam_type_id:
+            exam_type = db.query(ExamType).filter(ExamType.id == db_exam.exam_type_id).first()
+            if exam_type:
+                exam_type_name = exam_type.name
+        
+        # إشعار مختلف حسب النتيجة
+        if db_exam.result == "passed":
+            title = "تهانينا! نجحت في الامتحان"
+            body = f"تهانينا! لقد نجحت في {exam_type_name}. الدرجة: {db_exam.score if db_exam.score else 'ممتاز'}"
+            notification_type = "exam_passed"
+        elif db_exam.result == "failed":
+            title = "نتيجة الامتحان"
+            body = f"للأسف، لم تنجح في {exam_type_name}. الدرجة: {db_exam.score if db_exam.score else 'غير متوفرة'}. يمكنك إعادة المحاولة لاحقاً."
+            notification_type = "exam_failed"
+        else:
+            # حالة pending (غير محتمل لكن للاحتياط)
+            title = "تم تحديث حالة الامتحان"
+            body = f"تم تحديث حالة {exam_type_name}"
+            notification_type = "exam_updated"
+        
+        NotificationService.enqueue(
+            db,
+            user_id=db_exam.user_id,
+            title=title,
+            body=body,
+            data={
+                "type": notification_type,
+                "exam_id": str(db_exam.id),
+                "exam_type": exam_type_name,
+                "result": db_exam.result,
+                "score": str(db_exam.score) if db_exam.score else None,
+                "exam_date": db_exam.exam_date.isoformat() if db_exam.exam_date else None,
+                "license_id": str(db_exam.license_id) if db_exam.license_id else None
+            },
+        )
         db.commit()
         db.refresh(db_exam)
         
-        # إرسال إشعار للمواطن عند رصد نتيجة الامتحان
-        print(f"🔔 Attempting to send exam result notification for exam {db_exam.id} to user {db_exam.user_id}")
-        try:
-            from app.services.fcm_service import FCMService
-            from app.features.user.model import User
-            
-            # التحقق من وجود المستخدم أولاً
-            user = db.query(User).filter(User.id == db_exam.user_id).first()
-            if not user:
-                print(f"⚠️ User {db_exam.user_id} not found - cannot send notification")
-            elif not user.fcm_token:
-                print(f"⚠️ User {db_exam.user_id} (national_id: {user.national_id}) has no FCM token registered. User must login to the mobile app first to receive notifications.")
-            else:
-                # الحصول على نوع الامتحان
-                exam_type = None
-                exam_type_name = "الامتحان"
-                if db_exam.exam_type_id:
-                    exam_type = db.query(ExamType).filter(ExamType.id == db_exam.exam_type_id).first()
-                    if exam_type:
-                        exam_type_name = exam_type.name
-                
-                # إرسال إشعار مختلف حسب النتيجة
-                if db_exam.result == "passed":
-                    title = "تهانينا! نجحت في الامتحان"
-                    body = f"تهانينا! لقد نجحت في {exam_type_name}. الدرجة: {db_exam.score if db_exam.score else 'ممتاز'}"
-                    notification_type = "exam_passed"
-                elif db_exam.result == "failed":
-                    title = "نتيجة الامتحان"
-                    body = f"للأسف، لم تنجح في {exam_type_name}. الدرجة: {db_exam.score if db_exam.score else 'غير متوفرة'}. يمكنك إعادة المحاولة لاحقاً."
-                    notification_type = "exam_failed"
-                else:
-                    # حالة pending (غير محتمل لكن للاحتياط)
-                    title = "تم تحديث حالة الامتحان"
-                    body = f"تم تحديث حالة {exam_type_name}"
-                    notification_type = "exam_updated"
-                
-                print(f"📱 User {db_exam.user_id} has FCM token - sending {db_exam.result} notification")
-                notification_sent = FCMService.send_notification_to_user(
-                    user_id=db_exam.user_id,
-                    title=title,
-                    body=body,
-                    data={
-                        "type": notification_type,
-                        "exam_id": str(db_exam.id),
-                        "exam_type": exam_type_name,
-                        "result": db_exam.result,
-                        "score": str(db_exam.score) if db_exam.score else None,
-                        "exam_date": db_exam.exam_date.isoformat() if db_exam.exam_date else None,
-                        "license_id": str(db_exam.license_id) if db_exam.license_id else None
-                    },
-                    db=db
-                )
-                if notification_sent:
-                    print(f"✓ Exam result notification sent successfully to User ID: {db_exam.user_id} for exam {db_exam.id} (Result: {db_exam.result})")
-                else:
-                    print(f"✗ Failed to send exam result notification to User ID: {db_exam.user_id} for exam {db_exam.id}")
-        except ImportError as e:
-            print(f"⚠️ Failed to import FCMService: {e}")
-            print(f"⚠️ Make sure FCM service is properly configured. Check if service-account.json exists.")
-        except Exception as e:
-            import traceback
-            print(f"⚠️ Failed to send exam result notification: {e}")
-            print(f"⚠️ Traceback: {traceback.format_exc()}")
-        
         return db_exam
     
     @staticmethod
@@ -0,0 +1,31 @@
+from app.core.database import SessionLocal
+from app.features.license.service import LicenseService
+
+
+def run_license_expiry_sweep():
+    """المهمة الدورية: تحويل الرخص المنتهية إلى EXPIRED وتوليد barcode الناقص للرخص القديمة."""
+    db = SessionLocal()
+    try:
+        expired = LicenseService.expire_overdue_licenses(db)
+        backfilled = LicenseService.backfill_missing_barcodes(db)
+        if expired or backfilled:
+            print(f"✓ License expiry sweep: {expired} expired, {backfilled} barcodes generated")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def run_sync_changes_compaction():
+    """المهمة الدورية: حذف سجل تغييرات المزامنة القديم (آخر تغيير لكل رخصة يكفي للمؤشر)."""
+    db = SessionLocal()
+    try:
+        removed = LicenseService.compact_sync_changes(db)
+        if removed:
+            print(f"✓ Sync changes compaction: {removed} rows removed")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
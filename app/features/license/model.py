@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, Enum as SQLEnum, DateTime, Text
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, Enum as SQLEnum, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -6,6 +6,12 @@ from app.models.enums import LicenseStatus, Gender, BloodType, LicenseType
 
 class License(Base):
     __tablename__ = "licenses"
+    __table_args__ = (
+        # فهارس ترقيم الصفحات (keyset) لقوائم الموظفين والأدمن
+        Index("ix_licenses_status_application_date", "status", "application_date", "id"),
+        Index("ix_licenses_status_issued_date", "status", "issued_date", "id"),
+        Index("ix_licenses_application_date", "application_date", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -149,3 +155,17 @@ class License(Base):
 
 
 
+
+
+class LicenseChange(Base):
+    """
+    سجل تغييرات الرخص لمزامنة أجهزة نقاط التفتيش (delta-sync).
+    كل تغيير على رخصة أو مخالفاتها يضيف صفاً؛ id تصاعدي ويُستخدم كمؤشر (cursor) للمزامنة.
+    """
+    __tablename__ = "license_changes"
+    # AUTOINCREMENT في SQLite: لا يُعاد استخدام أرقام الصفوف المحذوفة (المؤشر لا يرجع للخلف)
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True)
+    license_id = Column(Integer, nullable=False, index=True)  # بدون FK: يبقى السجل بعد حذف الرخصة
+    changed_at = Column(DateTime, nullable=False)
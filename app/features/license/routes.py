@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, status, Query, UploadFile, File, Request, Response
 from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date
+import gzip
 import os
-import uuid
-from app.core.database import get_db
-from app.core.dependencies import get_current_user, require_role
+from app.core.database import get_async_db, get_db
+from app.core.dependencies import CurrentUser, get_current_user, require_role, require_role_async
+from app.core.http_cache import cached_response, etag_matches
+from app.core.pagination import PageParams, page_params, apply_page_headers
+from app.core.projection import ProjectionParams, projection_params, projected_response, resolve_fields
 from app.features.user.model import User
 from app.models.enums import UserRole, LicenseStatus
 from app.features.license.model import License
@@ -17,13 +22,21 @@ from app.features.license.schema import (
     LicenseExamSchedule,
     LicenseExamScheduleBundle,
     LicenseImportantInfoUpdate,
+    LicenseListFilters,
+    BarcodeBatchRequest,
+    BarcodeBatchResponse,
+    SyncChangesResponse,
 )
 from app.features.license.service import LicenseService
+from app.features.license import sync, verification
 from app.features.exam.service import ExamService
 from app.features.exam.schema import ExamResponse, ExamCreate, ExamSchedule, ExamResult
 from app.features.exam_type.model import ExamType
 from app.features.license_type.schema import LicenseTypeResponse
 from app.features.license_type.service import LicenseTypeService
+from app.services.image_processing import ImageProcessor
+from app.services.upload_serving import signed_upload_url
+from app.services.upload_storage import UploadStorage
 
 router = APIRouter()
 
@@ -35,7 +48,7 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 def apply_for_license(
     license_data: LicenseCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """تقديم طلب رخصة جديد"""
     try:
@@ -47,7 +60,7 @@ def apply_for_license(
 @router.get("/saved-data", response_model=dict)
 def get_saved_license_data(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """الحصول على البيانات المحفوظة من الرخصة المقبولة/الصادرة للمواطن"""
     # البحث عن رخصة مقبولة أولاً (APPROVED) - البيانات الرسمية بعد قبول مسؤول الرخص
@@ -88,7 +101,7 @@ def get_saved_license_data(
 @router.get("/my-licenses", response_model=List[LicenseResponse])
 def get_my_licenses(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """الحصول على جميع رخص المستخدم الحالي"""
     licenses = LicenseService.get_user_licenses(db, current_user.id)
@@ -98,7 +111,7 @@ def get_my_licenses(
 @router.get("/license-types", response_model=List[LicenseTypeResponse])
 def list_license_types_for_citizen(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """
     قائمة أنواع الرخص (من الجدول) لاستخدامها في تطبيق المواطن عند تقديم الطلب.
@@ -109,7 +122,7 @@ def list_license_types_for_citizen(
 def get_license(
     license_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """الحصول على رخصة"""
     license = LicenseService.get_license_by_id(db, license_id)
@@ -123,19 +136,23 @@ def get_license(
 
 @router.get("/pending/list", response_model=List[LicenseResponse])
 def get_pending_licenses(
+    response: Response,
+    page: PageParams = Depends(page_params),
+    filters: LicenseListFilters = Depends(),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER]))
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER]))
 ):
     """الحصول على طلبات الرخص المعلقة"""
-    licenses = LicenseService.get_pending_licenses(db)
-    return licenses
+    result = LicenseService.get_pending_licenses(db, page, filters)
+    apply_page_headers(response, result)
+    return result.items
 
 @router.post("/{license_id}/review", response_model=LicenseResponse)
 def review_license(
     license_id: int,
     review_data: LicenseReview,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER]))
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER]))
 ):
     """مراجعة طلب رخصة"""
     try:
@@ -150,52 +167,61 @@ def review_license(
 
 @router.get("/officer/all", response_model=List[LicenseResponse])
 def get_all_licenses_for_officer(
-    license_type: Optional[str] = Query(None, description="نوع الرخصة"),
+    response: Response,
+    page: PageParams = Depends(page_params),
+    filters: LicenseListFilters = Depends(),
+    projection: ProjectionParams = Depends(projection_params),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER]))
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER]))
 ):
-    """الحصول على جميع طلبات الرخص لمسؤول الرخص (مصنفة حسب النوع)"""
-    licenses = LicenseService.get_all_licenses_for_officer(db, license_type)
-    return licenses
+    """
+    الحصول على جميع طلبات الرخص لمسؤول الرخص (مصنفة حسب النوع).
+    fields= أو view=summary: الأعمدة المطلوبة فقط (بدل LicenseResponse الكامل).
+    """
+    fields = resolve_fields(projection, LicenseService.projection_fields(), LicenseService.SUMMARY_FIELDS)
+    result = LicenseService.get_all_licenses_for_officer(db, page, filters, fields=fields)
+    if fields:
+        return projected_response(result, fields)
+    apply_page_headers(response, result)
+    return result.items
 
 
 @router.get("/officer/printable", response_model=List[LicenseResponse])
 def get_printable_licenses_for_officer(
+    response: Response,
+    page: PageParams = Depends(page_params),
+    filters: LicenseListFilters = Depends(),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER]))
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER]))
 ):
     """الرخص القابلة للطباعة (الرخص الصادرة فقط بعد اجتياز 3 امتحانات)"""
-    return LicenseService.get_printable_licenses_for_officer(db)
+    result = LicenseService.get_printable_licenses_for_officer(db, page, filters)
+    apply_page_headers(response, result)
+    return result.items
 
 
 @router.get("/officer/dept-approval/queue", response_model=List[LicenseResponse])
 def get_dept_approval_queue_for_officer(
+    response: Response,
+    page: PageParams = Depends(page_params),
+    filters: LicenseListFilters = Depends(),
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER])),
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER])),
 ):
     """
     الرخص التي اجتازت الامتحانات (تم إصدارها) لكنها بانتظار ترحيلها لاعتماد/توقيع رئيس القسم.
     تظهر مباشرة بعد النجاح (ISSUED) لكن قبل الترحيل.
     """
-    from app.features.license.model import License
-    rows = (
-        db.query(License)
-        .filter(
-            License.status == LicenseStatus.ISSUED,
-            (License.dept_approval_requested == 0) | (License.dept_approval_requested == None),
-            (License.dept_approval_approved == 0) | (License.dept_approval_approved == None),
-        )
-        .order_by(License.issued_date.desc().nullslast(), License.application_date.desc())
-        .all()
-    )
-    return rows
+    result = LicenseService.get_dept_approval_queue_for_officer(db, page, filters)
+    apply_page_headers(response, result)
+    return result.items
 
 
 @router.post("/officer/dept-approval/{license_id}/submit", response_model=LicenseResponse)
 def submit_license_for_dept_approval(
     license_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER])),
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER])),
 ):
     """ترحيل الرخصة لاعتماد/توقيع رئيس القسم."""
     from datetime import datetime
@@ -222,7 +248,7 @@ def submit_license_for_dept_approval(
 def get_license_exams(
     license_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER]))
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER]))
 ):
     """الحصول على جميع امتحانات الرخصة"""
     license = LicenseService.get_license_by_id(db, license_id)
@@ -237,7 +263,7 @@ def schedule_exam_for_license(
     license_id: int,
     data: LicenseExamSchedule,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER]))
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER]))
 ):
     """تحديد موعد امتحان للرخصة - فقط لمسؤول الرخص"""
     # حماية إضافية: التأكد من أن المستخدم ليس مواطن
@@ -279,7 +305,7 @@ def schedule_exams_bundle_for_license(
     license_id: int,
     data: LicenseExamScheduleBundle,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER]))
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER]))
 ):
     """جدولة عدة امتحانات (مثل الثلاثة) مرة واحدة"""
     # حماية إضافية: التأكد من أن المستخدم ليس مواطن
@@ -331,7 +357,7 @@ def schedule_existing_exam(
     exam_id: int,
     schedule_data: ExamSchedule,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER]))
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER]))
 ):
     """تحديد موعد امتحان موجود - فقط لمسؤول الرخص"""
     # حماية إضافية: التأكد من أن المستخدم ليس مواطن
@@ -363,7 +389,7 @@ def submit_exam_result_for_license(
     exam_id: int,
     result_data: ExamResult,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER]))
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER]))
 ):
     """إدخال نتيجة امتحان"""
     exam = ExamService.submit_exam_result(db, exam_id, result_data, current_user.id)
@@ -374,7 +400,7 @@ def submit_exam_result_for_license(
 @router.get("/exam-types/list")
 def get_exam_types(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER]))
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER]))
 ):
     """الحصول على أنواع الامتحانات"""
     exam_types = db.query(ExamType).filter(ExamType.is_active == True).all()
@@ -383,125 +409,137 @@ def get_exam_types(
 @router.post("/upload-photo")
 async def upload_photo(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """رفع صورة شخصية"""
-    # التحقق من نوع الملف
-    if not file.content_type or not file.content_type.startswith('image/'):
-        raise HTTPException(status_code=400, detail="يجب أن يكون الملف صورة")
-    
-    # إنشاء اسم ملف فريد
-    file_ext = os.path.splitext(file.filename)[1] if file.filename else '.jpg'
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = os.path.join(UPLOAD_DIR, unique_filename)
-    
-    # حفظ الملف
+    """رفع صورة شخصية (النوع يُفحص من محتوى الملف، والحفظ على أجزاء خارج event loop)"""
     try:
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-    except Exception as e:
+        path = await UploadStorage.save_upload(file, "photo")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OSError as e:
         raise HTTPException(status_code=500, detail=f"فشل حفظ الملف: {str(e)}")
     
-    return JSONResponse(content={"path": f"uploads/photos/{unique_filename}"})
+    # نسخة الطباعة + الصورة المصغرة (print_path / thumbnail_path إذا نجحت المعالجة)
+    derived = await ImageProcessor.process_upload(path)
+    return JSONResponse(content={"path": path, **derived, "url": signed_upload_url(path)})
 
 @router.post("/upload-document")
 async def upload_document(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
-    """رفع وثيقة (شهادة إقامة، شهادة ميلاد، صورة جواز)"""
-    # التحقق من نوع الملف (صورة أو PDF)
-    allowed_types = ['image/', 'application/pdf']
-    if not file.content_type or not any(file.content_type.startswith(t) for t in allowed_types):
-        raise HTTPException(status_code=400, detail="يجب أن يكون الملف صورة أو PDF")
-    
-    # إنشاء مجلد للوثائق
-    documents_dir = "uploads/documents"
-    os.makedirs(documents_dir, exist_ok=True)
-    
-    # إنشاء اسم ملف فريد
-    file_ext = os.path.splitext(file.filename)[1] if file.filename else '.pdf'
-    unique_filename = f"{uuid.uuid4()}{file_ext}"
-    file_path = os.path.join(documents_dir, unique_filename)
-    
-    # حفظ الملف
+    """رفع وثيقة (شهادة إقامة، شهادة ميلاد، صورة جواز): صورة أو PDF"""
     try:
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
-    except Exception as e:
+        path = await UploadStorage.save_upload(file, "document")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except OSError as e:
         raise HTTPException(status_code=500, detail=f"فشل حفظ الملف: {str(e)}")
     
-    return JSONResponse(content={"path": f"uploads/documents/{unique_filename}"})
+    # نسخة الطباعة + الصورة المصغرة (print_path / thumbnail_path إذا نجحت المعالجة)
+    derived = await ImageProcessor.process_upload(path)
+    return JSONResponse(content={"path": path, **derived, "url": signed_upload_url(path)})
 
 # ========== فحص الرخصة بالباركود (بدون تسجيل دخول) ==========
 
+@router.post("/by-barcode/batch", response_model=BarcodeBatchResponse, response_model_exclude_none=True)
+async def lookup_licenses_by_barcodes(
+    data: BarcodeBatchRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_role_async([UserRole.TRAFFIC_POLICE, UserRole.VIOLATION_OFFICER, UserRole.LICENSE_OFFICER]))
+):
+    """فحص عدة رخص بالباركود في طلب واحد (نتيجة مختصرة لكل باركود)"""
+    try:
+        results = await LicenseService.lookup_barcodes_async(db, data.barcodes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    found_count = sum(1 for r in results.values() if r["found"])
+    return {
+        "results": results,
+        "found_count": found_count,
+        "not_found_count": len(results) - found_count,
+    }
+
+# ========== مزامنة أجهزة نقاط التفتيش (تعمل بدون اتصال) ==========
+
+@router.get("/sync/snapshot")
+async def get_licenses_sync_snapshot(
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_role_async([UserRole.TRAFFIC_POLICE, UserRole.VIOLATION_OFFICER, UserRole.LICENSE_OFFICER]))
+):
+    """
+    التحميل الأول للجهاز: كل الرخص بصيغة مختصرة (JSON مضغوط gzip) + cursor.
+    بعدها يستخدم الجهاز /sync/changes?cursor=... فقط.
+    """
+    cursor = await LicenseService.get_sync_cursor_async(db)
+    snapshot = sync.get_cached_snapshot(cursor)
+    if snapshot is None:
+        payload = await LicenseService.build_sync_snapshot_async(db, cursor)
+        snapshot = sync.store_snapshot(cursor, payload)
+
+    headers = {"ETag": snapshot.etag, "Cache-Control": "private, no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(request, snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=snapshot.content, media_type="application/json", headers=headers)
+    return Response(content=gzip.decompress(snapshot.content), media_type="application/json", headers=headers)
+
+@router.get("/sync/changes", response_model=SyncChangesResponse, response_model_exclude_none=True)
+async def get_licenses_sync_changes(
+    cursor: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_role_async([UserRole.TRAFFIC_POLICE, UserRole.VIOLATION_OFFICER, UserRole.LICENSE_OFFICER]))
+):
+    """الرخص التي تغيّرت بعد cursor (يكرر الجهاز الطلب بالـcursor الجديد ما دام has_more)"""
+    try:
+        return await LicenseService.get_sync_changes_async(db, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.get("/by-barcode/{barcode}", response_model=LicenseResponse)
-def get_license_by_barcode_for_officer(
+async def get_license_by_barcode_for_officer(
     barcode: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.TRAFFIC_POLICE, UserRole.VIOLATION_OFFICER, UserRole.LICENSE_OFFICER]))
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_role_async([UserRole.TRAFFIC_POLICE, UserRole.VIOLATION_OFFICER, UserRole.LICENSE_OFFICER]))
 ):
     """الحصول على معلومات الرخصة بالباركود (لشرطي المرور ومسؤول المخالفات)"""
-    license = LicenseService.get_license_by_barcode(db, barcode)
+    license = await LicenseService.get_license_by_barcode_async(db, barcode)
     if not license:
         raise HTTPException(status_code=404, detail="الرخصة غير موجودة")
-    return license
+    # فحص ملفات النسخ المعالجة على القرص خارج event loop
+    return await run_in_threadpool(LicenseResponse.model_validate, license)
 
 @router.get("/verify/{barcode}")
-def verify_license_by_barcode(
+async def verify_license_by_barcode(
     barcode: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """فحص الرخصة بالباركود (بدون تسجيل دخول)"""
-    license = LicenseService.get_license_by_barcode(db, barcode)
-    
-    if not license:
-        raise HTTPException(status_code=404, detail="الرخصة غير موجودة")
-    
-    if license.status not in [LicenseStatus.ISSUED, LicenseStatus.EXPIRED]:
-        raise HTTPException(status_code=400, detail="الرخصة غير صالحة")
-    
-    # التحقق من انتهاء الرخصة
-    today = date.today()
-    is_expired = license.expiry_date and license.expiry_date < today
-    
-    # الحصول على المخالفات
-    from app.features.violation.model import Violation
-    from app.models.enums import ViolationStatus
-    violations = db.query(Violation).filter(
-        Violation.license_id == license.id,
-        Violation.status.in_([ViolationStatus.PENDING, ViolationStatus.APPEALED])
-    ).all()
-    
-    return {
-        "license": {
-            "license_number": license.license_number,
-            "full_name": license.full_name,
-            "license_type": license.license_type,
-            "issued_date": license.issued_date,
-            "expiry_date": license.expiry_date,
-            "is_expired": is_expired,
-            "status": license.status,
-            "chronic_disease": getattr(license, "chronic_disease", None),
-            "emergency_contact_name": getattr(license, "emergency_contact_name", None),
-            "emergency_contact_phone": getattr(license, "emergency_contact_phone", None),
-        },
-        "violations": [
-            {
-                "violation_number": v.violation_number,
-                "violation_type": v.violation_type,
-                "description": v.description,
-                "violation_date": v.violation_date,
-                "fine_amount": v.fine_amount,
-                "status": v.status
-            }
-            for v in violations
-        ],
-        "has_violations": len(violations) > 0,
-        "violations_count": len(violations)
-    }
+    """فحص الرخصة بالباركود (بدون تسجيل دخول) - نتيجة مخزنة مؤقتاً مع ETag"""
+    entry = verification.get_cached(barcode)
+    if entry is None:
+        license = await LicenseService.get_license_by_barcode_async(db, barcode, load_relations=False)
+
+        if not license:
+            raise HTTPException(status_code=404, detail="الرخصة غير موجودة")
+
+        if license.status not in [LicenseStatus.ISSUED, LicenseStatus.EXPIRED]:
+            raise HTTPException(status_code=400, detail="الرخصة غير صالحة")
+
+        # المخالفات غير المسددة
+        from app.features.violation.service import ViolationService
+        from app.models.enums import ViolationStatus
+        violations = await ViolationService.get_license_violations_async(
+            db, license.id, [ViolationStatus.PENDING, ViolationStatus.APPEALED]
+        )
+        entry = verification.store(
+            barcode, license.id, LicenseService.build_verification_payload(license, violations)
+        )
+
+    return cached_response(request, entry.content, "application/json", verification.CACHE_CONTROL, entry.etag)
 
 
 @router.put("/{license_id}/important-info", response_model=LicenseResponse)
@@ -509,7 +547,7 @@ def update_license_important_info(
     license_id: int,
     data: LicenseImportantInfoUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     """تحديث المعلومات المهمة عبر تطبيق المواطن بعد إصدار الرخصة (يتطلب تسجيل دخول)."""
     license = LicenseService.get_license_by_id(db, license_id)
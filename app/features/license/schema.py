@@ -1,7 +1,24 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from pydantic import BaseModel, EmailStr, computed_field, model_validator
+from typing import Dict, List, Optional
+from decimal import Decimal
 from datetime import datetime, date
 from app.models.enums import LicenseStatus, Gender, BloodType, LicenseType
+from app.services.image_processing import PRINT_VARIANT, THUMB_VARIANT, ImageProcessor
+from app.services.upload_serving import signed_upload_urls
+
+# حقول المسارات التي يُنشأ لها رابط موقع في file_urls
+LICENSE_FILE_FIELDS = (
+    "photo_path",
+    "photo_print_path",
+    "photo_thumbnail_path",
+    "residence_certificate_path",
+    "residence_certificate_thumbnail_path",
+    "birth_certificate_path",
+    "birth_certificate_thumbnail_path",
+    "passport_image_path",
+    "passport_image_thumbnail_path",
+    "signature_image_path",
+)
 
 class LicenseCreate(BaseModel):
     # النظام الجديد: نوع الرخصة من جدول (يدخلها الأدمن)
@@ -59,6 +76,12 @@ class LicenseResponse(BaseModel):
     residence_certificate_path: Optional[str] = None
     birth_certificate_path: Optional[str] = None
     passport_image_path: Optional[str] = None
+    # نسخ معالجة (نسخة طباعة + صور مصغرة للقوائم)، None إذا لم تتوفر (_resolve_image_variants)
+    photo_print_path: Optional[str] = None
+    photo_thumbnail_path: Optional[str] = None
+    residence_certificate_thumbnail_path: Optional[str] = None
+    birth_certificate_thumbnail_path: Optional[str] = None
+    passport_image_thumbnail_path: Optional[str] = None
     status: LicenseStatus
     application_date: datetime
     exam_date: Optional[datetime]
@@ -87,6 +110,76 @@ class LicenseResponse(BaseModel):
     class Config:
         from_attributes = True
 
+    @model_validator(mode="after")
+    def _resolve_image_variants(self):
+        """
+        مسارات النسخ المعالجة الموجودة على القرص (ImageProcessor يخزن نتيجة الفحص مؤقتاً).
+        تُحسب أثناء التحقق وليس في التسلسل: المسارات sync تتحقق من الاستجابة داخل threadpool.
+        """
+        for field, source, variant in (
+            ("photo_print_path", self.photo_path, PRINT_VARIANT),
+            ("photo_thumbnail_path", self.photo_path, THUMB_VARIANT),
+            ("residence_certificate_thumbnail_path", self.residence_certificate_path, THUMB_VARIANT),
+            ("birth_certificate_thumbnail_path", self.birth_certificate_path, THUMB_VARIANT),
+            ("passport_image_thumbnail_path", self.passport_image_path, THUMB_VARIANT),
+        ):
+            if getattr(self, field) is None:
+                setattr(self, field, ImageProcessor.existing_derived(source, variant))
+        return self
+
+    @computed_field
+    @property
+    def file_urls(self) -> Dict[str, str]:
+        """روابط /uploads موقعة ومؤقتة لكل ملف (المفتاح اسم حقل المسار)"""
+        return signed_upload_urls(self, LICENSE_FILE_FIELDS)
+
+class LicenseListFilters(BaseModel):
+    """فلاتر قوائم الرخص للموظفين والأدمن (تُطبّق في قاعدة البيانات)."""
+    status: Optional[str] = None
+    license_type: Optional[str] = None
+    license_type_id: Optional[int] = None
+    search: Optional[str] = None  # الاسم / رقم الرخصة / الباركود / رقم الجواز
+    date_from: Optional[date] = None  # تاريخ التقديم من
+    date_to: Optional[date] = None  # تاريخ التقديم إلى
+
+class BarcodeBatchRequest(BaseModel):
+    """فحص عدة رخص دفعة واحدة (نقاط التفتيش)"""
+    barcodes: List[str]
+
+class BarcodeLookupResult(BaseModel):
+    """نتيجة مختصرة لكل باركود"""
+    found: bool
+    license_id: Optional[int] = None
+    license_number: Optional[str] = None
+    full_name: Optional[str] = None
+    license_type: Optional[LicenseType] = None
+    status: Optional[LicenseStatus] = None
+    expiry_date: Optional[date] = None
+    is_expired: Optional[bool] = None
+    open_violations_count: Optional[int] = None
+    open_fines_total: Optional[Decimal] = None
+
+class BarcodeBatchResponse(BaseModel):
+    results: Dict[str, BarcodeLookupResult]
+    found_count: int
+    not_found_count: int
+
+class SyncLicenseRow(BaseModel):
+    """صف مختصر لمزامنة أجهزة نقاط التفتيش (deleted=True: احذف الرخصة من الجهاز)"""
+    id: int
+    barcode: Optional[str] = None
+    number: Optional[str] = None
+    name: Optional[str] = None
+    status: Optional[LicenseStatus] = None
+    expiry: Optional[date] = None
+    open_violations: Optional[int] = None
+    deleted: Optional[bool] = None
+
+class SyncChangesResponse(BaseModel):
+    cursor: int  # يُرسل في الطلب التالي
+    has_more: bool
+    changes: List[SyncLicenseRow]
+
 class LicenseReview(BaseModel):
     status: LicenseStatus
     review_notes: Optional[str] = None
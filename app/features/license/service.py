@@ -1,10 +1,18 @@
-from sqlalchemy.orm import Session
-from app.features.license.model import License
-from app.features.license.schema import LicenseCreate, LicenseReview
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, aliased, joinedload, raiseload, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from app.features.license.model import License, LicenseChange
+from sqlalchemy import func, or_
+from app.core.config import settings
+from app.core.pagination import Page, PageParams, paginate
+from app.core.projection import apply_projection, model_columns
+from app.features.license.schema import LicenseCreate, LicenseResponse, LicenseReview, LicenseListFilters
 from app.models.enums import LicenseStatus, LicenseType
 from app.features.license_type.model import LicenseType as LicenseTypeModel
-from datetime import datetime, date, timedelta
-from typing import Optional, List
+from app.features.user.model import User
+from datetime import datetime, date, time, timedelta
+from typing import Any, Dict, Optional, List
 import random
 import string
 import hashlib
@@ -13,8 +21,10 @@ class LicenseService:
     @staticmethod
     def refresh_expired_status(db: Session, license: Optional[License]) -> bool:
         """
-        تحديث حالة الرخصة إلى EXPIRED إذا انتهت صلاحيتها.
-        يرجع True إذا تم تعديل أي شيء.
+        احتساب انتهاء صلاحية الرخصة عند القراءة بدون أي كتابة في قاعدة البيانات.
+        إذا كانت الرخصة ISSUED وانتهى تاريخها تُعرض كـ EXPIRED (القيمة تُضبط كقيمة محمّلة ولا تجعل الكائن dirty)،
+        أما تحديث الجدول فعلياً فتقوم به المهمة الدورية expire_overdue_licenses.
+        يرجع True إذا تغيّرت الحالة المعروضة.
         """
         if not license:
             return False
@@ -22,10 +32,8 @@ class LicenseService:
             return False
         if not license.expiry_date:
             return False
-        today = date.today()
-        if license.expiry_date < today:
-            license.status = LicenseStatus.EXPIRED
-            db.add(license)
+        if license.expiry_date < date.today():
+            set_committed_value(license, "status", LicenseStatus.EXPIRED)
             return True
         return False
 
@@ -36,6 +44,69 @@ class LicenseService:
             if LicenseService.refresh_expired_status(db, lic):
                 changed = True
         return changed
+
+    @staticmethod
+    def expire_overdue_licenses(db: Session) -> int:
+        """
+        تحويل جميع الرخص الصادرة المنتهية إلى EXPIRED باستعلام UPDATE واحد.
+        تُستدعى من المهمة الخلفية الدورية، وترجع عدد الرخص التي تم تحديثها.
+        """
+        count = (
+            db.query(License)
+            .filter(
+                License.status == LicenseStatus.ISSUED,
+                License.expiry_date != None,
+                License.expiry_date < date.today(),
+            )
+            .update({License.status: LicenseStatus.EXPIRED}, synchronize_session=False)
+        )
+        db.commit()
+        return count
+
+    @staticmethod
+    def compact_sync_changes(db: Session) -> int:
+        """
+        حذف صفوف license_changes القديمة مع الإبقاء على آخر صف لكل رخصة.
+        feed المزامنة يستخدم max(id) لكل رخصة فقط، فأي مؤشر يعطي نفس النتيجة بعد الحذف.
+        الصف يُحذف فقط إذا كان بعده صف أقدم من SYNC_FEED_SETTLE_SECONDS: الصفوف الأحدث لا تُرسل
+        بعد في feed، فيبقى الصف السابق حتى لا تختفي الرخصة من الصفحات الحالية.
+        """
+        newer = aliased(LicenseChange)
+        cutoff = datetime.now() - timedelta(seconds=settings.SYNC_FEED_SETTLE_SECONDS)
+        count = (
+            db.query(LicenseChange)
+            .filter(
+                select(newer.id)
+                .where(
+                    newer.license_id == LicenseChange.license_id,
+                    newer.id > LicenseChange.id,
+                    newer.changed_at < cutoff,
+                )
+                .exists(),
+            )
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return count
+
+    @staticmethod
+    def backfill_missing_barcodes(db: Session) -> int:
+        """ضمان وجود barcode للرخص الصادرة القديمة (قبل إضافة الميزة)."""
+        licenses = (
+            db.query(License)
+            .filter(
+                License.status == LicenseStatus.ISSUED,
+                License.license_number != None,
+                License.barcode == None,
+            )
+            .all()
+        )
+        for l in licenses:
+            l.barcode = LicenseService.generate_barcode(l.license_number, l.user_id)
+        if licenses:
+            db.commit()
+        return len(licenses)
+
     @staticmethod
     def _add_years(d: date, years: int) -> date:
         """
@@ -145,21 +216,304 @@ class LicenseService:
         barcode = hash_obj.hexdigest()[:16].upper()
         return barcode
 
+    # ========== قوائم خفيفة (fields= / view=summary) ==========
+
+    SUMMARY_FIELDS = [
+        "id", "license_number", "barcode", "full_name", "user_national_id",
+        "license_type", "license_type_name", "license_category", "status",
+        "application_date", "issued_date", "expiry_date",
+    ]
+
+    @staticmethod
+    def projection_fields() -> Dict[str, Any]:
+        """
+        الأعمدة المسموحة في fields= لقوائم الرخص (أعمدة LicenseResponse في الجدول).
+        user_national_id و license_type_name: استعلام فرعي على المفتاح الأساسي بدل تحميل العلاقة.
+        """
+        fields = model_columns(License, LicenseResponse.model_fields)
+        fields["user_national_id"] = (
+            select(User.national_id).where(User.id == License.user_id).scalar_subquery()
+        )
+        fields["license_type_name"] = (
+            select(LicenseTypeModel.name).where(LicenseTypeModel.id == License.license_type_id).scalar_subquery()
+        )
+        return fields
+
+    @staticmethod
+    def response_load_options() -> list:
+        """
+        خطة تحميل العلاقات التي يقرؤها LicenseResponse (بدل lazy loading لكل صف):
+        - user / issued_by_user: JOIN بعمودي id و national_id فقط
+        - نوع الرخصة وفئاته (license_allowed_vehicles): selectin، استعلامان لكل القائمة
+        - مستخدمو اعتماد رئيس القسم: غير مستخدمين في الاستجابة (raiseload: أي وصول غير مخطط يفشل بوضوح)
+        """
+        return [
+            joinedload(License.user).load_only(User.id, User.national_id),
+            joinedload(License.issued_by_user).load_only(User.id, User.national_id),
+            selectinload(License.license_type_ref).selectinload(LicenseTypeModel.categories),
+            raiseload(License.dept_approval_requested_by_user),
+            raiseload(License.dept_approval_approved_by_user),
+        ]
+
     @staticmethod
     
     @staticmethod
     def get_license_by_barcode(db: Session, barcode: str) -> Optional[License]:
         """الحصول على الرخصة بالباركود"""
-        lic = db.query(License).filter(License.barcode == barcode).first()
-        if LicenseService.refresh_expired_status(db, lic):
-            db.commit()
-            db.refresh(lic)
+        lic = (
+            db.query(License)
+            .options(*LicenseService.response_load_options())
+            .filter(License.barcode == barcode)
+            .first()
+        )
+        LicenseService.refresh_expired_status(db, lic)
+        return lic
+
+    @staticmethod
+    async def get_license_by_barcode_async(
+        db: AsyncSession, barcode: str, load_relations: bool = True
+    ) -> Optional[License]:
+        """
+        الحصول على الرخصة بالباركود عبر AsyncSession.
+        العلاقات المستخدمة في LicenseResponse تُحمّل مسبقاً (لا يوجد lazy loading في async)،
+        ويمكن تخطيها (load_relations=False) عندما تكفي أعمدة الرخصة نفسها.
+        """
+        options = LicenseService.response_load_options() if load_relations else [raiseload("*")]
+        result = await db.execute(
+            select(License).options(*options).where(License.barcode == barcode).limit(1)
+        )
+        lic = result.scalars().first()
+        LicenseService.refresh_expired_status(db, lic)
         return lic
 
+    @staticmethod
+    def _effective_status(status: LicenseStatus, expiry_date: Optional[date], today: date) -> LicenseStatus:
+        """نفس منطق refresh_expired_status: الرخصة الصادرة المنتهية تُعرض EXPIRED"""
+        if status == LicenseStatus.ISSUED and expiry_date and expiry_date < today:
+            return LicenseStatus.EXPIRED
+        return status
+
+    @staticmethod
+    async def _open_violations_async(db: AsyncSession, license_ids: Optional[List[int]] = None) -> Dict[int, tuple]:
+        """(عدد، مجموع الغرامات) للمخالفات غير المسددة لكل رخصة باستعلام تجميعي واحد (None = كل الرخص)"""
+        from app.features.violation.model import Violation
+        from app.models.enums import ViolationStatus
+
+        query = (
+            select(Violation.license_id, func.count(Violation.id), func.sum(Violation.fine_amount))
+            .where(Violation.status.in_([ViolationStatus.PENDING, ViolationStatus.APPEALED]))
+            .group_by(Violation.license_id)
+        )
+        if license_ids is not None:
+            query = query.where(Violation.license_id.in_(license_ids))
+        return {license_id: (count, total) for license_id, count, total in (await db.execute(query)).all()}
+
+    @staticmethod
+    async def lookup_barcodes_async(db: AsyncSession, barcodes: List[str]) -> Dict[str, dict]:
+        """
+        فحص عدة باركودات: استعلام IN واحد للرخص + استعلام تجميعي واحد للمخالفات غير المسددة.
+        يرجع نتيجة مختصرة لكل باركود مطلوب (found=False لغير الموجود).
+        """
+        requested = list(dict.fromkeys(b.strip() for b in barcodes if b and b.strip()))
+        if not requested:
+            raise ValueError("يجب إرسال باركود واحد على الأقل")
+        if len(requested) > settings.BARCODE_BATCH_MAX_SIZE:
+            raise ValueError(f"الحد الأقصى {settings.BARCODE_BATCH_MAX_SIZE} باركود في الطلب الواحد")
+
+        rows = (
+            await db.execute(
+                select(
+                    License.id,
+                    License.barcode,
+                    License.license_number,
+                    License.full_name,
+                    License.license_type,
+                    License.status,
+                    License.expiry_date,
+                ).where(License.barcode.in_(requested))
+            )
+        ).all()
+
+        open_violations = await LicenseService._open_violations_async(db, [row.id for row in rows]) if rows else {}
+
+        today = date.today()
+        results = {barcode: {"found": False} for barcode in requested}
+        for row in rows:
+            count, total = open_violations.get(row.id, (0, 0))
+            results[row.barcode] = {
+                "found": True,
+                "license_id": row.id,
+                "license_number": row.license_number,
+                "full_name": row.full_name,
+                "license_type": row.license_type,
+                "status": LicenseService._effective_status(row.status, row.expiry_date, today),
+                "expiry_date": row.expiry_date,
+                "is_expired": bool(row.expiry_date and row.expiry_date < today),
+                "open_violations_count": count,
+                "open_fines_total": total or 0,
+            }
+        return results
+
+    # ========== مزامنة أجهزة نقاط التفتيش (delta-sync) ==========
+
+    _SYNC_COLUMNS = (
+        License.id,
+        License.barcode,
+        License.license_number,
+        License.full_name,
+        License.status,
+        License.expiry_date,
+    )
+
+    @staticmethod
+    def _sync_row(row, open_violations: Dict[int, tuple], today: date) -> dict:
+        return {
+            "id": row.id,
+            "barcode": row.barcode,
+            "number": row.license_number,
+            "name": row.full_name,
+            "status": LicenseService._effective_status(row.status, row.expiry_date, today),
+            "expiry": row.expiry_date,
+            "open_violations": open_violations.get(row.id, (0, 0))[0],
+        }
+
+    @staticmethod
+    async def _sync_upper_bound_async(db: AsyncSession, after: int) -> Optional[int]:
+        """
+        أول تغيير بعد المؤشر لم تمض عليه SYNC_FEED_SETTLE_SECONDS (حد غير شامل)، أو None.
+        المؤشر لا يتجاوزه حتى لا يُفقد تغيير أخذ id أصغر في معاملة لم تكمل commit بعد.
+        """
+        cutoff = datetime.now() - timedelta(seconds=settings.SYNC_FEED_SETTLE_SECONDS)
+        return (
+            await db.execute(
+                select(func.min(LicenseChange.id)).where(
+                    LicenseChange.id > after, LicenseChange.changed_at > cutoff
+                )
+            )
+        ).scalar()
+
+    @staticmethod
+    async def get_sync_changes_async(db: AsyncSession, cursor: int, limit: Optional[int] = None) -> dict:
+        """
+        الرخص التي تغيّرت بعد المؤشر (آخر حالة لكل رخصة مرة واحدة)، بترتيب آخر تغيير.
+        الرخصة المحذوفة أو التي ليس لها باركود تُرسل كـ deleted.
+        """
+        if cursor < 0:
+            raise ValueError("المؤشر غير صالح")
+        limit = max(1, min(limit or settings.SYNC_FEED_PAGE_SIZE, settings.SYNC_FEED_MAX_PAGE_SIZE))
+
+        last_change = func.max(LicenseChange.id).label("last_change")
+        query = (
+            select(LicenseChange.license_id, last_change)
+            .where(LicenseChange.id > cursor)
+            .group_by(LicenseChange.license_id)
+            .order_by(last_change)
+            .limit(limit + 1)
+        )
+        upper_bound = await LicenseService._sync_upper_bound_async(db, cursor)
+        if upper_bound is not None:
+            query = query.where(LicenseChange.id < upper_bound)
+        changed = (await db.execute(query)).all()
+        has_more = len(changed) > limit
+        changed = changed[:limit]
+        if not changed:
+            return {"cursor": cursor, "has_more": False, "changes": []}
+
+        license_ids = [license_id for license_id, _ in changed]
+        rows = {
+            row.id: row
+            for row in (
+                await db.execute(select(*LicenseService._SYNC_COLUMNS).where(License.id.in_(license_ids)))
+            ).all()
+        }
+        open_violations = await LicenseService._open_violations_async(db, list(rows))
+
+        today = date.today()
+        changes = []
+        for license_id in license_ids:
+            row = rows.get(license_id)
+            if row is None or not row.barcode:
+                changes.append({"id": license_id, "deleted": True})
+            else:
+                changes.append(LicenseService._sync_row(row, open_violations, today))
+        return {"cursor": changed[-1].last_change, "has_more": has_more, "changes": changes}
+
+    @staticmethod
+    async def get_sync_cursor_async(db: AsyncSession) -> int:
+        """المؤشر الحالي للـsnapshot (آخر تغيير مستقر)"""
+        query = select(func.max(LicenseChange.id))
+        upper_bound = await LicenseService._sync_upper_bound_async(db, 0)
+        if upper_bound is not None:
+            query = query.where(LicenseChange.id < upper_bound)
+        return (await db.execute(query)).scalar() or 0
+
+    @staticmethod
+    async def build_sync_snapshot_async(db: AsyncSession, cursor: int) -> dict:
+        """
+        كل الرخص التي لها باركود بصيغة المزامنة المختصرة.
+        المؤشر يُقرأ قبل الرخص: أي تغيير أثناء البناء يُعاد إرساله في feed (التطبيق على الجهاز idempotent).
+        """
+        rows = (
+            await db.execute(
+                select(*LicenseService._SYNC_COLUMNS)
+                .where(License.barcode != None)
+                .order_by(License.id)
+            )
+        ).all()
+        open_violations = await LicenseService._open_violations_async(db)
+        today = date.today()
+        return {
+            "cursor": cursor,
+            "generated_at": datetime.now(),
+            "licenses": [LicenseService._sync_row(row, open_violations, today) for row in rows],
+        }
+
+    @staticmethod
+    def build_verification_payload(license: License, violations: List) -> dict:
+        """نتيجة فحص الرخصة العام (بيانات الرخصة + المخالفات غير المسددة)"""
+        # التحقق من انتهاء الرخصة
+        today = date.today()
+        is_expired = license.expiry_date and license.expiry_date < today
+
+        return {
+            "license": {
+                "license_number": license.license_number,
+                "full_name": license.full_name,
+                "license_type": license.license_type,
+                "issued_date": license.issued_date,
+                "expiry_date": license.expiry_date,
+                "is_expired": is_expired,
+                "status": license.status,
+                "chronic_disease": getattr(license, "chronic_disease", None),
+                "emergency_contact_name": getattr(license, "emergency_contact_name", None),
+                "emergency_contact_phone": getattr(license, "emergency_contact_phone", None),
+            },
+            "violations": [
+                {
+                    "violation_number": v.violation_number,
+                    "violation_type": v.violation_type,
+                    "description": v.description,
+                    "violation_date": v.violation_date,
+                    "fine_amount": v.fine_amount,
+                    "status": v.status
+                }
+                for v in violations
+            ],
+            "has_violations": len(violations) > 0,
+            "violations_count": len(violations)
+        }
+
     @staticmethod
     def get_license_by_number(db: Session, license_number: str) -> Optional[License]:
         """الحصول على الرخصة برقم الرخصة"""
         return db.query(License).filter(License.license_number == license_number).first()
+
+    @staticmethod
+    async def get_license_by_number_async(db: AsyncSession, license_number: str) -> Optional[License]:
+        result = await db.execute(
+            select(License).options(raiseload("*")).where(License.license_number == license_number).limit(1)
+        )
+        return result.scalars().first()
     
     @staticmethod
     def calculate_age(birth_date: date) -> int:
@@ -342,31 +696,80 @@ class LicenseService:
     
     @staticmethod
     def get_license_by_id(db: Session, license_id: int) -> Optional[License]:
-        lic = db.query(License).filter(License.id == license_id).first()
-        if LicenseService.refresh_expired_status(db, lic):
-            db.commit()
-            db.refresh(lic)
+        lic = (
+            db.query(License)
+            .options(*LicenseService.response_load_options())
+            .filter(License.id == license_id)
+            .first()
+        )
+        LicenseService.refresh_expired_status(db, lic)
         return lic
     
     @staticmethod
     def get_user_licenses(db: Session, user_id: int) -> List[License]:
-        licenses = db.query(License).filter(License.user_id == user_id).all()
-        if LicenseService.refresh_expired_status_for_list(db, licenses):
-            db.commit()
-            for l in licenses:
-                try:
-                    db.refresh(l)
-                except Exception:
-                    pass
+        licenses = (
+            db.query(License)
+            .options(*LicenseService.response_load_options())
+            .filter(License.user_id == user_id)
+            .all()
+        )
+        LicenseService.refresh_expired_status_for_list(db, licenses)
         return licenses
     
     @staticmethod
-    def get_pending_licenses(db: Session) -> List[License]:
-        return db.query(License).filter(License.status == LicenseStatus.PENDING).order_by(License.application_date.asc()).all()
+    def apply_list_filters(query, filters: Optional[LicenseListFilters]):
+        """تطبيق فلاتر القوائم على استعلام الرخص (القيم غير الصحيحة يتم تجاهلها كما في السابق)."""
+        if not filters:
+            return query
+        if filters.status:
+            try:
+                query = query.filter(License.status == LicenseStatus(filters.status))
+            except ValueError:
+                pass
+        if filters.license_type:
+            try:
+                query = query.filter(License.license_type == LicenseType(filters.license_type))
+            except ValueError:
+                pass
+        if filters.license_type_id:
+            query = query.filter(License.license_type_id == filters.license_type_id)
+        if filters.search and filters.search.strip():
+            term = f"%{filters.search.strip()}%"
+            query = query.filter(
+                or_(
+                    License.full_name.ilike(term),
+                    License.license_number.ilike(term),
+                    License.barcode.ilike(term),
+                    License.passport_number.ilike(term),
+                )
+            )
+        if filters.date_from:
+            query = query.filter(License.application_date >= datetime.combine(filters.date_from, time.min))
+        if filters.date_to:
+            query = query.filter(License.application_date < datetime.combine(filters.date_to + timedelta(days=1), time.min))
+        return query
+
+    @staticmethod
+    def get_pending_licenses(
+        db: Session,
+        page: PageParams,
+        filters: Optional[LicenseListFilters] = None,
+    ) -> Page:
+        query = db.query(License).options(*LicenseService.response_load_options()).filter(License.status == LicenseStatus.PENDING)
+        query = LicenseService.apply_list_filters(query, filters)
+        return paginate(query, page, License.id, sort_column=License.application_date)
     
     @staticmethod
-    def get_all_licenses_for_officer(db: Session, license_type: Optional[str] = None) -> List[License]:
-        """الحصول على جميع الرخص لمسؤول الرخص (مصنفة حسب النوع)"""
+    def get_all_licenses_for_officer(
+        db: Session,
+        page: PageParams,
+        filters: Optional[LicenseListFilters] = None,
+        fields: Optional[List[str]] = None,
+    ) -> Page:
+        """
+        الحصول على جميع الرخص لمسؤول الرخص (مصنفة حسب النوع).
+        fields: أعمدة محددة فقط (عناصر الصفحة صفوف بدل كائنات License).
+        """
         query = db.query(License).filter(
             License.status.in_([
                 LicenseStatus.PENDING,
@@ -375,39 +778,44 @@ class LicenseService:
                 LicenseStatus.APPROVED
             ])
         )
-        
-        if license_type:
-            from app.models.enums import LicenseType
-            try:
-                lt = LicenseType(license_type)
-                query = query.filter(License.license_type == lt)
-            except ValueError:
-                pass
-        
-        return query.order_by(License.application_date.asc()).all()
+        query = LicenseService.apply_list_filters(query, filters)
+        if fields:
+            query = apply_projection(
+                query, LicenseService.projection_fields(), fields, sort_column=License.application_date
+            )
+        else:
+            query = query.options(*LicenseService.response_load_options())
+        return paginate(query, page, License.id, sort_column=License.application_date)
 
     @staticmethod
-    def get_printable_licenses_for_officer(db: Session) -> List[License]:
+    def get_printable_licenses_for_officer(
+        db: Session,
+        page: PageParams,
+        filters: Optional[LicenseListFilters] = None,
+    ) -> Page:
         """الرخص القابلة للطباعة لمسؤول الرخص (الرخص الصادرة فقط)"""
-        query = db.query(License).filter(
+        query = db.query(License).options(*LicenseService.response_load_options()).filter(
             License.status == LicenseStatus.ISSUED,
             (License.dept_approval_approved == 1) | (License.dept_approval_approved == None),
         )
-        licenses = query.order_by(License.issued_date.desc().nullslast(), License.application_date.desc()).all()
+        query = LicenseService.apply_list_filters(query, filters)
+        # ملاحظة: توليد barcode للرخص القديمة يتم في المهمة الخلفية (backfill_missing_barcodes) وليس عند القراءة
+        return paginate(query, page, License.id, sort_column=License.issued_date, descending=True)
 
-        # ضمان وجود barcode للرخص القديمة (قبل إضافة الميزة)
-        changed = False
-        for l in licenses:
-            if not l.license_number:
-                continue
-            if not l.barcode:
-                l.barcode = LicenseService.generate_barcode(l.license_number, l.user_id)
-                changed = True
-        if changed:
-            db.commit()
-            for l in licenses:
-                db.refresh(l)
-        return licenses
+    @staticmethod
+    def get_dept_approval_queue_for_officer(
+        db: Session,
+        page: PageParams,
+        filters: Optional[LicenseListFilters] = None,
+    ) -> Page:
+        """الرخص الصادرة التي لم يتم ترحيلها بعد لاعتماد/توقيع رئيس القسم"""
+        query = db.query(License).options(*LicenseService.response_load_options()).filter(
+            License.status == LicenseStatus.ISSUED,
+            (License.dept_approval_requested == 0) | (License.dept_approval_requested == None),
+            (License.dept_approval_approved == 0) | (License.dept_approval_approved == None),
+        )
+        query = LicenseService.apply_list_filters(query, filters)
+        return paginate(query, page, License.id, sort_column=License.issued_date, descending=True)
     
     @staticmethod
     def review_license(db: Session, license_id: int, review_data: LicenseReview, actor_user_id: Optional[int] = None) -> Optional[License]:
@@ -430,18 +838,17 @@ class LicenseService:
         if review_data.status == LicenseStatus.APPROVED:
             try:
                 from app.services.fcm_service import FCMService
-                notification_sent = FCMService.send_notification_to_user(
+                notification_queued = FCMService.send_notification_to_user_in_background(
                     user_id=db_license.user_id,
                     title="تمت مراجعة الطلب",
                     body="تمت مراجعة الطلب والبيانات صحيحة. انتظر حتى يتم تحديد موعد الامتحانات",
                     data={
                         "type": "license_approved",
                         "license_id": str(db_license.id)
-                    },
-                    db=db
+                    }
                 )
-                if not notification_sent:
-                    print(f"ℹ️ License {license_id} approved, but notification not sent (user may not have FCM token yet)")
+                if not notification_queued:
+                    print(f"ℹ️ License {license_id} approved, but notification not queued (FCM service not initialized)")
             except Exception as e:
                 print(f"⚠️ Failed to send notification: {e}")
         
@@ -473,7 +880,7 @@ class LicenseService:
                 # إرسال إشعار عند إصدار الرخصة
                 try:
                     from app.services.fcm_service import FCMService
-                    FCMService.send_notification_to_user(
+                    FCMService.send_notification_to_user_in_background(
                         user_id=db_license.user_id,
                         title="تم إصدار الرخصة",
                         body=f"تهانينا! تم إصدار رخصتك برقم {db_license.license_number}",
@@ -481,8 +888,7 @@ class LicenseService:
                             "type": "license_issued",
                             "license_id": str(db_license.id),
                             "license_number": db_license.license_number
-                        },
-                        db=db
+                        }
                     )
                 except Exception as e:
                     print(f"⚠️ Failed to send notification: {e}")
@@ -0,0 +1,87 @@
+"""
+مزامنة الرخص لأجهزة نقاط التفتيش (تعمل بدون اتصال).
+
+- كل تغيير على رخصة أو مخالفاتها (أو تجديدها/بدل فاقدها) يضيف صفاً في license_changes
+  داخل نفس المعاملة (حدث after_flush)، و id الصف هو المؤشر (cursor) التصاعدي.
+- التحميل الأول: GET /licenses/sync/snapshot (JSON مضغوط gzip + المؤشر الحالي).
+- بعدها: GET /licenses/sync/changes?cursor=N يرجع الرخص التي تغيّرت بعد المؤشر فقط.
+- مهمة sync_changes_compaction تحذف الصفوف القديمة وتبقي آخر تغيير لكل رخصة (feed يستخدم max(id) فقط).
+- التحديثات الجماعية (query.update) لا تمر عبر الأحداث. مهمة expire_overdue_licenses لا تحتاج
+  تسجيلاً: الصفوف المرسلة تحمل الحالة الفعلية (ISSUED المنتهية = EXPIRED) وتاريخ الانتهاء.
+"""
+import gzip
+import json
+import threading
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Optional
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event, insert
+from sqlalchemy.orm import Session
+from app.features.license.model import License, LicenseChange
+from app.features.license_renewal.model import LicenseRenewal
+from app.features.license_replacement.model import LicenseReplacement
+from app.features.violation.model import Violation
+
+
+# ========== تسجيل التغييرات ==========
+
+@event.listens_for(Session, "after_flush")
+def _record_license_changes(session: Session, flush_context):
+    changed = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        # session.dirty يشمل كائنات بلا تغيير فعلي في الأعمدة
+        if obj in session.dirty and not session.is_modified(obj, include_collections=False):
+            continue
+        if isinstance(obj, License):
+            if obj.id is not None:
+                changed.add(obj.id)
+        elif isinstance(obj, (Violation, LicenseRenewal, LicenseReplacement)):
+            if obj.license_id is not None:
+                changed.add(obj.license_id)
+    if changed:
+        now = datetime.now()
+        session.connection().execute(
+            insert(LicenseChange),
+            [{"license_id": license_id, "changed_at": now} for license_id in sorted(changed)],
+        )
+
+
+# ========== snapshot مضغوط (نسخة واحدة لكل worker) ==========
+
+@dataclass(frozen=True)
+class SyncSnapshot:
+    cursor: int
+    computed_on: date
+    content: bytes  # JSON مضغوط gzip
+    etag: str
+
+
+_snapshot: Optional[SyncSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def get_cached_snapshot(cursor: int) -> Optional[SyncSnapshot]:
+    """آخر snapshot إذا لم يتغير شيء بعده (نفس المؤشر ونفس اليوم)"""
+    snapshot = _snapshot
+    if snapshot is None or snapshot.cursor != cursor or snapshot.computed_on != date.today():
+        return None
+    return snapshot
+
+
+def store_snapshot(cursor: int, payload: dict) -> SyncSnapshot:
+    global _snapshot
+    raw = json.dumps(
+        jsonable_encoder(payload), ensure_ascii=False, separators=(",", ":")
+    ).encode("utf-8")
+    # mtime=0: نفس المحتوى ينتج نفس البايتات
+    content = gzip.compress(raw, compresslevel=6, mtime=0)
+    snapshot = SyncSnapshot(
+        cursor=cursor,
+        computed_on=date.today(),
+        content=content,
+        etag=f'"sync-{cursor}-{date.today().isoformat()}"',
+    )
+    with _snapshot_lock:
+        _snapshot = snapshot
+    return snapshot
@@ -0,0 +1,94 @@
+"""
+ذاكرة مؤقتة لنتيجة فحص الرخصة العام (/licenses/verify/{barcode}) مع ETag.
+
+- المفتاح: الباركود، والقيمة: JSON جاهز + ETag + رقم الرخصة + تاريخ الحساب
+  (is_expired يعتمد على تاريخ اليوم، لذلك لا تُستخدم نسخة من يوم سابق).
+- الإبطال تلقائي بعد commit أي تغيير على الرخص/المخالفات/التجديد/بدل الفاقد
+  (أحداث ORM على مستوى Session). التحديثات الجماعية (query.update) لا تمر عبر هذه الأحداث.
+- الذاكرة لكل worker، لذلك تبقى مدة الصلاحية قصيرة (VERIFY_CACHE_TTL_SECONDS).
+"""
+import json
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional, Set
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.http_cache import make_etag
+from app.features.license.model import License
+from app.features.license_renewal.model import LicenseRenewal
+from app.features.license_replacement.model import LicenseReplacement
+from app.features.violation.model import Violation
+
+CACHE_CONTROL = f"public, max-age={settings.VERIFY_HTTP_MAX_AGE_SECONDS}, must-revalidate"
+
+
+@dataclass(frozen=True)
+class VerificationEntry:
+    content: bytes
+    etag: str
+    license_id: int
+    computed_on: date
+
+
+verify_payload_cache = TTLCache(
+    ttl_seconds=settings.VERIFY_CACHE_TTL_SECONDS,
+    max_size=settings.VERIFY_CACHE_MAX_SIZE,
+)
+
+
+def get_cached(barcode: str) -> Optional[VerificationEntry]:
+    entry = verify_payload_cache.get(barcode)
+    if entry is None or entry.computed_on != date.today():
+        return None
+    return entry
+
+
+def store(barcode: str, license_id: int, payload: dict) -> VerificationEntry:
+    # نفس ترميز JSONResponse في FastAPI
+    content = json.dumps(
+        jsonable_encoder(payload), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+    entry = VerificationEntry(
+        content=content,
+        etag=make_etag(content),
+        license_id=license_id,
+        computed_on=date.today(),
+    )
+    verify_payload_cache.set(barcode, entry)
+    return entry
+
+
+def invalidate_licenses(license_ids: Set[int]) -> int:
+    if not license_ids:
+        return 0
+    return verify_payload_cache.invalidate_where(lambda _, entry: entry.license_id in license_ids)
+
+
+# ========== الإبطال التلقائي بعد commit ==========
+
+_PENDING_KEY = "verify_cache_license_ids"
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_licenses(session: Session, flush_context):
+    changed = session.info.setdefault(_PENDING_KEY, set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, License):
+            if obj.id is not None:
+                changed.add(obj.id)
+        elif isinstance(obj, (Violation, LicenseRenewal, LicenseReplacement)):
+            if obj.license_id is not None:
+                changed.add(obj.license_id)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session):
+    invalidate_licenses(session.info.pop(_PENDING_KEY, set()))
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session):
+    session.info.pop(_PENDING_KEY, None)
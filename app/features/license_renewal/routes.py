@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from app.core.database import get_db
-from app.core.dependencies import get_current_user, require_role
+from app.core.dependencies import CurrentUser, get_current_user, require_role
 from app.features.user.model import User
 from app.models.enums import UserRole, LicenseRenewalStatus
 from app.features.license_renewal.schema import (
@@ -56,7 +56,7 @@ def _to_response(r) -> LicenseRenewalResponse:
 def apply_for_renewal(
     data: LicenseRenewalCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     if current_user.role != UserRole.CITIZEN:
         raise HTTPException(status_code=403, detail="هذا المسار للمواطن فقط")
@@ -76,7 +76,7 @@ def apply_for_renewal(
 @router.get("/my", response_model=List[LicenseRenewalResponse])
 def my_renewals(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     if current_user.role != UserRole.CITIZEN:
         raise HTTPException(status_code=403, detail="هذا المسار للمواطن فقط")
@@ -89,7 +89,7 @@ def my_renewals(
 @router.get("/pending", response_model=List[LicenseRenewalResponse])
 def list_pending(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER])),
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER])),
 ):
     rows = LicenseRenewalService.list_renewals_for_officer(db, status=LicenseRenewalStatus.PENDING)
     return [_to_response(r) for r in rows]
@@ -98,7 +98,7 @@ def list_pending(
 @router.get("/approved", response_model=List[LicenseRenewalResponse])
 def list_approved(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER])),
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER])),
 ):
     rows = LicenseRenewalService.list_renewals_for_officer(db, status=LicenseRenewalStatus.APPROVED)
     return [_to_response(r) for r in rows]
@@ -109,7 +109,7 @@ def schedule_vision_exam(
     renewal_id: int,
     data: LicenseRenewalVisionExamSchedule,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER])),
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER])),
 ):
     """تحديد موعد امتحان النظر لطلب تجديد الرخصة"""
     try:
@@ -129,7 +129,7 @@ def submit_vision_exam_result(
     renewal_id: int,
     data: LicenseRenewalVisionExamResult,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER])),
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER])),
 ):
     """تسجيل نتيجة امتحان النظر"""
     try:
@@ -150,7 +150,7 @@ def approve(
     renewal_id: int,
     data: LicenseRenewalApprove,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER])),
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER])),
 ):
     """اعتماد تجديد الرخصة (يجب أن يكون امتحان النظر ناجحاً)"""
     try:
@@ -171,7 +171,7 @@ def reject(
     renewal_id: int,
     data: LicenseRenewalReject,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER])),
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER])),
 ):
     try:
         r = LicenseRenewalService.reject_renewal(
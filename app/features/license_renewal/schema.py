@@ -1,8 +1,9 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, computed_field
+from typing import Dict, Optional
 from datetime import datetime, date
 
 from app.models.enums import LicenseRenewalStatus
+from app.services.upload_serving import signed_upload_urls
 
 
 class LicenseRenewalCreate(BaseModel):
@@ -60,6 +61,12 @@ class LicenseRenewalResponse(BaseModel):
     class Config:
         from_attributes = True
 
+    @computed_field
+    @property
+    def file_urls(self) -> Dict[str, str]:
+        """رابط /uploads موقع ومؤقت للملف المرفق"""
+        return signed_upload_urls(self, ("new_photo_path",))
+
 
 
 
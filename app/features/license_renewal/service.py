@@ -11,6 +11,7 @@ from app.features.license_type.model import LicenseType as LicenseTypeModel
 from app.features.license_renewal.model import LicenseRenewal
 from app.models.enums import LicenseRenewalStatus, LicenseStatus, UserRole
 from app.services.fcm_service import FCMService
+from app.features.notification.service import NotificationService
 
 
 class LicenseRenewalService:
@@ -115,26 +116,23 @@ class LicenseRenewalService:
         
         r.vision_exam_date = vision_exam_date
         db.add(r)
+
+        # إشعار المواطن (يُحفظ في صندوق الإشعارات مع نفس المعاملة)
+        NotificationService.enqueue(
+            db,
+            user_id=r.user_id,
+            title="تم تحديد موعد امتحان النظر",
+            body=f"تم تحديد موعد امتحان النظر في {vision_exam_date.strftime('%Y-%m-%d %H:%M')}. يرجى الحضور في الموعد المحدد ودفع مبلغ 8.5 دينار عند الحضور.",
+            data={
+                "type": "renewal_vision_exam_scheduled",
+                "renewal_id": str(renewal_id),
+                "exam_date": vision_exam_date.isoformat(),
+                "fee": "8.5"
+            },
+        )
         db.commit()
         db.refresh(r)
         
-        # إرسال إشعار للمواطن
-        try:
-            FCMService.send_notification_to_user(
-                user_id=r.user_id,
-                title="تم تحديد موعد امتحان النظر",
-                body=f"تم تحديد موعد امتحان النظر في {vision_exam_date.strftime('%Y-%m-%d %H:%M')}. يرجى الحضور في الموعد المحدد ودفع مبلغ 8.5 دينار عند الحضور.",
-                data={
-                    "type": "renewal_vision_exam_scheduled",
-                    "renewal_id": str(renewal_id),
-                    "exam_date": vision_exam_date.isoformat(),
-                    "fee": "8.5"
-                },
-                db=db
-            )
-        except Exception as e:
-            print(f"⚠️ Failed to send vision exam notification: {e}")
-        
         return r
     
     @staticmethod
@@ -172,7 +170,7 @@ class LicenseRenewalService:
             else:
                 message = "نأسف، لم تنجح في امتحان النظر. يرجى المحاولة مرة أخرى في موعد لاحق."
             
-            FCMService.send_notification_to_user(
+            FCMService.send_notification_to_user_in_background(
                 user_id=r.user_id,
                 title="نتيجة امتحان النظر",
                 body=message,
@@ -180,8 +178,7 @@ class LicenseRenewalService:
                     "type": "renewal_vision_exam_result",
                     "renewal_id": str(renewal_id),
                     "result": vision_exam_result
-                },
-                db=db
+                }
             )
         except Exception as e:
             print(f"⚠️ Failed to send vision exam result notification: {e}")
@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from app.core.database import get_db
-from app.core.dependencies import get_current_user, require_role
+from app.core.dependencies import CurrentUser, get_current_user, require_role
 from app.features.user.model import User
 from app.models.enums import UserRole
 from app.features.license_replacement.schema import (
@@ -49,7 +49,7 @@ def _to_response(r) -> LicenseReplacementResponse:
 def apply(
     data: LicenseReplacementCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     if current_user.role != UserRole.CITIZEN:
         raise HTTPException(status_code=403, detail="هذا المسار للمواطن فقط")
@@ -69,7 +69,7 @@ def apply(
 @router.get("/my", response_model=List[LicenseReplacementResponse])
 def my(
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
 ):
     if current_user.role != UserRole.CITIZEN:
         raise HTTPException(status_code=403, detail="هذا المسار للمواطن فقط")
@@ -82,7 +82,7 @@ def my(
 @router.get("/pending", response_model=List[LicenseReplacementResponse])
 def pending(
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER])),
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER])),
 ):
     rows = LicenseReplacementService.list_pending(db)
     return [_to_response(r) for r in rows]
@@ -93,7 +93,7 @@ def approve(
     replacement_id: int,
     data: LicenseReplacementApprove,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER])),
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER])),
 ):
     try:
         r = LicenseReplacementService.approve(
@@ -114,7 +114,7 @@ def reject(
     replacement_id: int,
     data: LicenseReplacementReject,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.LICENSE_OFFICER])),
+    current_user: CurrentUser = Depends(require_role([UserRole.LICENSE_OFFICER])),
 ):
     try:
         r = LicenseReplacementService.reject(
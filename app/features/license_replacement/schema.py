@@ -1,8 +1,9 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, computed_field
+from typing import Dict, Optional
 from datetime import datetime, date
 
 from app.models.enums import LicenseRenewalStatus
+from app.services.upload_serving import signed_upload_urls
 
 
 class LicenseReplacementCreate(BaseModel):
@@ -47,4 +48,10 @@ class LicenseReplacementResponse(BaseModel):
     class Config:
         from_attributes = True
 
+    @computed_field
+    @property
+    def file_urls(self) -> Dict[str, str]:
+        """رابط /uploads موقع ومؤقت للملف المرفق"""
+        return signed_upload_urls(self, ("police_report_path",))
+
 
@@ -0,0 +1 @@
+# Notification Feature Module
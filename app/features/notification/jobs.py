@@ -0,0 +1,33 @@
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.features.notification.service import NotificationService
+
+
+def run_notification_dispatch():
+    """المهمة الدورية: إرسال الإشعارات المستحقة من notification_outbox على دفعات."""
+    from app.services.fcm_service import FCMService
+
+    if not FCMService.is_initialized():
+        # لا نستهلك المحاولات إذا كانت خدمة FCM غير مهيأة
+        return
+
+    db = SessionLocal()
+    try:
+        totals = {"sent": 0, "failed": 0, "dead": 0, "skipped": 0}
+        for _ in range(settings.NOTIFICATION_DISPATCH_MAX_BATCHES):
+            result = NotificationService.dispatch_due(db, settings.NOTIFICATION_DISPATCH_BATCH_SIZE)
+            for key in totals:
+                totals[key] += result[key]
+            if result["claimed"] < settings.NOTIFICATION_DISPATCH_BATCH_SIZE:
+                break
+        if any(totals.values()):
+            print(
+                f"✓ Notification dispatch: {totals['sent']} sent, "
+                f"{totals['failed']} to retry, {totals['dead']} dead-lettered, "
+                f"{totals['skipped']} skipped (no valid device)"
+            )
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
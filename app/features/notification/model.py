@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum as SQLEnum, Index
+from sqlalchemy.sql import func
+from datetime import datetime
+from app.core.database import Base
+from app.models.enums import NotificationStatus
+
+
+class NotificationOutbox(Base):
+    """
+    صندوق الإشعارات الصادرة (Transactional outbox).
+    يُكتب السجل في نفس معاملة التغيير (مخالفة/امتحان/تجديد) ويرسله المرسل الخلفي لاحقاً.
+    """
+    __tablename__ = "notification_outbox"
+    __table_args__ = (
+        Index("ix_notification_outbox_due", "status", "next_attempt_at", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    title = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    data = Column(Text, nullable=True)  # JSON
+    status = Column(SQLEnum(NotificationStatus), default=NotificationStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    # موعد المحاولة التالية (يُستخدم أيضاً كمهلة حجز أثناء الإرسال)
+    next_attempt_at = Column(DateTime, default=datetime.now, nullable=False)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
+    sent_at = Column(DateTime, nullable=True)
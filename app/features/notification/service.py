@@ -0,0 +1,199 @@
+import json
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.features.notification.model import NotificationOutbox
+from app.features.user.model import User
+from app.models.enums import NotificationStatus
+
+
+class NotificationService:
+    @staticmethod
+    def enqueue(
+        db: Session,
+        user_id: int,
+        title: str,
+        body: str,
+        data: Optional[dict] = None,
+    ) -> NotificationOutbox:
+        """
+        إضافة إشعار إلى صندوق الإشعارات الصادرة.
+        لا يتم commit هنا: السجل يُحفظ مع نفس معاملة التغيير الذي أنشأه.
+        """
+        item = NotificationOutbox(
+            user_id=user_id,
+            title=title,
+            body=body,
+            data=json.dumps(data, ensure_ascii=False, default=str) if data else None,
+            status=NotificationStatus.PENDING,
+            attempts=0,
+            next_attempt_at=datetime.now(),
+        )
+        db.add(item)
+        return item
+
+    @staticmethod
+    def claim_due(db: Session, limit: int) -> List[NotificationOutbox]:
+        """
+        حجز دفعة من الإشعارات المستحقة بتأجيل next_attempt_at لمدة مهلة الحجز.
+        الحجز مشروط بالقيمة القديمة حتى لا يرسل أكثر من worker نفس الإشعار.
+        """
+        now = datetime.now()
+        lease_until = now + timedelta(seconds=settings.NOTIFICATION_LEASE_SECONDS)
+        candidates = (
+            db.query(NotificationOutbox.id, NotificationOutbox.next_attempt_at)
+            .filter(
+                NotificationOutbox.status == NotificationStatus.PENDING,
+                NotificationOutbox.next_attempt_at <= now,
+            )
+            .order_by(NotificationOutbox.next_attempt_at, NotificationOutbox.id)
+            .limit(limit)
+            .all()
+        )
+        claimed_ids = []
+        for item_id, due_at in candidates:
+            updated = (
+                db.query(NotificationOutbox)
+                .filter(
+                    NotificationOutbox.id == item_id,
+                    NotificationOutbox.status == NotificationStatus.PENDING,
+                    NotificationOutbox.next_attempt_at == due_at,
+                )
+                .update({NotificationOutbox.next_attempt_at: lease_until}, synchronize_session=False)
+            )
+            if updated:
+                claimed_ids.append(item_id)
+        db.commit()
+        if not claimed_ids:
+            return []
+        return (
+            db.query(NotificationOutbox)
+            .filter(NotificationOutbox.id.in_(claimed_ids))
+            .order_by(NotificationOutbox.id)
+            .all()
+        )
+
+    @staticmethod
+    def retry_delay_seconds(attempts: int) -> float:
+        """تأخير إعادة المحاولة (exponential backoff بحد أقصى)"""
+        delay = settings.NOTIFICATION_RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1))
+        return min(delay, settings.NOTIFICATION_RETRY_MAX_SECONDS)
+
+    @staticmethod
+    def mark_sent(item: NotificationOutbox):
+        item.status = NotificationStatus.SENT
+        item.attempts = (item.attempts or 0) + 1
+        item.sent_at = datetime.now()
+        item.last_error = None
+
+    @staticmethod
+    def mark_failed(item: NotificationOutbox, error: str):
+        """تسجيل محاولة فاشلة: إعادة الجدولة أو النقل إلى dead-letter بعد آخر محاولة"""
+        item.attempts = (item.attempts or 0) + 1
+        item.last_error = error
+        if item.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS:
+            item.status = NotificationStatus.DEAD
+        else:
+            item.next_attempt_at = datetime.now() + timedelta(
+                seconds=NotificationService.retry_delay_seconds(item.attempts)
+            )
+
+    @staticmethod
+    def mark_skipped(item: NotificationOutbox, reason: str):
+        """المستخدم بلا جهاز صالح: لا فائدة من إعادة المحاولة"""
+        item.status = NotificationStatus.SKIPPED
+        item.attempts = (item.attempts or 0) + 1
+        item.last_error = reason
+
+    @staticmethod
+    def _record_failure(item: NotificationOutbox, error: str, result: Dict[str, int]):
+        NotificationService.mark_failed(item, error)
+        if item.status == NotificationStatus.DEAD:
+            result["dead"] += 1
+        else:
+            result["failed"] += 1
+
+    @staticmethod
+    def dispatch_due(db: Session, batch_size: int) -> Dict[str, int]:
+        """إرسال دفعة واحدة من الإشعارات المستحقة"""
+        from app.services.fcm_service import FCMMessage, FCMService
+
+        result = {"claimed": 0, "sent": 0, "failed": 0, "dead": 0, "skipped": 0}
+        items = NotificationService.claim_due(db, batch_size)
+        if not items:
+            return result
+        result["claimed"] = len(items)
+
+        # رموز FCM لكل المستخدمين في الدفعة باستعلام واحد
+        user_ids = {item.user_id for item in items}
+        tokens = dict(db.query(User.id, User.fcm_token).filter(User.id.in_(user_ids)).all())
+
+        deliverable = []
+        for item in items:
+            token = tokens.get(item.user_id)
+            if token:
+                deliverable.append((item, FCMMessage(
+                    token=token,
+                    title=item.title,
+                    body=item.body,
+                    data=json.loads(item.data) if item.data else None,
+                )))
+            else:
+                NotificationService.mark_skipped(item, "NO_TOKEN")
+                result["skipped"] += 1
+
+        send_results = FCMService.send_many([message for _, message in deliverable])
+        for (item, _), send_result in zip(deliverable, send_results):
+            if send_result.success:
+                NotificationService.mark_sent(item)
+                result["sent"] += 1
+            elif send_result.token_invalid:
+                # الرمز مُسح من المستخدم داخل send_many
+                NotificationService.mark_skipped(item, send_result.error_code or "INVALID_TOKEN")
+                result["skipped"] += 1
+            else:
+                error = send_result.error_code or send_result.error or "FCM send failed"
+                NotificationService._record_failure(item, error, result)
+
+        db.commit()
+        return result
+
+    @staticmethod
+    def get_outbox_stats(db: Session) -> Dict:
+        """عدد الإشعارات حسب الحالة + عدد المستحق للإرسال الآن"""
+        by_status = dict(
+            db.query(NotificationOutbox.status, func.count(NotificationOutbox.id))
+            .group_by(NotificationOutbox.status)
+            .all()
+        )
+        due = (
+            db.query(func.count(NotificationOutbox.id))
+            .filter(
+                NotificationOutbox.status == NotificationStatus.PENDING,
+                NotificationOutbox.next_attempt_at <= datetime.now(),
+            )
+            .scalar()
+        )
+        return {
+            "by_status": {status.value: by_status.get(status, 0) for status in NotificationStatus},
+            "due": due,
+        }
+
+    @staticmethod
+    def requeue_dead(db: Session, ids: Optional[List[int]] = None) -> int:
+        """إعادة إشعارات dead-letter إلى الطابور (كلها أو المحددة)"""
+        query = db.query(NotificationOutbox).filter(NotificationOutbox.status == NotificationStatus.DEAD)
+        if ids:
+            query = query.filter(NotificationOutbox.id.in_(ids))
+        count = query.update(
+            {
+                NotificationOutbox.status: NotificationStatus.PENDING,
+                NotificationOutbox.attempts: 0,
+                NotificationOutbox.next_attempt_at: datetime.now(),
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+        return count
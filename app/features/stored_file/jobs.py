@@ -0,0 +1,19 @@
+from app.core.database import SessionLocal
+from app.features.stored_file.service import StoredFileService
+
+
+def run_upload_gc():
+    """المهمة الدورية: حذف الملفات المرفوعة التي لم تعد مستخدمة."""
+    db = SessionLocal()
+    try:
+        result = StoredFileService.collect_garbage(db)
+        if result["deleted"] or result["recounted"]:
+            print(
+                f"✓ Upload GC: {result['deleted']} file(s) deleted ({result['bytes']} bytes), "
+                f"{result['recounted']} reference count(s) corrected"
+            )
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
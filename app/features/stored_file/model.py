@@ -0,0 +1,19 @@
+from sqlalchemy import Column, DateTime, Integer, String
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class StoredFile(Base):
+    """
+    ملف مرفوع محفوظ حسب محتواه (uploads/<dir>/<sha256>.<ext>).
+    ref_count: عدد الصفوف التي تشير إلى المسار في licenses / license_renewals / license_replacements.
+    """
+    __tablename__ = "stored_files"
+
+    id = Column(Integer, primary_key=True)
+    path = Column(String, unique=True, nullable=False)
+    sha256 = Column(String(64), index=True, nullable=False)
+    size = Column(Integer, nullable=False)
+    file_type = Column(String, nullable=False)  # jpeg / png / pdf ... (من محتوى الملف)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, server_default=func.now(), nullable=False)
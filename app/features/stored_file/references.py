@@ -0,0 +1,63 @@
+"""
+عدّ مراجع الملفات المرفوعة تلقائياً (stored_files.ref_count).
+
+بعد كل flush تُحسب التغييرات على أعمدة المسارات (reference_columns) في الصفوف الجديدة
+والمعدلة والمحذوفة، ويُعدل ref_count في نفس المعاملة. التحديثات الجماعية (query.update)
+لا تمر عبر الأحداث، لذلك يتحقق GC من المراجع الفعلية قبل حذف أي ملف.
+"""
+from collections import defaultdict
+from typing import Dict, List
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.features.stored_file.service import StoredFileService, reference_columns
+
+_columns_by_model: Dict[type, List[str]] = {}
+
+
+def _load_previous_value(target, value, oldvalue, initiator):
+    return value
+
+
+for _column in reference_columns():
+    _columns_by_model.setdefault(_column.class_, []).append(_column.key)
+    # active_history: تحميل القيمة السابقة عند التعديل بعد commit (وإلا لا تظهر في history.deleted)
+    event.listen(_column, "set", _load_previous_value, active_history=True, retval=True)
+
+
+def _tracked_columns(obj) -> List[str]:
+    return _columns_by_model.get(type(obj), [])
+
+
+@event.listens_for(Session, "after_flush")
+def _update_reference_counts(session: Session, flush_context):
+    deltas: Dict[str, int] = defaultdict(int)
+    for obj in session.new:
+        for key in _tracked_columns(obj):
+            value = getattr(obj, key)
+            if value:
+                deltas[value] += 1
+    for obj in session.dirty:
+        keys = _tracked_columns(obj)
+        if not keys:
+            continue
+        state = inspect(obj)
+        for key in keys:
+            history = state.attrs[key].history
+            for value in history.added:
+                if value:
+                    deltas[value] += 1
+            for value in history.deleted:
+                if value:
+                    deltas[value] -= 1
+    for obj in session.deleted:
+        keys = _tracked_columns(obj)
+        if not keys:
+            continue
+        state = inspect(obj)
+        for key in keys:
+            history = state.attrs[key].history
+            for value in (history.deleted or history.unchanged):
+                if value:
+                    deltas[value] -= 1
+    if deltas:
+        StoredFileService.apply_reference_deltas(session.connection(), deltas)
@@ -0,0 +1,170 @@
+"""
+الملفات المرفوعة المحفوظة حسب المحتوى: التسجيل، عدّ المراجع، وحذف الملفات غير المستخدمة.
+"""
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from sqlalchemy import bindparam, delete, func, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.features.stored_file.model import StoredFile
+
+
+def reference_columns() -> List:
+    """الأعمدة التي تشير إلى ملفات مرفوعة"""
+    from app.features.license.model import License
+    from app.features.license_renewal.model import LicenseRenewal
+    from app.features.license_replacement.model import LicenseReplacement
+
+    return [
+        License.photo_path,
+        License.residence_certificate_path,
+        License.birth_certificate_path,
+        License.passport_image_path,
+        License.signature_image_path,
+        LicenseRenewal.new_photo_path,
+        LicenseReplacement.police_report_path,
+    ]
+
+
+class StoredFileService:
+    # عدادات لكل worker
+    STATS: Dict[str, int] = {"stored": 0, "deduplicated": 0, "hard_linked": 0}
+
+    @staticmethod
+    def register(db: Session, path: str, sha256: str, size: int, file_type: str) -> bool:
+        """
+        تسجيل الملف قبل نقله إلى مكانه. إذا كان مسجلاً يُجدد created_at حتى لا يحذفه GC
+        أثناء إعادة استخدامه. يرجع True إذا كان الملف مسجلاً من قبل.
+        """
+        now = datetime.now()
+        touched = db.execute(
+            update(StoredFile).where(StoredFile.path == path).values(created_at=now)
+        ).rowcount
+        if not touched:
+            db.add(StoredFile(path=path, sha256=sha256, size=size, file_type=file_type, ref_count=0, created_at=now))
+        try:
+            db.commit()
+        except IntegrityError:
+            # رفع متزامن لنفس المحتوى سجله أولاً
+            db.rollback()
+            touched = True
+        return bool(touched)
+
+    @staticmethod
+    def find_same_content(db: Session, sha256: str, exclude_path: str) -> Optional[str]:
+        """مسار آخر بنفس المحتوى (مجلد آخر) لإنشاء hard link بدلاً من نسخة جديدة"""
+        return (
+            db.query(StoredFile.path)
+            .filter(StoredFile.sha256 == sha256, StoredFile.path != exclude_path)
+            .limit(1)
+            .scalar()
+        )
+
+    @staticmethod
+    def apply_reference_deltas(connection: Connection, deltas: Dict[str, int]):
+        """تعديل ref_count داخل نفس معاملة التغيير (المسارات غير المسجلة تُتجاهل)"""
+        params = [{"target_path": path, "delta": delta} for path, delta in deltas.items() if delta]
+        if not params:
+            return
+        connection.execute(
+            update(StoredFile)
+            .where(StoredFile.path == bindparam("target_path"))
+            .values(ref_count=StoredFile.ref_count + bindparam("delta")),
+            params,
+        )
+
+    @staticmethod
+    def count_references(db: Session, paths: List[str]) -> Dict[str, int]:
+        """العدد الفعلي للصفوف التي تشير لكل مسار (استعلام تجميعي لكل عمود)"""
+        counts: Dict[str, int] = {}
+        if not paths:
+            return counts
+        for column in reference_columns():
+            for path, count in (
+                db.query(column, func.count()).filter(column.in_(paths)).group_by(column).all()
+            ):
+                counts[path] = counts.get(path, 0) + count
+        return counts
+
+    @staticmethod
+    def _reused_since(path: str, cutoff: datetime) -> bool:
+        """رُفع نفس المحتوى بعد cutoff (الرفع المكرر يجدد وقت تعديل الملف)"""
+        try:
+            return datetime.fromtimestamp(os.path.getmtime(path)) >= cutoff
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def _remove_file(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def collect_garbage(db: Session) -> Dict[str, int]:
+        """
+        حذف الملفات غير المستخدمة: ref_count = 0 وأقدم من UPLOAD_GC_GRACE_HOURS
+        (مهلة بين رفع الملف وإرسال الطلب الذي يشير إليه).
+        ref_count يُتحقق منه بالمراجع الفعلية قبل الحذف ويُصحح إذا كان خاطئاً.
+        """
+        from app.services.image_processing import PRINT_VARIANT, THUMB_VARIANT, ImageProcessor, derived_path
+
+        cutoff = datetime.now() - timedelta(hours=settings.UPLOAD_GC_GRACE_HOURS)
+        candidates = (
+            db.query(StoredFile)
+            .filter(StoredFile.ref_count <= 0, StoredFile.created_at < cutoff)
+            .order_by(StoredFile.id)
+            .limit(settings.UPLOAD_GC_BATCH_SIZE)
+            .all()
+        )
+        result = {"checked": len(candidates), "deleted": 0, "bytes": 0, "recounted": 0}
+        if not candidates:
+            return result
+
+        counts = StoredFileService.count_references(db, [c.path for c in candidates])
+        removed = []
+        for candidate in candidates:
+            if counts.get(candidate.path):
+                candidate.ref_count = counts[candidate.path]
+                result["recounted"] += 1
+                continue
+            # شرط الحذف يُعاد في SQL: رفع مكرر جدد created_at بعد القراءة
+            deleted = db.execute(
+                delete(StoredFile).where(
+                    StoredFile.id == candidate.id,
+                    StoredFile.ref_count <= 0,
+                    StoredFile.created_at < cutoff,
+                )
+            ).rowcount
+            if deleted:
+                removed.append(candidate)
+        db.commit()
+
+        for stored in removed:
+            # يُعاد رفعه الآن: الأصل ومشتقاته تبقى معاً (المشتقات تحتفظ بوقت تعديلها القديم)
+            if StoredFileService._reused_since(stored.path, cutoff):
+                continue
+            if StoredFileService._remove_file(stored.path):
+                result["deleted"] += 1
+                result["bytes"] += stored.size
+            variants = [derived_path(stored.path, variant) for variant in (PRINT_VARIANT, THUMB_VARIANT)]
+            for variant in variants:
+                StoredFileService._remove_file(variant)
+            ImageProcessor.forget(*variants)
+        return result
+
+    @staticmethod
+    def get_stats(db: Session) -> Dict:
+        files, total_bytes = db.query(func.count(StoredFile.id), func.sum(StoredFile.size)).one()
+        unreferenced = db.query(func.count(StoredFile.id)).filter(StoredFile.ref_count <= 0).scalar()
+        return {
+            "files": files,
+            "total_bytes": total_bytes or 0,
+            "unreferenced": unreferenced,
+            **StoredFileService.STATS,
+        }
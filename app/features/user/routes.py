@@ -2,11 +2,18 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.core.database import get_db
-from app.core.dependencies import get_current_user, require_role
+from app.core.dependencies import (
+    CurrentUser,
+    get_current_user,
+    get_current_user_record,
+    get_current_user_record_async,
+    require_role,
+)
 from app.features.user.model import User
 from app.models.enums import UserRole
 from app.features.user.schema import UserResponse, UserUpdate, ChangePassword
 from app.features.user.service import UserService
+from app.services.fcm_service import FCMService
 from pydantic import BaseModel
 
 class FCMTokenUpdate(BaseModel):
@@ -15,12 +22,12 @@ class FCMTokenUpdate(BaseModel):
 router = APIRouter()
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: User = Depends(get_current_user_record_async)):
     """الحصول على معلومات المستخدم الحالي"""
     return current_user
 
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+def get_user(user_id: int, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_user)):
     """الحصول على معلومات مستخدم"""
     if current_user.role == UserRole.CITIZEN and current_user.id != user_id:
         raise HTTPException(status_code=403, detail="ليس لديك صلاحية للوصول")
@@ -34,7 +41,7 @@ def get_user(user_id: int, db: Session = Depends(get_db), current_user: User = D
 def update_current_user(
     user_data: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """تحديث بيانات المستخدم الحالي"""
     updated_user = UserService.update_user(db, current_user.id, user_data)
@@ -43,10 +50,10 @@ def update_current_user(
     return updated_user
 
 @router.post("/change-password")
-def change_password(
+async def change_password(
     password_data: ChangePassword,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """تغيير كلمة المرور"""
     try:
@@ -86,7 +93,7 @@ def change_password(
                 detail="كلمة المرور الجديدة يجب أن تكون مختلفة عن الحالية"
             )
         
-        success = UserService.change_password(
+        success = await UserService.change_password_async(
             db, 
             current_user.id, 
             password_data.current_password, 
@@ -115,7 +122,7 @@ def change_password(
 def update_fcm_token(
     fcm_token_data: FCMTokenUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user_record)
 ):
     """تحديث رمز FCM للمستخدم"""
     if not fcm_token_data.fcm_token:
@@ -125,8 +132,14 @@ def update_fcm_token(
         )
     
     old_token = current_user.fcm_token
+    # نفس الجهاز لا يستقبل إشعارات حساب آخر (تبديل الحساب على نفس الجهاز)
+    db.query(User).filter(
+        User.fcm_token == fcm_token_data.fcm_token,
+        User.id != current_user.id,
+    ).update({User.fcm_token: None}, synchronize_session=False)
     current_user.fcm_token = fcm_token_data.fcm_token
     db.commit()
+    FCMService.record_token_update(old_token, fcm_token_data.fcm_token)
     db.refresh(current_user)
     
     print(f"✓ FCM Token updated for User ID: {current_user.id}, National ID: {current_user.national_id}")
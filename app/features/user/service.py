@@ -1,7 +1,14 @@
 from sqlalchemy.orm import Session
 from app.features.user.model import User
 from app.features.user.schema import UserCreate, UserUpdate
-from app.core.security import get_password_hash, verify_password
+from fastapi.concurrency import run_in_threadpool
+from app.core.security import (
+    get_password_hash,
+    get_password_hash_async,
+    password_needs_rehash,
+    verify_password,
+    verify_password_async,
+)
 from app.models.enums import UserRole
 from typing import Optional
 
@@ -9,6 +16,19 @@ class UserService:
     @staticmethod
     def create_user(db: Session, user_data: UserCreate, role: UserRole = UserRole.CITIZEN) -> User:
         """إنشاء مستخدم جديد"""
+        UserService.validate_new_user(db, user_data, role)
+        return UserService._add_user(db, user_data, role, get_password_hash(user_data.password))
+
+    @staticmethod
+    async def create_user_async(db: Session, user_data: UserCreate, role: UserRole = UserRole.CITIZEN) -> User:
+        """إنشاء مستخدم جديد (التشفير في مجموعة خيوط bcrypt وعمليات قاعدة البيانات في threadpool)"""
+        await run_in_threadpool(UserService.validate_new_user, db, user_data, role)
+        hashed_password = await get_password_hash_async(user_data.password)
+        return await run_in_threadpool(UserService._add_user, db, user_data, role, hashed_password)
+
+    @staticmethod
+    def validate_new_user(db: Session, user_data: UserCreate, role: UserRole) -> None:
+        """التحقق من بيانات المستخدم الجديد قبل التشفير والحفظ"""
         # التحقق من وجود مستخدم بنفس الرقم الوطني (للمواطنين)
         if user_data.national_id:
             existing_user = db.query(User).filter(
@@ -37,8 +57,9 @@ class UserService:
         # للمواطنين: يجب وجود national_id
         if role == UserRole.CITIZEN and not user_data.national_id:
             raise ValueError("يجب إدخال الرقم الوطني للمواطنين")
-        
-        hashed_password = get_password_hash(user_data.password)
+
+    @staticmethod
+    def _add_user(db: Session, user_data: UserCreate, role: UserRole, hashed_password: str) -> User:
         db_user = User(
             national_id=user_data.national_id,
             username=user_data.username,
@@ -82,22 +103,52 @@ class UserService:
         return db_user
     
     @staticmethod
-    def authenticate_user(db: Session, username_or_national_id: str, password: str) -> Optional[User]:
-        """المصادقة على المستخدم - يدعم اسم المستخدم للإداريين والرقم الوطني للمواطنين"""
+    def find_login_user(db: Session, username_or_national_id: str) -> Optional[User]:
+        """البحث عن المستخدم - اسم المستخدم للإداريين والرقم الوطني للمواطنين"""
         # البحث أولاً باسم المستخدم (للإداريين)
         user = db.query(User).filter(User.username == username_or_national_id).first()
         
         # إذا لم يوجد، البحث بالرقم الوطني (للمواطنين)
         if not user:
             user = db.query(User).filter(User.national_id == username_or_national_id).first()
-        
+        return user
+
+    @staticmethod
+    def authenticate_user(db: Session, username_or_national_id: str, password: str) -> Optional[User]:
+        """المصادقة على المستخدم - يدعم اسم المستخدم للإداريين والرقم الوطني للمواطنين"""
+        user = UserService.find_login_user(db, username_or_national_id)
         if not user:
             return None
         
         if not verify_password(password, user.password_hash):
             return None
+
+        if password_needs_rehash(user.password_hash):
+            user.password_hash = get_password_hash(password)
+            db.commit()
         
         return user
+
+    @staticmethod
+    async def authenticate_user_async(db: Session, username_or_national_id: str, password: str) -> Optional[User]:
+        """
+        المصادقة على المستخدم بدون حجز threadpool أثناء bcrypt.
+        إذا تغير BCRYPT_ROUNDS يُعاد تشفير كلمة المرور بالإعداد الجديد بعد نجاح التحقق.
+        """
+        user = await run_in_threadpool(UserService.find_login_user, db, username_or_national_id)
+        if not user:
+            return None
+
+        if not await verify_password_async(password, user.password_hash):
+            return None
+
+        if password_needs_rehash(user.password_hash):
+            user.password_hash = await get_password_hash_async(password)
+            await run_in_threadpool(db.commit)
+            # commit ينهي صلاحية الكائن (expire_on_commit): إعادة التحميل هنا وليس عند القراءة في event loop
+            await run_in_threadpool(db.refresh, user)
+
+        return user
     
     @staticmethod
     def change_password(db: Session, user_id: int, current_password: str, new_password: str) -> bool:
@@ -113,6 +164,20 @@ class UserService:
         db.commit()
         return True
 
+    @staticmethod
+    async def change_password_async(db: Session, user_id: int, current_password: str, new_password: str) -> bool:
+        """تغيير كلمة المرور (bcrypt في مجموعة الخيوط المخصصة)"""
+        user = await run_in_threadpool(UserService.get_user_by_id, db, user_id)
+        if not user:
+            return False
+
+        if not await verify_password_async(current_password, user.password_hash):
+            return False
+
+        user.password_hash = await get_password_hash_async(new_password)
+        await run_in_threadpool(db.commit)
+        return True
+
 
 
 
@@ -129,3 +194,42 @@ class UserService:
 
 
 
+
+    @staticmethod
+    def ensure_default_admin(db: Session) -> None:
+        """
+        إنشاء حساب admin الافتراضي إذا لم يكن موجوداً (مرحلة الإقلاع / pre-start).
+        الحالة المعتادة استعلام واحد فقط؛ تشفير bcrypt يحدث عند الإنشاء فقط.
+        """
+        # البحث أولاً باسم المستخدم، ثم بالرقم الوطني (للتوافق مع الإصدارات القديمة)
+        admin = (
+            db.query(User)
+            .filter((User.username == 'admin') | (User.national_id == 'admin'))
+            .order_by((User.username == 'admin').desc())
+            .first()
+        )
+
+        if not admin:
+            admin = User(
+                username='admin',
+                national_id=None,  # الإداريون لا يحتاجون رقم وطني
+                phone='1234567890',
+                password_hash=get_password_hash('admin123'),
+                role=UserRole.SUPER_ADMIN,
+                is_active=True
+            )
+            db.add(admin)
+            db.commit()
+            print("Created default admin account")
+            print("  national_id: admin")
+            print("  password: admin123")
+            return
+
+        # إذا كان الحساب موجوداً لكن ليس super_admin (مثلاً تم إنشاءه كمواطن عبر التسجيل)،
+        # نرفعه تلقائياً لتفادي مشكلة "لا يدخل لوحة الأدمن" عند تسجيل الدخول.
+        if admin.role != UserRole.SUPER_ADMIN or not admin.is_active:
+            admin.role = UserRole.SUPER_ADMIN
+            admin.is_active = True
+            db.commit()
+            print("Updated existing 'admin' account to SUPER_ADMIN and ensured it is active")
+            print("  national_id: admin")
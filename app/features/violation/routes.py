@@ -1,8 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.core.database import get_db
-from app.core.dependencies import get_current_user, require_role
+from app.core.database import get_async_db, get_db
+from app.core.replica import get_read_db
+from app.core.dependencies import (
+    CurrentUser,
+    get_current_user,
+    get_current_user_async,
+    require_role,
+    require_role_async,
+)
 from app.features.user.model import User
 from app.models.enums import UserRole, ViolationStatus
 from app.features.violation.schema import (
@@ -34,7 +42,7 @@ router = APIRouter()
 def create_violation(
     violation_data: ViolationCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.VIOLATION_OFFICER, UserRole.TRAFFIC_POLICE]))
+    current_user: CurrentUser = Depends(require_role([UserRole.VIOLATION_OFFICER, UserRole.TRAFFIC_POLICE]))
 ):
     """إنشاء مخالفة جديدة"""
     try:
@@ -48,7 +56,7 @@ def create_violation(
 def get_violation_types_for_officer(
     include_inactive: bool = False,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.VIOLATION_OFFICER, UserRole.TRAFFIC_POLICE])),
+    current_user: CurrentUser = Depends(require_role([UserRole.VIOLATION_OFFICER, UserRole.TRAFFIC_POLICE])),
 ):
     """الحصول على قائمة أنواع المخالفات لمسؤول المخالفات"""
     return ViolationTypeService.get_all_violation_types(db, include_inactive=include_inactive)
@@ -58,7 +66,7 @@ def get_violation_types_for_officer(
 def create_violation_type_for_officer(
     data: ViolationTypeCreate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.VIOLATION_OFFICER])),  # فقط مسؤول المخالفات يمكنه إنشاء أنواع
+    current_user: CurrentUser = Depends(require_role([UserRole.VIOLATION_OFFICER])),  # فقط مسؤول المخالفات يمكنه إنشاء أنواع
 ):
     """إنشاء نوع مخالفة جديد (مسؤول المخالفات)"""
     try:
@@ -72,7 +80,7 @@ def update_violation_type_for_officer(
     violation_type_id: int,
     data: ViolationTypeUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.VIOLATION_OFFICER])),  # فقط مسؤول المخالفات يمكنه التعديل
+    current_user: CurrentUser = Depends(require_role([UserRole.VIOLATION_OFFICER])),  # فقط مسؤول المخالفات يمكنه التعديل
 ):
     """تحديث نوع مخالفة (مسؤول المخالفات)"""
     try:
@@ -88,7 +96,7 @@ def update_violation_type_for_officer(
 def delete_violation_type_for_officer(
     violation_type_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.VIOLATION_OFFICER])),  # فقط مسؤول المخالفات يمكنه الحذف
+    current_user: CurrentUser = Depends(require_role([UserRole.VIOLATION_OFFICER])),  # فقط مسؤول المخالفات يمكنه الحذف
 ):
     """حذف نوع مخالفة (مسؤول المخالفات)"""
     success = ViolationTypeService.delete_violation_type(db, violation_type_id)
@@ -98,23 +106,17 @@ def delete_violation_type_for_officer(
 
 
 @router.get("/by-license/{license_number}", response_model=ViolationsByLicenseResponse)
-def get_violations_by_license_number(
+async def get_violations_by_license_number(
     license_number: str,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.VIOLATION_OFFICER, UserRole.TRAFFIC_POLICE])),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(require_role_async([UserRole.VIOLATION_OFFICER, UserRole.TRAFFIC_POLICE])),
 ):
     """الاستعلام عن المخالفات حسب رقم الرخصة"""
-    license = LicenseService.get_license_by_number(db, license_number)
+    license = await LicenseService.get_license_by_number_async(db, license_number)
     if not license:
         raise HTTPException(status_code=404, detail="الرخصة غير موجودة")
 
-    from app.features.violation.model import Violation
-    violations = (
-        db.query(Violation)
-        .filter(Violation.license_id == license.id)
-        .order_by(Violation.violation_date.desc())
-        .all()
-    )
+    violations = await ViolationService.get_license_violations_async(db, license.id)
 
     return {
         "license": {
@@ -133,7 +135,7 @@ def get_violations_by_license_number(
 def create_violation_by_license_number(
     data: ViolationCreateByLicenseNumber,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.VIOLATION_OFFICER, UserRole.TRAFFIC_POLICE])),
+    current_user: CurrentUser = Depends(require_role([UserRole.VIOLATION_OFFICER, UserRole.TRAFFIC_POLICE])),
 ):
     """إضافة مخالفة عبر رقم الرخصة واختيار نوع المخالفة"""
     license = LicenseService.get_license_by_number(db, data.license_number)
@@ -162,7 +164,7 @@ def create_violation_by_license_number(
 def get_violations_by_national_id(
     national_id: str,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.VIOLATION_OFFICER, UserRole.TRAFFIC_POLICE, UserRole.LICENSE_OFFICER])),
+    current_user: CurrentUser = Depends(require_role([UserRole.VIOLATION_OFFICER, UserRole.TRAFFIC_POLICE, UserRole.LICENSE_OFFICER])),
 ):
     """الاستعلام عن المخالفات حسب الرقم الوطني (مربوطة بالمواطن)"""
     citizen = db.query(User).filter(User.national_id == national_id).first()
@@ -189,7 +191,7 @@ def get_violations_by_national_id(
 def create_violation_by_national_id(
     data: ViolationCreateByNationalId,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.VIOLATION_OFFICER, UserRole.TRAFFIC_POLICE])),
+    current_user: CurrentUser = Depends(require_role([UserRole.VIOLATION_OFFICER, UserRole.TRAFFIC_POLICE])),
 ):
     """إضافة مخالفة عبر الرقم الوطني (بدون الحاجة لرقم الرخصة)"""
     citizen = db.query(User).filter(User.national_id == data.national_id).first()
@@ -232,19 +234,19 @@ def create_violation_by_national_id(
     return violation
 
 @router.get("/my-violations", response_model=List[ViolationResponse])
-def get_my_violations(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def get_my_violations(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(get_current_user_async)
 ):
     """الحصول على جميع مخالفات المستخدم الحالي"""
-    violations = ViolationService.get_user_violations(db, current_user.id)
+    violations = await ViolationService.get_user_violations_async(db, current_user.id)
     return violations
 
 @router.get("/", response_model=List[ViolationResponse])
 def get_all_violations(
     status: Optional[ViolationStatus] = None,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.VIOLATION_OFFICER, UserRole.TRAFFIC_POLICE]))
+    current_user: CurrentUser = Depends(require_role([UserRole.VIOLATION_OFFICER, UserRole.TRAFFIC_POLICE]))
 ):
     """الحصول على جميع المخالفات"""
     violations = ViolationService.get_all_violations(db, status)
@@ -254,7 +256,7 @@ def get_all_violations(
 def pay_violation(
     violation_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.VIOLATION_OFFICER, UserRole.TRAFFIC_POLICE, UserRole.LICENSE_OFFICER])),
+    current_user: CurrentUser = Depends(require_role([UserRole.VIOLATION_OFFICER, UserRole.TRAFFIC_POLICE, UserRole.LICENSE_OFFICER])),
 ):
     """دفع مخالفة (مسؤول المخالفات أو مسؤول الرخص) - تتحول الحالة إلى PAID وتبقى في سجل المواطن"""
     vio = ViolationService.mark_paid(db, violation_id, current_user.id)
@@ -267,7 +269,7 @@ def pay_violation(
 def get_payment_receipt(
     violation_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.VIOLATION_OFFICER, UserRole.LICENSE_OFFICER])),
+    current_user: CurrentUser = Depends(require_role([UserRole.VIOLATION_OFFICER, UserRole.LICENSE_OFFICER])),
 ):
     """الحصول على إيصال دفع مخالفة"""
     violation = ViolationService.get_violation_by_id(db, violation_id)
@@ -310,7 +312,7 @@ def cancel_violation(
     violation_id: int,
     cancel_data: ViolationCancelRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.VIOLATION_OFFICER])),
+    current_user: CurrentUser = Depends(require_role([UserRole.VIOLATION_OFFICER])),
 ):
     """إلغاء مخالفة"""
     try:
@@ -329,7 +331,7 @@ def modify_violation(
     violation_id: int,
     modify_data: ViolationModifyRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.VIOLATION_OFFICER])),
+    current_user: CurrentUser = Depends(require_role([UserRole.VIOLATION_OFFICER])),
 ):
     """تعديل مخالفة (فقط قبل الدفع)"""
     try:
@@ -350,8 +352,9 @@ def get_violation_statistics(
     end_date: Optional[datetime] = None,
     officer_id: Optional[int] = None,
     period: Optional[str] = None,  # 'today', 'week', 'month', 'year'
-    db: Session = Depends(get_db),
-    current_user: User = Depends(require_role([UserRole.VIOLATION_OFFICER])),
+    breakdown: Optional[List[str]] = Query(None, description="تفصيل إضافي: day / type / officer"),
+    db: Session = Depends(get_read_db),
+    current_user: CurrentUser = Depends(require_role([UserRole.VIOLATION_OFFICER])),
 ):
     """الحصول على إحصائيات المخالفات"""
     # حساب التواريخ حسب الفترة المحددة
@@ -374,7 +377,7 @@ def get_violation_statistics(
     if current_user.role != UserRole.SUPER_ADMIN:
         officer_id = current_user.id
     
-    stats = ViolationService.get_violation_statistics(db, start_date, end_date, officer_id)
+    stats = ViolationService.get_violation_statistics(db, start_date, end_date, officer_id, breakdown)
     return stats
 
 
@@ -382,7 +385,7 @@ def get_violation_statistics(
 def get_violation(
     violation_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """الحصول على مخالفة"""
     violation = ViolationService.get_violation_by_id(db, violation_id)
@@ -399,7 +402,7 @@ def update_violation(
     violation_id: int,
     violation_data: ViolationUpdate,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     """تحديث مخالفة"""
     violation = ViolationService.get_violation_by_id(db, violation_id)
@@ -126,6 +126,15 @@ class PaymentReceiptResponse(BaseModel):
     officer_username: Optional[str] = None
 
 
+class ViolationStatisticsBucket(BaseModel):
+    key: str  # اليوم (YYYY-MM-DD) / رقم نوع المخالفة / رقم الموظف
+    label: Optional[str] = None
+    total_violations: int
+    paid_violations: int
+    total_amount: Decimal
+    paid_amount: Decimal
+
+
 class ViolationStatisticsResponse(BaseModel):
     total_violations: int
     pending_violations: int
@@ -136,6 +145,10 @@ class ViolationStatisticsResponse(BaseModel):
     pending_amount: Decimal
     period_start: Optional[datetime] = None
     period_end: Optional[datetime] = None
+    # تفاصيل اختيارية (عند طلبها عبر breakdown)
+    by_day: Optional[List[ViolationStatisticsBucket]] = None
+    by_type: Optional[List[ViolationStatisticsBucket]] = None
+    by_officer: Optional[List[ViolationStatisticsBucket]] = None
 
 
 
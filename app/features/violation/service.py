@@ -1,17 +1,31 @@
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+from sqlalchemy import func, case, select
 from app.features.violation.model import Violation
-from app.features.violation.schema import ViolationCreate, ViolationUpdate
+from app.core.projection import model_columns
+from app.features.violation.schema import ViolationCreate, ViolationResponse, ViolationUpdate
 from app.models.enums import ViolationStatus
-from typing import Optional, List, Dict
+from typing import Any, Optional, List, Dict
 from datetime import datetime
 from decimal import Decimal
 import random
 import string
 
 from app.features.violation_type.model import ViolationType
+from app.features.notification.service import NotificationService
 
 class ViolationService:
+    # أعمدة view=summary لقائمة المخالفات
+    SUMMARY_FIELDS = [
+        "id", "violation_number", "user_id", "license_id", "violation_type",
+        "violation_date", "fine_amount", "status",
+    ]
+
+    @staticmethod
+    def projection_fields() -> Dict[str, Any]:
+        """الأعمدة المسموحة في fields= لقائمة المخالفات"""
+        return model_columns(Violation, ViolationResponse.model_fields)
+
     @staticmethod
     def generate_violation_number() -> str:
         """إنشاء رقم مخالفة فريد"""
@@ -69,50 +83,27 @@ class ViolationService:
             created_at=datetime.now()
         )
         db.add(db_violation)
+        db.flush()
+
+        # إشعار المواطن عند إضافة المخالفة (يُحفظ في صندوق الإشعارات مع نفس المعاملة ويرسله المرسل الخلفي)
+        NotificationService.enqueue(
+            db,
+            user_id=violation_data.user_id,
+            title="تم إضافة مخالفة جديدة",
+            body=f"تم إضافة مخالفة جديدة برقم {db_violation.violation_number}. نوع المخالفة: {violation_type_name}. المبلغ: {fine_amount} دينار",
+            data={
+                "type": "violation_created",
+                "violation_id": str(db_violation.id),
+                "violation_number": db_violation.violation_number,
+                "violation_type": violation_type_name,
+                "fine_amount": str(fine_amount),
+                "location": violation_data.location,
+                "violation_date": violation_data.violation_date.isoformat() if isinstance(violation_data.violation_date, datetime) else str(violation_data.violation_date)
+            },
+        )
         db.commit()
         db.refresh(db_violation)
         
-        # إرسال إشعار للمواطن عند إضافة المخالفة
-        print(f"🔔 Attempting to send violation notification for violation {db_violation.id} to user {violation_data.user_id}")
-        try:
-            from app.services.fcm_service import FCMService
-            from app.features.user.model import User
-            
-            # التحقق من وجود المستخدم أولاً
-            user = db.query(User).filter(User.id == violation_data.user_id).first()
-            if not user:
-                print(f"⚠️ User {violation_data.user_id} not found - cannot send notification")
-            elif not user.fcm_token:
-                print(f"⚠️ User {violation_data.user_id} (national_id: {user.national_id}) has no FCM token registered. User must login to the mobile app first to receive notifications.")
-            else:
-                print(f"📱 User {violation_data.user_id} has FCM token - proceeding with notification")
-                notification_sent = FCMService.send_notification_to_user(
-                    user_id=violation_data.user_id,
-                    title="تم إضافة مخالفة جديدة",
-                    body=f"تم إضافة مخالفة جديدة برقم {db_violation.violation_number}. نوع المخالفة: {violation_type_name}. المبلغ: {fine_amount} دينار",
-                    data={
-                        "type": "violation_created",
-                        "violation_id": str(db_violation.id),
-                        "violation_number": db_violation.violation_number,
-                        "violation_type": violation_type_name,
-                        "fine_amount": str(fine_amount),
-                        "location": violation_data.location,
-                        "violation_date": violation_data.violation_date.isoformat() if isinstance(violation_data.violation_date, datetime) else str(violation_data.violation_date)
-                    },
-                    db=db
-                )
-                if notification_sent:
-                    print(f"✓ Violation notification sent successfully to User ID: {violation_data.user_id} for violation {db_violation.id} ({db_violation.violation_number})")
-                else:
-                    print(f"✗ Failed to send violation notification to User ID: {violation_data.user_id} for violation {db_violation.id}")
-        except ImportError as e:
-            print(f"⚠️ Failed to import FCMService: {e}")
-            print(f"⚠️ Make sure FCM service is properly configured. Check if service-account.json exists.")
-        except Exception as e:
-            import traceback
-            print(f"⚠️ Failed to send violation notification: {e}")
-            print(f"⚠️ Traceback: {traceback.format_exc()}")
-        
         return db_violation
     
     @staticmethod
@@ -124,6 +115,24 @@ class ViolationService:
     def get_user_violations(db: Session, user_id: int) -> List[Violation]:
         """الحصول على جميع مخالفات المستخدم"""
         return db.query(Violation).filter(Violation.user_id == user_id).all()
+
+    @staticmethod
+    async def get_user_violations_async(db: AsyncSession, user_id: int) -> List[Violation]:
+        result = await db.execute(select(Violation).where(Violation.user_id == user_id))
+        return list(result.scalars().all())
+
+    @staticmethod
+    async def get_license_violations_async(
+        db: AsyncSession,
+        license_id: int,
+        statuses: Optional[List[ViolationStatus]] = None,
+    ) -> List[Violation]:
+        """مخالفات رخصة (الأحدث أولاً)، مع تصفية اختيارية حسب الحالة"""
+        query = select(Violation).where(Violation.license_id == license_id)
+        if statuses:
+            query = query.where(Violation.status.in_(statuses))
+        result = await db.execute(query.order_by(Violation.violation_date.desc()))
+        return list(result.scalars().all())
     
     @staticmethod
     def get_all_violations(db: Session, status: Optional[ViolationStatus] = None) -> List[Violation]:
@@ -163,46 +172,23 @@ class ViolationService:
             db_violation.paid_at = datetime.now()
         db_violation.paid_by_user_id = paid_by_user_id
 
+        # إشعار المواطن بالدفع (في نفس المعاملة)
+        NotificationService.enqueue(
+            db,
+            user_id=db_violation.user_id,
+            title="تم دفع المخالفة بنجاح",
+            body=f"تم دفع المخالفة رقم {db_violation.violation_number} بنجاح. المبلغ: {db_violation.fine_amount} دينار",
+            data={
+                "type": "violation_paid",
+                "violation_id": str(db_violation.id),
+                "violation_number": db_violation.violation_number,
+                "fine_amount": str(db_violation.fine_amount),
+                "payment_date": db_violation.paid_at.isoformat() if db_violation.paid_at else None
+            },
+        )
         db.commit()
         db.refresh(db_violation)
         
-        # إرسال إشعار للمواطن الذي دفع المخالفة
-        try:
-            from app.services.fcm_service import FCMService
-            from app.features.user.model import User
-            
-            # التحقق من وجود المستخدم وFCM token
-            user = db.query(User).filter(User.id == db_violation.user_id).first()
-            if not user:
-                print(f"⚠️ User {db_violation.user_id} not found for violation {db_violation.id}")
-            elif not user.fcm_token:
-                print(f"⚠️ User {db_violation.user_id} (national_id: {user.national_id}) has no FCM token. User must login to the app first.")
-            else:
-                print(f"📤 Attempting to send payment notification to User ID: {db_violation.user_id}, FCM Token: {user.fcm_token[:20]}...")
-                notification_sent = FCMService.send_notification_to_user(
-                    user_id=db_violation.user_id,
-                    title="تم دفع المخالفة بنجاح",
-                    body=f"تم دفع المخالفة رقم {db_violation.violation_number} بنجاح. المبلغ: {db_violation.fine_amount} دينار",
-                    data={
-                        "type": "violation_paid",
-                        "violation_id": str(db_violation.id),
-                        "violation_number": db_violation.violation_number,
-                        "fine_amount": str(db_violation.fine_amount),
-                        "payment_date": db_violation.paid_at.isoformat() if db_violation.paid_at else None
-                    },
-                    db=db
-                )
-                if notification_sent:
-                    print(f"✓ Payment notification sent successfully to User ID: {db_violation.user_id} for violation {db_violation.id}")
-                else:
-                    print(f"✗ Failed to send payment notification to User ID: {db_violation.user_id} for violation {db_violation.id}")
-        except ImportError as e:
-            print(f"⚠️ Failed to import FCMService: {e}")
-        except Exception as e:
-            import traceback
-            print(f"⚠️ Failed to send payment notification: {e}")
-            print(f"⚠️ Traceback: {traceback.format_exc()}")
-        
         return db_violation
 
     @staticmethod
@@ -267,42 +253,95 @@ class ViolationService:
         db: Session,
         start_date: Optional[datetime] = None,
         end_date: Optional[datetime] = None,
-        officer_id: Optional[int] = None
+        officer_id: Optional[int] = None,
+        breakdown: Optional[List[str]] = None,
     ) -> Dict:
-        """الحصول على إحصائيات المخالفات"""
-        query = db.query(Violation)
-        
+        """
+        الحصول على إحصائيات المخالفات (تجميع في قاعدة البيانات بدون تحميل الصفوف).
+        breakdown: تفصيل اختياري حسب 'day' / 'type' / 'officer'.
+        """
+        filters = []
         # فلترة حسب التاريخ
         if start_date:
-            query = query.filter(Violation.created_at >= start_date)
+            filters.append(Violation.created_at >= start_date)
         if end_date:
-            query = query.filter(Violation.created_at <= end_date)
+            filters.append(Violation.created_at <= end_date)
         if officer_id:
-            query = query.filter(Violation.created_by == officer_id)
-        
-        all_violations = query.all()
-        
-        total = len(all_violations)
-        pending = len([v for v in all_violations if v.status == ViolationStatus.PENDING])
-        paid = len([v for v in all_violations if v.status == ViolationStatus.PAID])
-        cancelled = len([v for v in all_violations if v.status == ViolationStatus.CANCELLED])
-        
-        total_amount = sum(Decimal(str(v.fine_amount)) for v in all_violations)
-        paid_amount = sum(Decimal(str(v.fine_amount)) for v in all_violations if v.status == ViolationStatus.PAID)
-        pending_amount = sum(Decimal(str(v.fine_amount)) for v in all_violations if v.status == ViolationStatus.PENDING)
-        
-        return {
-            "total_violations": total,
-            "pending_violations": pending,
-            "paid_violations": paid,
-            "cancelled_violations": cancelled,
-            "total_amount": Decimal(str(total_amount)),
-            "paid_amount": Decimal(str(paid_amount)),
-            "pending_amount": Decimal(str(pending_amount)),
+            filters.append(Violation.created_by == officer_id)
+
+        by_status = {
+            status: (count, Decimal(str(amount or 0)))
+            for status, count, amount in (
+                db.query(Violation.status, func.count(Violation.id), func.sum(Violation.fine_amount))
+                .filter(*filters)
+                .group_by(Violation.status)
+                .all()
+            )
+        }
+        empty = (0, Decimal("0"))
+
+        stats = {
+            "total_violations": sum(count for count, _ in by_status.values()),
+            "pending_violations": by_status.get(ViolationStatus.PENDING, empty)[0],
+            "paid_violations": by_status.get(ViolationStatus.PAID, empty)[0],
+            "cancelled_violations": by_status.get(ViolationStatus.CANCELLED, empty)[0],
+            "total_amount": sum((amount for _, amount in by_status.values()), Decimal("0")),
+            "paid_amount": by_status.get(ViolationStatus.PAID, empty)[1],
+            "pending_amount": by_status.get(ViolationStatus.PENDING, empty)[1],
             "period_start": start_date,
             "period_end": end_date,
         }
 
+        breakdown = set(breakdown or [])
+        if "day" in breakdown:
+            day = func.date(Violation.created_at)
+            stats["by_day"] = ViolationService._statistics_breakdown(
+                db, filters, [day], lambda row: (str(row[0]), None)
+            )
+        if "type" in breakdown:
+            stats["by_type"] = ViolationService._statistics_breakdown(
+                db, filters, [Violation.violation_type_id, Violation.violation_type],
+                lambda row: (str(row[0]) if row[0] is not None else row[1], row[1]),
+            )
+        if "officer" in breakdown:
+            from app.features.user.model import User
+            stats["by_officer"] = ViolationService._statistics_breakdown(
+                db, filters, [Violation.created_by, User.username, User.national_id],
+                lambda row: (str(row[0]), row[1] or row[2]),
+                join=(User, User.id == Violation.created_by),
+            )
+        return stats
+
+    @staticmethod
+    def _statistics_breakdown(db: Session, filters: list, group_columns: list, key_label, join=None) -> List[Dict]:
+        """تفصيل العدد والمبالغ حسب أعمدة التجميع (استعلام GROUP BY واحد)."""
+        paid = Violation.status == ViolationStatus.PAID
+        query = db.query(
+            *group_columns,
+            func.count(Violation.id),
+            func.sum(Violation.fine_amount),
+            func.sum(case((paid, 1), else_=0)),
+            func.sum(case((paid, Violation.fine_amount), else_=0)),
+        ).select_from(Violation)
+        if join is not None:
+            query = query.outerjoin(*join)
+        rows = query.filter(*filters).group_by(*group_columns).order_by(*group_columns).all()
+
+        n = len(group_columns)
+        buckets = []
+        for row in rows:
+            key, label = key_label(row)
+            count, amount, paid_count, paid_amount = row[n:]
+            buckets.append({
+                "key": key,
+                "label": label,
+                "total_violations": count,
+                "paid_violations": int(paid_count or 0),
+                "total_amount": Decimal(str(amount or 0)),
+                "paid_amount": Decimal(str(paid_amount or 0)),
+            })
+        return buckets
+
 
 
 
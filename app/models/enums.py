@@ -52,7 +52,8 @@ class LicenseType(str, Enum):
     BUS = "bus"                # النوع الرابع
     DISABLED = "disabled"      # ذوي العاهات
 
-
-
-
-
+class NotificationStatus(str, Enum):
+    PENDING = "pending"  # بانتظار الإرسال (أو إعادة المحاولة بعد next_attempt_at)
+    SENT = "sent"
+    DEAD = "dead"  # فشل بعد استنفاد المحاولات (dead-letter)
+    SKIPPED = "skipped"  # لا يوجد جهاز صالح للمستخدم (لا رمز FCM أو رفضه FCM نهائياً)
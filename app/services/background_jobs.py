@@ -0,0 +1,100 @@
+"""
+مهام خلفية دورية (Background periodic jobs)
+كل مهمة تعمل في خيط daemon مستقل داخل عملية الـworker وتفتح جلسة قاعدة بيانات خاصة بها.
+"""
+import threading
+import traceback
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+
+class PeriodicJob:
+    """مهمة تُنفَّذ كل interval_seconds ثانية حتى يتم إيقافها."""
+
+    def __init__(
+        self,
+        name: str,
+        interval_seconds: float,
+        func: Callable[[], None],
+        run_immediately: bool = True,
+    ):
+        self.name = name
+        self.interval_seconds = max(1.0, float(interval_seconds))
+        self.func = func
+        self.run_immediately = run_immediately
+        self.runs = 0
+        self.last_run_at: Optional[datetime] = None
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"job-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def run_once(self):
+        try:
+            self.func()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"⚠️ Background job '{self.name}' failed: {e}")
+            print(f"⚠️ Traceback: {traceback.format_exc()}")
+        finally:
+            self.runs += 1
+            self.last_run_at = datetime.now()
+
+    def _run(self):
+        if not self.run_immediately:
+            self._stop.wait(self.interval_seconds)
+        while not self._stop.is_set():
+            self.run_once()
+            self._stop.wait(self.interval_seconds)
+
+    def get_status(self) -> dict:
+        return {
+            "name": self.name,
+            "interval_seconds": self.interval_seconds,
+            "running": bool(self._thread and self._thread.is_alive()),
+            "runs": self.runs,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+            "last_error": self.last_error,
+        }
+
+
+class BackgroundJobs:
+    """سجل المهام الخلفية في هذه العملية."""
+
+    JOBS: Dict[str, PeriodicJob] = {}
+
+    @staticmethod
+    def register(job: PeriodicJob) -> PeriodicJob:
+        existing = BackgroundJobs.JOBS.get(job.name)
+        if existing:
+            existing.stop()
+        BackgroundJobs.JOBS[job.name] = job
+        return job
+
+    @staticmethod
+    def start_all():
+        for job in BackgroundJobs.JOBS.values():
+            job.start()
+            print(f"✓ Background job started: {job.name} (every {job.interval_seconds:g}s)")
+
+    @staticmethod
+    def stop_all():
+        for job in BackgroundJobs.JOBS.values():
+            job.stop()
+
+    @staticmethod
+    def get_status() -> List[dict]:
+        return [job.get_status() for job in BackgroundJobs.JOBS.values()]
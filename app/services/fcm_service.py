@@ -4,9 +4,62 @@ Firebase Cloud Messaging Service - HTTP v1 API
 """
 import os
 import json
-from typing import Optional, Dict, Any
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from dataclasses import dataclass
+from typing import Optional, Dict, Any, List
 import requests
+from requests.adapters import HTTPAdapter
 from pathlib import Path
+from app.core.config import settings
+
+FCM_SCOPES = ['https://www.googleapis.com/auth/firebase.messaging']
+
+
+@dataclass
+class FCMMessage:
+    token: str
+    title: str
+    body: str
+    data: Optional[dict] = None
+
+
+@dataclass
+class FCMSendResult:
+    """نتيجة الإرسال لمستلم واحد"""
+    token: Optional[str]
+    success: bool
+    message_id: Optional[str] = None
+    status_code: Optional[int] = None
+    error_code: Optional[str] = None
+    error: Optional[str] = None
+    token_invalid: bool = False  # الرمز غير صالح/ملغى نهائياً (لا فائدة من إعادة المحاولة)
+
+
+# أخطاء FCM التي تعني أن رمز الجهاز لم يعد صالحاً
+INVALID_TOKEN_ERRORS = {"UNREGISTERED", "SENDER_ID_MISMATCH"}
+
+
+def classify_fcm_error(status_code: Optional[int], error_body: Any) -> tuple:
+    """
+    استخراج رمز الخطأ من رد FCM HTTP v1 وتحديد هل الرمز (token) غير صالح.
+    INVALID_ARGUMENT يُعتبر رمزاً غير صالح فقط إذا كانت الرسالة تخص registration token
+    (وإلا فهو خطأ في محتوى الرسالة نفسها ولا يجب حذف الرمز بسببه).
+    """
+    error = error_body.get("error", {}) if isinstance(error_body, dict) else {}
+    error_code = None
+    for detail in error.get("details", []) or []:
+        if isinstance(detail, dict) and detail.get("errorCode"):
+            error_code = detail["errorCode"]
+            break
+    error_code = error_code or error.get("status") or (f"HTTP_{status_code}" if status_code else None)
+    message = str(error.get("message", "")).lower()
+    token_invalid = error_code in INVALID_TOKEN_ERRORS or (
+        error_code == "INVALID_ARGUMENT" and "registration token" in message
+    )
+    return error_code, token_invalid
 
 class FCMService:
     """خدمة إرسال الإشعارات عبر Firebase Cloud Messaging HTTP v1 API"""
@@ -17,10 +70,42 @@ class FCMService:
     PROJECT_ID: Optional[str] = None
     ACCESS_TOKEN: Optional[str] = None
     IS_INITIALIZED: bool = False
+    # التهيئة كسولة: تتم عند أول استخدام وليس عند استيراد التطبيق
+    _INIT_ATTEMPTED: bool = False
+    _INIT_LOCK = threading.Lock()
+
+    # credentials + access token مخزنة حتى قبل انتهاء صلاحيتها بقليل (بدلاً من طلب token لكل إشعار)
+    _CREDENTIALS = None
+    _TOKEN_LOCK = threading.Lock()
+    # جلسة HTTP مشتركة (keep-alive + connection pool) لـ FCM و OAuth
+    _HTTP_SESSION: Optional[requests.Session] = None
+    _HTTP_SESSION_LOCK = threading.Lock()
+    # خيوط محدودة لإرسال الإشعارات خارج مسار الطلب
+    _SEND_EXECUTOR: Optional[ThreadPoolExecutor] = None
+
+    # عدادات تغيّر رموز الأجهزة (لكل worker)
+    _STATS_LOCK = threading.Lock()
+    TOKEN_STATS: Dict[str, Any] = {
+        "registered": 0,
+        "rotated": 0,
+        "invalid_detected": 0,
+        "pruned": 0,
+        "invalid_by_error": {},
+    }
     
+    @staticmethod
+    def ensure_initialized() -> None:
+        """تهيئة خدمة FCM مرة واحدة عند أول استخدام (آمنة مع عدة خيوط)"""
+        if FCMService._INIT_ATTEMPTED:
+            return
+        with FCMService._INIT_LOCK:
+            if not FCMService._INIT_ATTEMPTED:
+                FCMService.initialize()
+                FCMService._INIT_ATTEMPTED = True
+
     @staticmethod
     def initialize():
-        """تهيئة خدمة FCM - يجب استدعاؤها عند بدء التطبيق"""
+        """تهيئة خدمة FCM (تُستدعى تلقائياً عبر ensure_initialized أو يدوياً لإعادة التهيئة)"""
         print("🔧 Starting FCM Service initialization...")
         try:
             # الطريقة 1: قراءة Service Account من متغير البيئة مباشرة (JSON string)
@@ -135,13 +220,49 @@ class FCMService:
     
     @staticmethod
     def is_initialized() -> bool:
-        """التحقق من أن خدمة FCM مهيأة بشكل صحيح"""
+        """التحقق من أن خدمة FCM مهيأة بشكل صحيح (مع التهيئة عند أول استدعاء)"""
+        FCMService.ensure_initialized()
         return FCMService.IS_INITIALIZED and FCMService.PROJECT_ID is not None
     
+    @staticmethod
+    def get_http_session() -> requests.Session:
+        """جلسة HTTP مشتركة تعيد استخدام الاتصالات (HTTP/1.1 keep-alive)"""
+        if FCMService._HTTP_SESSION is None:
+            with FCMService._HTTP_SESSION_LOCK:
+                if FCMService._HTTP_SESSION is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(
+                        pool_connections=2,
+                        pool_maxsize=max(1, settings.FCM_HTTP_POOL_SIZE),
+                    )
+                    session.mount("https://", adapter)
+                    FCMService._HTTP_SESSION = session
+        return FCMService._HTTP_SESSION
+
+    @staticmethod
+    def _get_send_executor() -> ThreadPoolExecutor:
+        if FCMService._SEND_EXECUTOR is None:
+            with FCMService._HTTP_SESSION_LOCK:
+                if FCMService._SEND_EXECUTOR is None:
+                    FCMService._SEND_EXECUTOR = ThreadPoolExecutor(
+                        max_workers=max(1, settings.FCM_SEND_MAX_WORKERS),
+                        thread_name_prefix="fcm-send",
+                    )
+        return FCMService._SEND_EXECUTOR
+
+    @staticmethod
+    def _token_is_fresh(credentials) -> bool:
+        if credentials is None or not credentials.token or credentials.expiry is None:
+            return False
+        # expiry في google-auth بتوقيت UTC بدون tzinfo
+        margin = timedelta(seconds=settings.FCM_TOKEN_REFRESH_MARGIN_SECONDS)
+        return credentials.expiry - margin > datetime.utcnow()
+
     @staticmethod
     def get_access_token() -> Optional[str]:
         """
         الحصول على Access Token من Service Account
+        يُعاد استخدام نفس token حتى قبل انتهاء صلاحيته بـ FCM_TOKEN_REFRESH_MARGIN_SECONDS
         """
         if not FCMService.is_initialized():
             print("⚠️ FCM Service is not initialized. Cannot get access token.")
@@ -150,21 +271,33 @@ class FCMService:
         if not FCMService.SERVICE_ACCOUNT_DATA:
             print("⚠️ Service Account data is not available. Cannot get access token.")
             return None
+
+        credentials = FCMService._CREDENTIALS
+        if FCMService._token_is_fresh(credentials):
+            return credentials.token
         
         try:
             from google.auth.transport.requests import Request
             from google.oauth2 import service_account
-            
-            # استخدام Service Account data مباشرة (من ملف أو متغير بيئة)
-            credentials = service_account.Credentials.from_service_account_info(
-                FCMService.SERVICE_ACCOUNT_DATA,
-                scopes=['https://www.googleapis.com/auth/firebase.messaging']
-            )
-            
-            # تحديث credentials للحصول على access token
-            credentials.refresh(Request())
-            
-            return credentials.token
+
+            with FCMService._TOKEN_LOCK:
+                # خيط آخر قد يكون حدّث token أثناء الانتظار
+                credentials = FCMService._CREDENTIALS
+                if FCMService._token_is_fresh(credentials):
+                    return credentials.token
+
+                if credentials is None:
+                    # استخدام Service Account data مباشرة (من ملف أو متغير بيئة)
+                    credentials = service_account.Credentials.from_service_account_info(
+                        FCMService.SERVICE_ACCOUNT_DATA,
+                        scopes=FCM_SCOPES
+                    )
+                
+                # تحديث credentials للحصول على access token
+                credentials.refresh(Request(session=FCMService.get_http_session()))
+                FCMService._CREDENTIALS = credentials
+                FCMService.ACCESS_TOKEN = credentials.token
+                return credentials.token
         except ImportError:
             print("⚠️ Error: google-auth libraries not installed. Run: pip install google-auth google-auth-oauthlib google-auth-httplib2")
             return None
@@ -173,7 +306,83 @@ class FCMService:
             import traceback
             print(f"⚠️ Traceback: {traceback.format_exc()}")
             return None
+
+    @staticmethod
+    def invalidate_access_token():
+        """إلغاء token المخزن (مثلاً بعد رد 401 من FCM) ليتم طلب token جديد في الإرسال التالي"""
+        with FCMService._TOKEN_LOCK:
+            FCMService._CREDENTIALS = None
+            FCMService.ACCESS_TOKEN = None
     
+    @staticmethod
+    def _build_message(fcm_token: str, title: str, body: str, data: Optional[dict] = None) -> dict:
+        # بناء payload حسب HTTP v1 API format
+        # ⚠️ مهم: استخدام "token" لإرسال إشعار لمستخدم واحد فقط
+        # لا تستخدم "topic" لأن ذلك سيرسل الإشعار لجميع المشتركين في الـ topic
+        # ⚠️ تأكد من أن كل مستخدم لديه token فريد - إذا كان جميع المستخدمين لديهم نفس token، سيظهر الإشعار لجميعهم
+        message = {
+            "message": {
+                "token": fcm_token.strip(),  # إرسال لجهاز واحد فقط باستخدام token (NOT topic!)
+                "notification": {
+                    "title": title,
+                    "body": body
+                }
+            }
+        }
+        
+        # إضافة data إذا كان موجوداً
+        if data:
+            # تحويل data إلى strings (مطلوب في FCM)
+            data_strings = {k: str(v) for k, v in data.items()}
+            message["message"]["data"] = data_strings
+        return message
+
+    @staticmethod
+    def _post_message(access_token: str, message: FCMMessage) -> FCMSendResult:
+        """إرسال رسالة واحدة عبر الجلسة المشتركة وإرجاع النتيجة بدون طباعة"""
+        if not message.token or len(message.token.strip()) == 0:
+            return FCMSendResult(token=message.token, success=False, error_code="NO_TOKEN", error="FCM token is empty")
+
+        url = f"https://fcm.googleapis.com/v1/projects/{FCMService.PROJECT_ID}/messages:send"
+        headers = {
+            "Authorization": f"Bearer {access_token}",
+            "Content-Type": "application/json"
+        }
+        payload = FCMService._build_message(message.token, message.title, message.body, message.data)
+        try:
+            response = FCMService.get_http_session().post(
+                url, headers=headers, json=payload, timeout=settings.FCM_HTTP_TIMEOUT_SECONDS
+            )
+            if response.status_code == 401:
+                # token ملغى أو منتهي قبل موعده
+                FCMService.invalidate_access_token()
+            response.raise_for_status()
+            
+            result = response.json()
+            if "name" in result:
+                return FCMSendResult(token=message.token, success=True, message_id=result["name"], status_code=response.status_code)
+            return FCMSendResult(token=message.token, success=False, status_code=response.status_code, error=str(result))
+        except requests.exceptions.HTTPError as e:
+            error_detail = ""
+            try:
+                error_detail = e.response.json()
+            except:
+                error_detail = str(e)
+            status_code = e.response.status_code if e.response is not None else None
+            error_code, token_invalid = classify_fcm_error(status_code, error_detail)
+            return FCMSendResult(
+                token=message.token,
+                success=False,
+                status_code=status_code,
+                error_code=error_code,
+                error=str(error_detail),
+                token_invalid=token_invalid,
+            )
+        except requests.exceptions.RequestException as e:
+            return FCMSendResult(token=message.token, success=False, error_code="NETWORK_ERROR", error=str(e))
+        except Exception as e:
+            return FCMSendResult(token=message.token, success=False, error_code="INTERNAL", error=str(e))
+
     @staticmethod
     def send_notification(
         fcm_token: str,
@@ -193,8 +402,8 @@ class FCMService:
         Returns:
             True إذا تم الإرسال بنجاح، False في حالة الفشل
         """
-        if not fcm_token:
-            print("⚠️ FCM token is empty. Cannot send notification.")
+        if not fcm_token or len(fcm_token.strip()) == 0:
+            print("⚠️ FCM token is empty or null. Cannot send notification.")
             return False
         
         if not FCMService.is_initialized():
@@ -202,85 +411,147 @@ class FCMService:
             print("💡 Please check FCM configuration and ensure Service Account is properly set up.")
             return False
         
-        if not FCMService.PROJECT_ID:
-            print("⚠️ FCM Project ID not configured. Cannot send notification.")
-            return False
-        
         # الحصول على Access Token
         access_token = FCMService.get_access_token()
         if not access_token:
             print("⚠️ Failed to get access token. Cannot send notification.")
             return False
         
-        # بناء رابط API v1
-        url = f"https://fcm.googleapis.com/v1/projects/{FCMService.PROJECT_ID}/messages:send"
-        
-        headers = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/json"
-        }
-        
-        # بناء payload حسب HTTP v1 API format
-        # ⚠️ مهم: استخدام "token" لإرسال إشعار لمستخدم واحد فقط
-        # لا تستخدم "topic" لأن ذلك سيرسل الإشعار لجميع المشتركين في الـ topic
-        # ⚠️ تأكد من أن كل مستخدم لديه token فريد - إذا كان جميع المستخدمين لديهم نفس token، سيظهر الإشعار لجميعهم
-        
-        # التحقق من أن token ليس فارغاً أو null
-        if not fcm_token or len(fcm_token.strip()) == 0:
-            print("⚠️ FCM token is empty or null. Cannot send notification.")
-            return False
-        
-        message = {
-            "message": {
-                "token": fcm_token.strip(),  # إرسال لجهاز واحد فقط باستخدام token (NOT topic!)
-                "notification": {
-                    "title": title,
-                    "body": body
-                }
-            }
-        }
-        
-        # إضافة data إذا كان موجوداً
-        if data:
-            # تحويل data إلى strings (مطلوب في FCM)
-            data_strings = {k: str(v) for k, v in data.items()}
-            message["message"]["data"] = data_strings
-        
         # سجل للتأكد من أننا نرسل للمستخدم الصحيح فقط
         print(f"📤 FCM Payload: Sending to token {fcm_token[:30]}... (first 30 chars)")
         print(f"📤 FCM Message: {title} - {body}")
-        print(f"📤 Using 'token' field (NOT 'topic') - this should send to ONE device only")
         
+        result = FCMService._post_message(access_token, FCMMessage(token=fcm_token, title=title, body=body, data=data))
+        if result.success:
+            print(f"✓ Notification sent successfully via HTTP v1 API")
+        else:
+            print(f"✗ Failed to send notification ({result.error_code or result.status_code or 'N/A'}): {result.error}")
+            FCMService.handle_invalid_tokens([result])
+        return result.success
+
+    @staticmethod
+    def send_many(messages: List[FCMMessage], max_parallel: Optional[int] = None) -> List[FCMSendResult]:
+        """
+        إرسال عدة رسائل (لكل رسالة token خاص) بالتوازي بحد أقصى FCM_MAX_PARALLEL_SENDS.
+        تُعاد النتائج بنفس ترتيب الرسائل.
+        """
+        if not messages:
+            return []
+        if not FCMService.is_initialized():
+            return [
+                FCMSendResult(token=m.token, success=False, error_code="NOT_INITIALIZED", error="FCM Service is not initialized")
+                for m in messages
+            ]
+        access_token = FCMService.get_access_token()
+        if not access_token:
+            return [
+                FCMSendResult(token=m.token, success=False, error_code="NO_ACCESS_TOKEN", error="Failed to get access token")
+                for m in messages
+            ]
+
+        workers = max(1, min(max_parallel or settings.FCM_MAX_PARALLEL_SENDS, len(messages)))
+        if workers == 1:
+            results = [FCMService._post_message(access_token, m) for m in messages]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fcm-fanout") as executor:
+                results = list(executor.map(lambda m: FCMService._post_message(access_token, m), messages))
+
+        sent = sum(1 for r in results if r.success)
+        print(f"📤 FCM send_many: {sent}/{len(results)} sent")
+        FCMService.handle_invalid_tokens(results)
+        return results
+
+    @staticmethod
+    def handle_invalid_tokens(results: List[FCMSendResult], db=None) -> int:
+        """
+        حذف رموز FCM التي رفضها FCM نهائياً (UNREGISTERED / INVALID_ARGUMENT ...) من جدول المستخدمين
+        حتى لا نكرر طلبات HTTP محكوم عليها بالفشل في الأحداث التالية.
+        """
+        invalid = [r for r in results if not r.success and r.token_invalid and r.token]
+        if not invalid:
+            return 0
+        with FCMService._STATS_LOCK:
+            FCMService.TOKEN_STATS["invalid_detected"] += len(invalid)
+            for r in invalid:
+                by_error = FCMService.TOKEN_STATS["invalid_by_error"]
+                by_error[r.error_code] = by_error.get(r.error_code, 0) + 1
+        return FCMService.prune_tokens({r.token for r in invalid}, db=db)
+
+    @staticmethod
+    def prune_tokens(tokens, db=None) -> int:
+        """مسح رموز FCM المحددة من المستخدمين (UPDATE واحد)"""
+        from app.core.database import SessionLocal
+        from app.features.user.model import User
+
+        tokens = [t for t in tokens if t]
+        if not tokens:
+            return 0
+        own_session = db is None
+        db = db or SessionLocal()
         try:
-            response = requests.post(url, headers=headers, json=message, timeout=10)
-            response.raise_for_status()
-            
-            result = response.json()
-            if "name" in result:
-                print(f"✓ Notification sent successfully via HTTP v1 API")
-                return True
-            else:
-                print(f"✗ Failed to send notification: {result}")
-                return False
-        except requests.exceptions.HTTPError as e:
-            error_detail = ""
-            try:
-                error_detail = e.response.json()
-            except:
-                error_detail = str(e)
-            print(f"✗ HTTP error sending notification: {error_detail}")
-            print(f"✗ Response status: {e.response.status_code if hasattr(e, 'response') else 'N/A'}")
-            print(f"✗ Response headers: {e.response.headers if hasattr(e, 'response') and hasattr(e.response, 'headers') else 'N/A'}")
-            return False
-        except requests.exceptions.RequestException as e:
-            print(f"✗ Network error sending notification: {str(e)}")
-            print(f"✗ This might indicate a network connectivity issue or firewall blocking the request")
-            return False
+            pruned = (
+                db.query(User)
+                .filter(User.fcm_token.in_(tokens))
+                .update({User.fcm_token: None}, synchronize_session=False)
+            )
+            db.commit()
         except Exception as e:
-            print(f"✗ Error sending notification: {str(e)}")
-            import traceback
-            print(f"✗ Traceback: {traceback.format_exc()}")
-            return False
+            db.rollback()
+            print(f"⚠️ Failed to prune invalid FCM tokens: {e}")
+            return 0
+        finally:
+            if own_session:
+                db.close()
+        with FCMService._STATS_LOCK:
+            FCMService.TOKEN_STATS["pruned"] += pruned
+        if pruned:
+            print(f"🧹 Cleared {pruned} invalid FCM token(s) from users")
+        return pruned
+
+    @staticmethod
+    def record_token_update(old_token: Optional[str], new_token: Optional[str]):
+        """عدّاد تغيّر رموز الأجهزة (تسجيل أول مرة / تبديل)"""
+        if old_token == new_token:
+            return
+        with FCMService._STATS_LOCK:
+            FCMService.TOKEN_STATS["registered" if not old_token else "rotated"] += 1
+
+    @staticmethod
+    def send_to_users(
+        db,
+        user_ids: List[int],
+        title: str,
+        body: str,
+        data: Optional[dict] = None,
+        max_parallel: Optional[int] = None,
+    ) -> Dict[int, FCMSendResult]:
+        """
+        إرسال نفس الإشعار لعدة مستخدمين (حملات التذكير مثلاً).
+        رموز FCM تُجلب باستعلام واحد؛ المستخدم بدون token تكون نتيجته NO_TOKEN.
+        """
+        from app.features.user.model import User
+
+        unique_ids = list(dict.fromkeys(user_ids))
+        if not unique_ids:
+            return {}
+        tokens = dict(db.query(User.id, User.fcm_token).filter(User.id.in_(unique_ids)).all())
+
+        results: Dict[int, FCMSendResult] = {}
+        recipients = []
+        for user_id in unique_ids:
+            token = tokens.get(user_id)
+            if token and token.strip():
+                recipients.append(user_id)
+            else:
+                results[user_id] = FCMSendResult(
+                    token=None, success=False, error_code="NO_TOKEN",
+                    error="User not found" if user_id not in tokens else "User has no FCM token",
+                )
+
+        messages = [FCMMessage(token=tokens[user_id], title=title, body=body, data=data) for user_id in recipients]
+        for user_id, result in zip(recipients, FCMService.send_many(messages, max_parallel=max_parallel)):
+            results[user_id] = result
+        return results
     
     @staticmethod
     def send_notification_to_user(
@@ -334,16 +605,94 @@ class FCMService:
             print(f"✗ Failed to send notification to User ID: {user_id}")
         return result
     
+    @staticmethod
+    async def send_notification_async(
+        fcm_token: str,
+        title: str,
+        body: str,
+        data: Optional[dict] = None
+    ) -> bool:
+        """نسخة async من send_notification (تعمل في خيوط FCM المخصصة دون حجز event loop)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            FCMService._get_send_executor(),
+            lambda: FCMService.send_notification(fcm_token=fcm_token, title=title, body=body, data=data),
+        )
+
+    @staticmethod
+    async def send_notification_to_user_async(
+        user_id: int,
+        title: str,
+        body: str,
+        data: Optional[dict] = None
+    ) -> bool:
+        """نسخة async من send_notification_to_user (تفتح جلسة قاعدة بيانات خاصة بها)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            FCMService._get_send_executor(),
+            FCMService._send_to_user_with_own_session, user_id, title, body, data,
+        )
+
+    @staticmethod
+    def send_notification_to_user_in_background(
+        user_id: int,
+        title: str,
+        body: str,
+        data: Optional[dict] = None
+    ) -> Optional[Future]:
+        """
+        جدولة إرسال إشعار لمستخدم بدون انتظار (من الخدمات المتزامنة بعد commit).
+        لا تنتظر عمليات الكتابة (مخالفة/امتحان/تجديد) اتصالات FCM.
+        """
+        if not FCMService.is_initialized():
+            print("⚠️ FCM Service is not initialized. Cannot send notification.")
+            return None
+        return FCMService._get_send_executor().submit(
+            FCMService._send_to_user_with_own_session, user_id, title, body, data
+        )
+
+    @staticmethod
+    def _send_to_user_with_own_session(user_id: int, title: str, body: str, data: Optional[dict]) -> bool:
+        from app.core.database import SessionLocal
+        db = SessionLocal()
+        try:
+            return FCMService.send_notification_to_user(user_id=user_id, title=title, body=body, data=data, db=db)
+        except Exception as e:
+            print(f"⚠️ Failed to send notification to User ID {user_id}: {e}")
+            return False
+        finally:
+            db.close()
+
+    @staticmethod
+    def shutdown():
+        """إيقاف خيوط الإرسال وإغلاق جلسة HTTP (عند إيقاف التطبيق)"""
+        if FCMService._SEND_EXECUTOR is not None:
+            FCMService._SEND_EXECUTOR.shutdown(wait=True)
+            FCMService._SEND_EXECUTOR = None
+        if FCMService._HTTP_SESSION is not None:
+            FCMService._HTTP_SESSION.close()
+            FCMService._HTTP_SESSION = None
+
+    @staticmethod
+    def get_token_stats() -> dict:
+        with FCMService._STATS_LOCK:
+            stats = dict(FCMService.TOKEN_STATS)
+            stats["invalid_by_error"] = dict(stats["invalid_by_error"])
+        return stats
+
     @staticmethod
     def get_status() -> dict:
         """
         الحصول على حالة خدمة FCM
         """
+        FCMService.ensure_initialized()
         status = {
             "initialized": FCMService.IS_INITIALIZED,
             "project_id": FCMService.PROJECT_ID if FCMService.IS_INITIALIZED else None,
             "service_account_path": FCMService.SERVICE_ACCOUNT_PATH if FCMService.SERVICE_ACCOUNT_PATH else "Using environment variable",
-            "has_service_account_data": FCMService.SERVICE_ACCOUNT_DATA is not None
+            "has_service_account_data": FCMService.SERVICE_ACCOUNT_DATA is not None,
+            "access_token_cached": FCMService._token_is_fresh(FCMService._CREDENTIALS),
+            "token_stats": FCMService.get_token_stats(),
         }
         
         # محاولة الحصول على access token للتحقق من أن كل شيء يعمل
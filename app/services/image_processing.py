@@ -0,0 +1,217 @@
+"""
+معالجة الصور المرفوعة: نسخة للطباعة (مصغرة ومعاد ضغطها) + صورة مصغرة لشاشات القوائم.
+
+- تعمل في process pool (IMAGE_PROCESS_WORKERS): فك وضغط الصور عمل CPU يحجز GIL.
+- المسارات المشتقة ثابتة من اسم الأصل في نفس المجلد: <stem>_print.jpg و <stem>_thumb.jpg
+- الأصل يبقى كما هو (وثيقة رسمية)، والمشتقات JPEG بدون EXIF (الموقع الجغرافي...) ومع تصحيح الاتجاه.
+- Pillow اختياري: بدونه تُتخطى المعالجة وتبقى الملفات الأصلية فقط.
+- معالجة الملفات القديمة:  python -m app.services.image_processing backfill
+"""
+import asyncio
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+from app.core.config import settings
+
+PRINT_VARIANT = "print"
+THUMB_VARIANT = "thumb"
+
+# امتدادات الصور التي تُعالج (PDF لا يُعالج، و HEIC يحتاج plugin غير مثبت)
+PROCESSABLE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".gif", ".bmp"}
+
+
+def derived_path(path: str, variant: str) -> str:
+    stem, _ = os.path.splitext(path)
+    return f"{stem}_{variant}.jpg"
+
+
+def is_processable(path: Optional[str]) -> bool:
+    return bool(path) and os.path.splitext(path)[1].lower() in PROCESSABLE_EXTENSIONS
+
+
+# ========== داخل عملية المعالجة ==========
+
+def _save_variant(image, max_px: int, quality: int, dest: str):
+    variant = image.copy()
+    variant.thumbnail((max_px, max_px))
+    tmp = f"{dest}.part"
+    try:
+        variant.save(tmp, "JPEG", quality=quality, optimize=True, progressive=True)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, dest)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def process_image(path: str, print_max_px: int, thumb_max_px: int, print_quality: int, thumb_quality: int) -> Dict[str, str]:
+    """إنشاء نسختي الطباعة والمصغرة (تُنفذ في عملية منفصلة)"""
+    from PIL import Image, ImageOps
+
+    with Image.open(path) as source:
+        # JPEG: فك الترميز مباشرة بدقة أقل (أسرع بكثير للصور الكبيرة)
+        source.draft("RGB", (print_max_px, print_max_px))
+        image = ImageOps.exif_transpose(source)
+        if image.mode in ("RGBA", "LA", "P"):
+            image = image.convert("RGBA")
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+
+    print_path = derived_path(path, PRINT_VARIANT)
+    thumb_path = derived_path(path, THUMB_VARIANT)
+    _save_variant(image, print_max_px, print_quality, print_path)
+    _save_variant(image, thumb_max_px, thumb_quality, thumb_path)
+    return {"print_path": print_path, "thumbnail_path": thumb_path}
+
+
+def _process_args(path: str) -> tuple:
+    return (
+        path,
+        settings.IMAGE_PRINT_MAX_PX,
+        settings.IMAGE_THUMB_MAX_PX,
+        settings.IMAGE_PRINT_QUALITY,
+        settings.IMAGE_THUMB_QUALITY,
+    )
+
+
+# ========== داخل الـworker ==========
+
+class ImageProcessor:
+    _EXECUTOR: Optional[ProcessPoolExecutor] = None
+    _LOCK = threading.Lock()
+    # نتيجة فحص وجود المسارات المشتقة: path -> (موجود؟, صالح حتى monotonic)
+    # الموجود لا ينتهي (الاسم لا يتغير)، وغير الموجود يُعاد فحصه بعد IMAGE_DERIVED_MISS_TTL_SECONDS
+    # (backfill يعمل في عملية أخرى ولا يستطيع إبطال cache الـworker)
+    _DERIVED_CACHE: Dict[str, Tuple[bool, float]] = {}
+    _DERIVED_CACHE_MAX = 100_000
+
+    STATS: Dict[str, int] = {"processed": 0, "failed": 0, "skipped": 0}
+
+    @staticmethod
+    def is_available() -> bool:
+        try:
+            import PIL  # noqa: F401
+            return True
+        except ImportError:
+            return False
+
+    @staticmethod
+    def _get_executor() -> ProcessPoolExecutor:
+        if ImageProcessor._EXECUTOR is None:
+            with ImageProcessor._LOCK:
+                if ImageProcessor._EXECUTOR is None:
+                    # spawn: fork من عملية فيها خيوط (uvicorn، المهام الخلفية) قد يسبب deadlock
+                    ImageProcessor._EXECUTOR = ProcessPoolExecutor(
+                        max_workers=max(1, settings.IMAGE_PROCESS_WORKERS),
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return ImageProcessor._EXECUTOR
+
+    @staticmethod
+    async def process_upload(path: str) -> Dict[str, str]:
+        """
+        إنشاء المشتقات بعد الرفع وإرجاع مساراتها ({} إذا لم تُعالج الصورة).
+        فشل المعالجة لا يُفشل الرفع: الأصل محفوظ ويُعرض بدلاً منها.
+        """
+        if not is_processable(path) or not ImageProcessor.is_available():
+            ImageProcessor.STATS["skipped"] += 1
+            return {}
+        # نفس المحتوى مرفوع مسبقاً (الاسم من SHA-256): المشتقات موجودة
+        # فحص القرص مباشرة وليس الـcache: GC قد يكون حذفها في عملية أخرى
+        existing = {
+            "print_path": derived_path(path, PRINT_VARIANT),
+            "thumbnail_path": derived_path(path, THUMB_VARIANT),
+        }
+        if all(os.path.exists(p) for p in existing.values()):
+            ImageProcessor._remember(*existing.values(), exists=True)
+            return existing
+        loop = asyncio.get_running_loop()
+        try:
+            result = await asyncio.wait_for(
+                loop.run_in_executor(ImageProcessor._get_executor(), process_image, *_process_args(path)),
+                timeout=settings.IMAGE_PROCESS_TIMEOUT_SECONDS,
+            )
+        except Exception as e:
+            ImageProcessor.STATS["failed"] += 1
+            print(f"⚠️ Image processing failed for {path}: {type(e).__name__}: {e}")
+            return {}
+        ImageProcessor.STATS["processed"] += 1
+        ImageProcessor._remember(*result.values(), exists=True)
+        return result
+
+    @staticmethod
+    def _remember(*paths: str, exists: bool):
+        valid_until = float("inf") if exists else time.monotonic() + settings.IMAGE_DERIVED_MISS_TTL_SECONDS
+        with ImageProcessor._LOCK:
+            if len(ImageProcessor._DERIVED_CACHE) >= ImageProcessor._DERIVED_CACHE_MAX:
+                ImageProcessor._DERIVED_CACHE.clear()
+            for path in paths:
+                ImageProcessor._DERIVED_CACHE[path] = (exists, valid_until)
+
+    @staticmethod
+    def forget(*paths: str):
+        """إزالة مسارات من الـcache (بعد حذفها من القرص)"""
+        with ImageProcessor._LOCK:
+            for path in paths:
+                ImageProcessor._DERIVED_CACHE.pop(path, None)
+
+    @staticmethod
+    def existing_derived(path: Optional[str], variant: str) -> Optional[str]:
+        """المسار المشتق إذا كان موجوداً (فحص القرص مرة واحدة لكل ملف، أو لكل TTL إذا لم يوجد)"""
+        if not is_processable(path):
+            return None
+        candidate = derived_path(path, variant)
+        cached = ImageProcessor._DERIVED_CACHE.get(candidate)
+        if cached is None or cached[1] <= time.monotonic():
+            exists = os.path.exists(candidate)
+            ImageProcessor._remember(candidate, exists=exists)
+        else:
+            exists = cached[0]
+        return candidate if exists else None
+
+    @staticmethod
+    def shutdown():
+        """إيقاف عمليات المعالجة (عند إيقاف التطبيق)"""
+        if ImageProcessor._EXECUTOR is not None:
+            ImageProcessor._EXECUTOR.shutdown(wait=True)
+            ImageProcessor._EXECUTOR = None
+
+
+def backfill(directories=("uploads/photos", "uploads/documents")) -> int:
+    """معالجة الصور المرفوعة سابقاً التي ليس لها مشتقات"""
+    pending = []
+    for directory in directories:
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            path = f"{directory}/{name}"
+            stem = os.path.splitext(name)[0]
+            if stem.endswith((f"_{PRINT_VARIANT}", f"_{THUMB_VARIANT}")) or not is_processable(path):
+                continue
+            if not os.path.exists(derived_path(path, THUMB_VARIANT)):
+                pending.append(path)
+    done = 0
+    with ProcessPoolExecutor(max_workers=max(1, settings.IMAGE_PROCESS_WORKERS)) as executor:
+        futures = {executor.submit(process_image, *_process_args(path)): path for path in pending}
+        for future, path in futures.items():
+            try:
+                future.result()
+                done += 1
+            except Exception as e:
+                print(f"⚠️ {path}: {type(e).__name__}: {e}")
+    return done
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["backfill"]:
+        print("Usage: python -m app.services.image_processing backfill")
+        sys.exit(2)
+    print(f"✓ Processed {backfill()} image(s)")
@@ -0,0 +1,150 @@
+"""
+خدمة الملفات المرفوعة (/uploads).
+
+- أسماء الملفات لا تتغير أبداً (SHA-256 للمحتوى، أو uuid للملفات القديمة، والمشتقات _print/_thumb):
+  Cache-Control طويل مع immutable، فلا يعيد المتصفح أو التطبيق طلبها.
+- Range و If-Range (عرض PDF وتنزيل جزئي) و ETag/Last-Modified مع 304 من StaticFiles/FileResponse.
+- UPLOAD_ACCEL_MODE: تفويض إرسال البايتات إلى الـproxy الأمامي بدل بثها من الـworker:
+    nginx    -> X-Accel-Redirect: <UPLOAD_ACCEL_PREFIX><path>، مع location داخلي مثل:
+                location /internal-uploads/ { internal; alias /srv/lmvs/uploads/; }
+    sendfile -> X-Sendfile: <المسار المطلق> (Apache mod_xsendfile / lighttpd)
+  الـproxy يتولى Range والطلبات الشرطية في هذه الحالة.
+- روابط موقعة ومؤقتة: ?expires=<unix>&sig=<HMAC-SHA256(path, expires)> تُنشأ في الاستجابات
+  (file_urls في LicenseResponse...) وتُتحقق هنا بمقارنة ثابتة الزمن بدون أي استعلام لقاعدة البيانات.
+  UPLOAD_SIGNED_URLS_REQUIRED=true يرفض أي طلب بدون توقيع صالح (403).
+"""
+import base64
+import hashlib
+import hmac
+import os
+import re
+import time
+from functools import lru_cache
+from typing import Dict, Iterable, Optional
+from urllib.parse import quote
+from fastapi import HTTPException
+from starlette.datastructures import QueryParams
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+from app.core.config import settings
+
+ACCEL_NGINX = "nginx"
+ACCEL_SENDFILE = "sendfile"
+
+# أسماء لا يُعاد استخدامها لمحتوى آخر، مع المشتقات _print/_thumb:
+#   <sha256>.jpg                                 (المحتوى)
+#   80fe403a-2215-4c1e-9a3b-5d1f0c2e7a11.jpg     (uuid4 للرفع القديم، الامتداد من اسم الملف الأصلي أو بدونه)
+#   <uuid4.hex>.pdf, signature_3_<uuid4.hex>.png
+#   signature_3_4ece1122.png                     (صور التوقيع القديمة: uuid4().hex[:8])
+_IMMUTABLE_NAME = re.compile(
+    r"^(?:"
+    r"[0-9a-f]{64}"
+    r"|(?:[a-z0-9]+_)*[0-9a-f]{32}"
+    r"|[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}"
+    r"|signature_\d+_[0-9a-f]{8}"
+    r")(?:_(?:print|thumb))?(?:\.[A-Za-z0-9]+)?$"
+)
+
+
+UPLOAD_PREFIX = "uploads/"
+_EXPIRES = re.compile(r"[0-9]{1,12}")
+
+
+@lru_cache(maxsize=1)
+def _signing_key() -> bytes:
+    # مفتاح مشتق خاص بالروابط (لا يُستخدم SECRET_KEY مباشرة كما في JWT)
+    return hmac.new(settings.SECRET_KEY.encode(), b"upload-urls", hashlib.sha256).digest()
+
+
+def _signature(relative_path: str, expires: int) -> str:
+    digest = hmac.new(_signing_key(), f"{relative_path}\n{expires}".encode(), hashlib.sha256).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b"=").decode()
+
+
+def _current_expiry() -> int:
+    # ثابتة خلال نافذة TTL: نفس الرابط في الاستجابات المتتالية فيبقى في cache المتصفح
+    # (صالح بين TTL و 2×TTL من وقت الإنشاء)
+    ttl = settings.UPLOAD_URL_TTL_SECONDS
+    return (int(time.time()) // ttl + 2) * ttl
+
+
+def signed_upload_url(path: Optional[str], expires: Optional[int] = None) -> Optional[str]:
+    """رابط /uploads موقع للمسار المحفوظ (uploads/photos/x.jpg)، أو None للمسارات الأخرى"""
+    if not path or not path.startswith(UPLOAD_PREFIX):
+        return None
+    relative = path[len(UPLOAD_PREFIX):]
+    expires = expires or _current_expiry()
+    return f"/{UPLOAD_PREFIX}{quote(relative)}?expires={expires}&sig={_signature(relative, expires)}"
+
+
+def signed_upload_urls(source, fields: Iterable[str]) -> Dict[str, str]:
+    """روابط موقعة لحقول المسارات الموجودة في source (المفتاح اسم الحقل)"""
+    expires = _current_expiry()
+    urls = {}
+    for field in fields:
+        url = signed_upload_url(getattr(source, field, None), expires)
+        if url:
+            urls[field] = url
+    return urls
+
+
+def verify_upload_signature(relative_path: str, query_string: bytes) -> Optional[int]:
+    """وقت انتهاء الرابط إذا كان التوقيع صالحاً وغير منتهٍ، وإلا None"""
+    params = QueryParams(query_string)
+    expires, signature = params.get("expires"), params.get("sig")
+    # أرقام ASCII فقط (isdigit تقبل ² وغيرها ثم يفشل int)
+    if not expires or not signature or not _EXPIRES.fullmatch(expires):
+        return None
+    expires_at = int(expires)
+    if expires_at < time.time():
+        return None
+    # المقارنة كـbytes: compare_digest يرفض النصوص غير ASCII
+    expected = _signature(relative_path, expires_at).encode("ascii")
+    if not hmac.compare_digest(signature.encode("ascii", "replace"), expected):
+        return None
+    return expires_at
+
+
+def cache_control_for(name: str) -> str:
+    if _IMMUTABLE_NAME.match(name):
+        return f"public, max-age={settings.UPLOAD_CACHE_MAX_AGE_SECONDS}, immutable"
+    return f"public, max-age={settings.UPLOAD_MUTABLE_CACHE_MAX_AGE_SECONDS}"
+
+
+class UploadFiles(StaticFiles):
+    def __init__(self, *args, **kwargs):
+        if settings.UPLOAD_ACCEL_MODE not in ("", ACCEL_NGINX, ACCEL_SENDFILE):
+            raise RuntimeError(f"UPLOAD_ACCEL_MODE غير معروف: {settings.UPLOAD_ACCEL_MODE}")
+        super().__init__(*args, **kwargs)
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        relative = path.replace(os.sep, "/")
+        expires = verify_upload_signature(relative, scope.get("query_string", b""))
+        if expires is None and settings.UPLOAD_SIGNED_URLS_REQUIRED:
+            raise HTTPException(status_code=403, detail="رابط الملف غير صالح أو منتهي الصلاحية")
+        response = await super().get_response(path, scope)
+        if settings.UPLOAD_SIGNED_URLS_REQUIRED:
+            # الملف محمي: لا يُخزن في cache مشترك، وفي المتصفح حتى انتهاء الرابط فقط
+            remaining = max(0, expires - int(time.time()))
+            response.headers["Cache-Control"] = f"private, max-age={remaining}, immutable"
+        return response
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        mode = settings.UPLOAD_ACCEL_MODE
+        if mode == ACCEL_NGINX:
+            relative = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+            response = Response(
+                status_code=status_code,
+                headers={"X-Accel-Redirect": settings.UPLOAD_ACCEL_PREFIX.rstrip("/") + "/" + quote(relative)},
+            )
+        elif mode == ACCEL_SENDFILE:
+            response = Response(status_code=status_code, headers={"X-Sendfile": os.path.abspath(full_path)})
+        else:
+            response = super().file_response(full_path, stat_result, scope, status_code)
+
+        response.headers["Cache-Control"] = cache_control_for(os.path.basename(full_path))
+        # الملفات من المستخدمين: لا يخمن المتصفح نوعاً آخر غير Content-Type
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        return response
+
@@ -0,0 +1,169 @@
+"""
+حفظ الملفات المرفوعة (الصور الشخصية، الوثائق، صور التوقيع).
+
+- النسخ على أجزاء (UPLOAD_CHUNK_SIZE_KB) إلى ملف مؤقت في نفس المجلد داخل threadpool:
+  لا يُحمّل الملف كاملاً في الذاكرة ولا تُحجز حلقة الأحداث أثناء الكتابة.
+- حد أقصى للحجم لكل نوع يُفحص أثناء النسخ.
+- نوع الملف من أول بايتات المحتوى (magic bytes) وليس من content-type أو اسم الملف،
+  والامتداد المحفوظ يُشتق من النوع الفعلي.
+- النقل إلى المسار النهائي بـ os.replace (عملية ذرية): لا يظهر ملف ناقص في /uploads.
+- اسم الملف هو SHA-256 للمحتوى: رفع نفس الملف مرة أخرى لا يُنشئ نسخة جديدة، ونفس المحتوى
+  في مجلد آخر يُربط بـ hard link. كل ملف يُسجل في stored_files مع عدد المراجع
+  (app/features/stored_file) ويحذفه GC عندما لا يشير إليه أي طلب.
+"""
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import BinaryIO, Dict, FrozenSet, Optional
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.features.stored_file import references  # noqa: F401  (تسجيل عدّ المراجع)
+from app.features.stored_file.service import StoredFileService
+
+UPLOAD_ROOT = "uploads"
+
+IMAGE_TYPES = frozenset({"jpeg", "png", "webp", "gif", "bmp", "heic"})
+
+FILE_EXTENSIONS = {
+    "jpeg": ".jpg",
+    "png": ".png",
+    "webp": ".webp",
+    "gif": ".gif",
+    "bmp": ".bmp",
+    "heic": ".heic",
+    "pdf": ".pdf",
+}
+
+
+@dataclass(frozen=True)
+class UploadKind:
+    directory: str  # داخل UPLOAD_ROOT
+    allowed_types: FrozenSet[str]
+    max_size_setting: str  # اسم الإعداد في Settings (ميغابايت)
+    invalid_type_message: str
+
+
+UPLOAD_KINDS: Dict[str, UploadKind] = {
+    "photo": UploadKind("photos", IMAGE_TYPES, "UPLOAD_MAX_PHOTO_MB", "يجب أن يكون الملف صورة"),
+    "document": UploadKind(
+        "documents", IMAGE_TYPES | {"pdf"}, "UPLOAD_MAX_DOCUMENT_MB", "يجب أن يكون الملف صورة أو PDF"
+    ),
+    "signature": UploadKind("signatures", IMAGE_TYPES, "UPLOAD_MAX_SIGNATURE_MB", "يجب رفع صورة للتوقيع"),
+}
+
+
+class UploadStorage:
+    @staticmethod
+    def sniff_type(head: bytes) -> Optional[str]:
+        """نوع الملف من أول بايتات المحتوى"""
+        if head.startswith(b"\xff\xd8\xff"):
+            return "jpeg"
+        if head.startswith(b"\x89PNG\r\n\x1a\n"):
+            return "png"
+        if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+            return "webp"
+        if head[:6] in (b"GIF87a", b"GIF89a"):
+            return "gif"
+        if head.startswith(b"%PDF-"):
+            return "pdf"
+        if head[4:8] == b"ftyp" and head[8:12] in (b"heic", b"heix", b"mif1", b"msf1"):
+            return "heic"
+        if head.startswith(b"BM") and len(head) >= 26:
+            return "bmp"
+        return None
+
+    @staticmethod
+    def max_bytes(kind: str) -> int:
+        return getattr(settings, UPLOAD_KINDS[kind].max_size_setting) * 1024 * 1024
+
+    @staticmethod
+    def _place(tmp_path: str, final_path: str, sha256: str, size: int, file_type: str) -> str:
+        """نقل الملف المؤقت إلى مساره النهائي مع إزالة التكرار"""
+        db = SessionLocal()
+        try:
+            # التسجيل قبل النقل: يُجدد created_at فلا يحذف GC ملفاً يُعاد استخدامه الآن
+            StoredFileService.register(db, final_path, sha256, size, file_type)
+            same_content = None if os.path.exists(final_path) else StoredFileService.find_same_content(
+                db, sha256, final_path
+            )
+        finally:
+            db.close()
+
+        if os.path.exists(final_path):
+            # نفس المحتوى مرفوع مسبقاً: لا نسخة جديدة (تحديث وقت التعديل يحميه من GC)
+            try:
+                os.utime(final_path)
+                os.remove(tmp_path)
+                StoredFileService.STATS["deduplicated"] += 1
+                return final_path
+            except FileNotFoundError:
+                # حذفه GC للتو: يُحفظ الملف الجديد
+                pass
+        if same_content and os.path.exists(same_content):
+            try:
+                os.link(same_content, final_path)
+                os.remove(tmp_path)
+                StoredFileService.STATS["hard_linked"] += 1
+                return final_path
+            except FileExistsError:
+                os.remove(tmp_path)
+                return final_path
+            except OSError:
+                # نظام ملفات لا يدعم hard links: نسخة عادية
+                pass
+        os.replace(tmp_path, final_path)
+        StoredFileService.STATS["stored"] += 1
+        return final_path
+
+    @staticmethod
+    def save(source: BinaryIO, kind: str, size_hint: Optional[int] = None) -> str:
+        """
+        نسخ الملف إلى uploads/<directory>/ وإرجاع مساره النسبي (مثال: uploads/photos/<sha256>.jpg).
+        دالة متزامنة: تُستدعى من threadpool (save_upload) أو من مسار sync.
+        """
+        spec = UPLOAD_KINDS[kind]
+        limit = UploadStorage.max_bytes(kind)
+        too_large = f"حجم الملف يتجاوز الحد المسموح ({limit // (1024 * 1024)} ميغابايت)"
+        if size_hint is not None and size_hint > limit:
+            raise ValueError(too_large)
+
+        chunk_size = settings.UPLOAD_CHUNK_SIZE_KB * 1024
+        head = source.read(chunk_size)
+        file_type = UploadStorage.sniff_type(head)
+        if file_type not in spec.allowed_types:
+            raise ValueError(spec.invalid_type_message)
+
+        directory = os.path.join(UPLOAD_ROOT, spec.directory)
+        os.makedirs(directory, exist_ok=True)
+        # الملف المؤقت في نفس المجلد حتى يكون os.replace ذرياً (نفس نظام الملفات)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".upload-", suffix=".part")
+        try:
+            written = 0
+            digest = hashlib.sha256()
+            with os.fdopen(fd, "wb") as out:
+                chunk = head
+                while chunk:
+                    written += len(chunk)
+                    if written > limit:
+                        raise ValueError(too_large)
+                    out.write(chunk)
+                    digest.update(chunk)
+                    chunk = source.read(chunk_size)
+                out.flush()
+                os.fsync(out.fileno())
+            os.chmod(tmp_path, 0o644)
+            sha256 = digest.hexdigest()
+            final_path = f"{UPLOAD_ROOT}/{spec.directory}/{sha256}{FILE_EXTENSIONS[file_type]}"
+            return UploadStorage._place(tmp_path, final_path, sha256, written, file_type)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    async def save_upload(file: UploadFile, kind: str) -> str:
+        """حفظ UploadFile من مسار async (النسخ كله في threadpool)"""
+        return await run_in_threadpool(UploadStorage.save, file.file, kind, file.size)
@@ -1,9 +1,19 @@
-from fastapi import FastAPI
+import time
+from app.core import startup
+
+# بداية قياس زمن الإقلاع (استيراد المسارات والنماذج)
+startup.mark_import_started(time.perf_counter())
+
+from contextlib import asynccontextmanager
+from typing import Optional
+from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
-from app.core.database import engine, Base, SessionLocal
+from app.core.database import dispose_async_engine
+from app.core.http_cache import cached_response, make_etag
+from app.core.pagination import PAGINATION_HEADERS
 from app.api.v1 import api_router
 from app.features.user.model import User
 from app.features.license.model import License
@@ -13,362 +23,86 @@ from app.features.violation_type.model import ViolationType
 from app.features.exam_type.model import ExamType
 from app.features.license_renewal.model import LicenseRenewal
 from app.features.license_replacement.model import LicenseReplacement
-from app.models.enums import UserRole
-from app.core.security import get_password_hash
-
-# ترحيل تلقائي (SQLite): ربط violations بجدول violation_types كمفتاح أجنبي حقيقي
-def run_sqlite_migrations_if_needed():
-    try:
-        if "sqlite" not in settings.DATABASE_URL.lower():
-            return
-
-        import sqlite3
-        from pathlib import Path
-
-        # استخراج مسار ملف sqlite من DATABASE_URL
-        db_url = settings.DATABASE_URL
-        db_file = "license_system.db"
-        if db_url.startswith("sqlite:///"):
-            db_file = db_url.replace("sqlite:///", "", 1)
-        db_path = Path(db_file)
-
-        if not db_path.exists():
-            return
-
-        conn = sqlite3.connect(str(db_path))
-        cur = conn.cursor()
-        try:
-            # ========== Migration: licenses public profile fields ==========
-            cur.execute("PRAGMA table_info(licenses)")
-            license_cols = [r[1] for r in cur.fetchall()]
-            needs_public_profile_cols = any(
-                c not in license_cols
-                for c in [
-                    "chronic_disease",
-                    "emergency_contact_name",
-                    "emergency_contact_phone",
-                ]
+from app.features.notification.model import NotificationOutbox
+from app.services.background_jobs import BackgroundJobs, PeriodicJob
+from app.services.upload_serving import UploadFiles
+
+# لا توجد أعمال جانبية عند الاستيراد: فحص المخطط وحساب admin في lifespan،
+# وخدمة FCM تُهيأ عند أول استخدام (FCMService.ensure_initialized)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    startup.run_worker_startup()
+
+    # المهام الخلفية الدورية (تعمل في خيوط منفصلة داخل هذه العملية)
+    if settings.LICENSE_EXPIRY_SWEEP_ENABLED:
+        from app.features.license.jobs import run_license_expiry_sweep
+
+        BackgroundJobs.register(
+            PeriodicJob(
+                "license_expiry_sweep",
+                settings.LICENSE_EXPIRY_SWEEP_INTERVAL_SECONDS,
+                run_license_expiry_sweep,
             )
-            if needs_public_profile_cols:
-                from migrate_license_public_profile import migrate
-
-                print("Running DB migration: licenses public profile columns ...")
-                migrate(db_path)
-
-            # ========== Migration: license types tables + columns ==========
-            try:
-                from migrate_license_types import migrate as migrate_license_types
-
-                # نتحقق بطريقة بسيطة: هل جدول license_types موجود؟
-                row = cur.execute(
-                    "SELECT name FROM sqlite_master WHERE type='table' AND name='license_types'"
-                ).fetchone()
-                if not row:
-                    print("Running DB migration: license_types tables ...")
-                    migrate_license_types(db_path)
-            except Exception as e:
-                print(f"Migration warning (license_types): {e}")
-
-            # ========== Migration: users suspension fields ==========
-            try:
-                cur.execute("PRAGMA table_info(users)")
-                user_cols = [r[1] for r in cur.fetchall()]
-                if "suspended_until" not in user_cols or "suspension_reason" not in user_cols:
-                    from migrate_user_suspension import migrate as migrate_user_suspension
-
-                    print("Running DB migration: users suspension columns ...")
-                    migrate_user_suspension(db_path)
-            except Exception as e:
-                print(f"Migration warning (users suspension): {e}")
-
-            # ========== Migration: licenses audit fields ==========
-            try:
-                cur.execute("PRAGMA table_info(licenses)")
-                license_cols2 = [r[1] for r in cur.fetchall()]
-                if "issued_by_user_id" not in license_cols2:
-                    from migrate_license_audit import migrate as migrate_license_audit
-
-                    print("Running DB migration: licenses audit columns ...")
-                    migrate_license_audit(db_path)
-            except Exception as e:
-                print(f"Migration warning (licenses audit): {e}")
-
-            # ========== Migration: licenses department approval/signature fields ==========
-            try:
-                cur.execute("PRAGMA table_info(licenses)")
-                license_cols3 = [r[1] for r in cur.fetchall()]
-                if "dept_approval_requested" not in license_cols3 or "dept_approval_approved" not in license_cols3:
-                    from migrate_license_dept_approval import migrate as migrate_license_dept_approval
-
-                    print("Running DB migration: licenses dept approval fields ...")
-                    migrate_license_dept_approval(db_path)
-            except Exception as e:
-                print(f"Migration warning (licenses dept approval): {e}")
-
-            # ========== Migration: licenses signature_image_path ==========
-            try:
-                cur.execute("PRAGMA table_info(licenses)")
-                license_cols4 = [r[1] for r in cur.fetchall()]
-                if "signature_image_path" not in license_cols4:
-                    from migrate_license_signature import migrate as migrate_license_signature
-
-                    print("Running DB migration: licenses signature_image_path ...")
-                    migrate_license_signature(db_path)
-            except Exception as e:
-                print(f"Migration warning (licenses signature_image_path): {e}")
-
-            # ========== Migration: license_replacements barcode snapshot fields ==========
-            try:
-                row = cur.execute(
-                    "SELECT name FROM sqlite_master WHERE type='table' AND name='license_replacements'"
-                ).fetchone()
-                if row:
-                    cur.execute("PRAGMA table_info(license_replacements)")
-                    rep_cols = [r[1] for r in cur.fetchall()]
-                    if "old_barcode" not in rep_cols or "new_barcode" not in rep_cols:
-                        from migrate_license_replacements_barcode_snapshot import (
-                            migrate as migrate_license_replacements_barcode_snapshot,
-                        )
-
-                        print("Running DB migration: license_replacements barcode snapshot fields ...")
-                        migrate_license_replacements_barcode_snapshot(db_path)
-            except Exception as e:
-                print(f"Migration warning (license_replacements snapshot): {e}")
-
-            # ========== Migration: exams audit fields ==========
-            try:
-                cur.execute("PRAGMA table_info(exams)")
-                exam_cols = [r[1] for r in cur.fetchall()]
-                if "created_by_user_id" not in exam_cols or "scheduled_by_user_id" not in exam_cols:
-                    from migrate_exam_audit import migrate as migrate_exam_audit
-
-                    print("Running DB migration: exams audit columns ...")
-                    migrate_exam_audit(db_path)
-            except Exception as e:
-                print(f"Migration warning (exams audit): {e}")
-
-            # ========== Migration: exam_types price field ==========
-            try:
-                row = cur.execute(
-                    "SELECT name FROM sqlite_master WHERE type='table' AND name='exam_types'"
-                ).fetchone()
-                if row:
-                    cur.execute("PRAGMA table_info(exam_types)")
-                    exam_type_cols = [r[1] for r in cur.fetchall()]
-                    if "price" not in exam_type_cols:
-                        from migrate_exam_type_price import migrate_exam_type_price
-
-                        print("Running DB migration: exam_types price column ...")
-                        migrate_exam_type_price(db_path)
-            except Exception as e:
-                print(f"Migration warning (exam_types price): {e}")
-
-            # ========== Migration: exams payment fields ==========
-            try:
-                cur.execute("PRAGMA table_info(exams)")
-                exam_cols = [r[1] for r in cur.fetchall()]
-                if "paid_at" not in exam_cols or "paid_by_user_id" not in exam_cols or "paid_amount" not in exam_cols:
-                    from migrate_exam_payment import migrate as migrate_exam_payment
-
-                    print("Running DB migration: exams payment columns ...")
-                    migrate_exam_payment(db_path)
-            except Exception as e:
-                print(f"Migration warning (exams payment): {e}")
-
-            # ========== Migration: license_renewals vision exam and fee fields ==========
-            try:
-                row = cur.execute(
-                    "SELECT name FROM sqlite_master WHERE type='table' AND name='license_renewals'"
-                ).fetchone()
-                if row:
-                    cur.execute("PRAGMA table_info(license_renewals)")
-                    renewal_cols = [r[1] for r in cur.fetchall()]
-                    if ("vision_exam_date" not in renewal_cols or 
-                        "vision_exam_result" not in renewal_cols or 
-                        "renewal_fee" not in renewal_cols):
-                        from migrate_renewal_vision_exam import migrate as migrate_renewal_vision_exam
-
-                        print("Running DB migration: license_renewals vision exam and fee columns ...")
-                        migrate_renewal_vision_exam(db_path)
-            except Exception as e:
-                print(f"Migration warning (license_renewals vision exam): {e}")
-
-            # ========== Migration: violations paid_by_user_id ==========
-            try:
-                cur.execute("PRAGMA table_info(violations)")
-                vio_cols = [r[1] for r in cur.fetchall()]
-                if "paid_by_user_id" not in vio_cols:
-                    from migrate_violation_paid_by import migrate as migrate_violation_paid_by
-
-                    print("Running DB migration: violations paid_by_user_id ...")
-                    migrate_violation_paid_by(db_path)
-            except Exception as e:
-                print(f"Migration warning (violations paid_by): {e}")
-
-            # هل العمود موجود؟
-            cur.execute("PRAGMA table_info(violations)")
-            cols = [r[1] for r in cur.fetchall()]
-            needs_col = "violation_type_id" not in cols
-
-            # هل هناك FK حقيقي في تعريف الجدول؟
-            row = cur.execute(
-                "SELECT sql FROM sqlite_master WHERE type='table' AND name='violations'"
-            ).fetchone()
-            create_sql = (row[0] or "") if row else ""
-            needs_fk = "violation_type_id" in create_sql and "REFERENCES violation_types" not in create_sql
-
-            if needs_col or needs_fk:
-                from migrate_violation_type_fk import migrate
-
-                print("Running DB migration: violations.violation_type_id FK ...")
-                migrate(db_path)
-
-            # ========== Migration: users username field ==========
-            try:
-                cur.execute("PRAGMA table_info(users)")
-                user_cols = [r[1] for r in cur.fetchall()]
-                if "username" not in user_cols:
-                    from migrate_user_username import migrate as migrate_user_username
-
-                    print("Running DB migration: users username column ...")
-                    migrate_user_username(db_path)
-            except Exception as e:
-                print(f"Migration warning (users username): {e}")
-
-            # ========== Migration: make national_id nullable ==========
-            try:
-                cur.execute("PRAGMA table_info(users)")
-                user_cols_info = cur.fetchall()
-                national_id_col = next((c for c in user_cols_info if c[1] == 'national_id'), None)
-                if national_id_col and national_id_col[3] == 1:  # NOT NULL
-                    from migrate_user_national_id_nullable import migrate as migrate_national_id_nullable
-
-                    print("Running DB migration: make national_id nullable ...")
-                    migrate_national_id_nullable(db_path)
-            except Exception as e:
-                print(f"Migration warning (users national_id nullable): {e}")
-
-            # ========== Migration: users fcm_token field ==========
-            try:
-                cur.execute("PRAGMA table_info(users)")
-                user_cols = [r[1] for r in cur.fetchall()]
-                if "fcm_token" not in user_cols:
-                    cur.execute("ALTER TABLE users ADD COLUMN fcm_token TEXT")
-                    conn.commit()
-                    print("Running DB migration: users fcm_token column ...")
-            except Exception as e:
-                print(f"Migration warning (users fcm_token): {e}")
-
-            # ========== Migration: violations audit fields (cancel/modify) ==========
-            try:
-                cur.execute("PRAGMA table_info(violations)")
-                violation_cols = [r[1] for r in cur.fetchall()]
-                needs_audit_fields = any(
-                    c not in violation_cols
-                    for c in [
-                        "cancelled_at",
-                        "cancelled_by_user_id",
-                        "cancellation_reason",
-                        "modified_at",
-                        "modified_by_user_id",
-                        "modification_reason",
-                    ]
-                )
-                if needs_audit_fields:
-                    from migrate_violation_audit_fields import migrate as migrate_violation_audit
-
-                    print("Running DB migration: violations audit fields (cancel/modify) ...")
-                    migrate_violation_audit(db_path)
-            except Exception as e:
-                print(f"Migration warning (violations audit fields): {e}")
-        finally:
-            conn.close()
-    except Exception as e:
-        # لا نوقف تشغيل السيرفر بسبب الترحيل، لكن نطبع الخطأ للمراجعة
-        print(f"Migration warning: {e}")
-
-
-run_sqlite_migrations_if_needed()
-
-# إنشاء جداول قاعدة البيانات (إذا لم تكن موجودة) - بعد migrations
-Base.metadata.create_all(bind=engine)
-
-# إنشاء حساب admin تلقائياً إذا لم يكن موجوداً
-def create_default_admin():
-    db = SessionLocal()
-    try:
-        # البحث أولاً باسم المستخدم
-        admin = db.query(User).filter(User.username == 'admin').first()
-        # إذا لم يوجد، البحث بالرقم الوطني (للتوافق مع الإصدارات القديمة)
-        if not admin:
-            admin = db.query(User).filter(User.national_id == 'admin').first()
-        
-        if not admin:
-            hashed_password = get_password_hash('admin123')
-            admin = User(
-                username='admin',
-                national_id=None,  # الإداريون لا يحتاجون رقم وطني
-                phone='1234567890',
-                password_hash=hashed_password,
-                role=UserRole.SUPER_ADMIN,
-                is_active=True
+        )
+    if settings.SYNC_CHANGES_COMPACTION_ENABLED:
+        from app.features.license.jobs import run_sync_changes_compaction
+
+        BackgroundJobs.register(
+            PeriodicJob(
+                "sync_changes_compaction",
+                settings.SYNC_CHANGES_COMPACTION_INTERVAL_SECONDS,
+                run_sync_changes_compaction,
             )
-            db.add(admin)
-            db.commit()
-            print("Created default admin account")
-            print("  national_id: admin")
-            print("  password: admin123")
-        else:
-            # إذا كان الحساب موجوداً لكن ليس super_admin (مثلاً تم إنشاءه كمواطن عبر التسجيل)،
-            # نرفعه تلقائياً لتفادي مشكلة "لا يدخل لوحة الأدمن" عند تسجيل الدخول.
-            changed = False
-            if admin.role != UserRole.SUPER_ADMIN:
-                admin.role = UserRole.SUPER_ADMIN
-                changed = True
-            if not admin.is_active:
-                admin.is_active = True
-                changed = True
-
-            if changed:
-                db.add(admin)
-                db.commit()
-                print("Updated existing 'admin' account to SUPER_ADMIN and ensured it is active")
-                print("  national_id: admin")
-            else:
-                print("Default admin account already exists")
-    except Exception as e:
-        print(f"Error creating default admin account: {e}")
-        db.rollback()
+        )
+    if settings.NOTIFICATION_DISPATCHER_ENABLED:
+        from app.features.notification.jobs import run_notification_dispatch
+
+        BackgroundJobs.register(
+            PeriodicJob(
+                "notification_dispatch",
+                settings.NOTIFICATION_DISPATCH_INTERVAL_SECONDS,
+                run_notification_dispatch,
+            )
+        )
+    if settings.UPLOAD_GC_ENABLED:
+        from app.features.stored_file.jobs import run_upload_gc
+
+        BackgroundJobs.register(
+            PeriodicJob(
+                "upload_gc",
+                settings.UPLOAD_GC_INTERVAL_SECONDS,
+                run_upload_gc,
+            )
+        )
+    if settings.READ_REPLICA_URL:
+        from app.core.replica import run_replica_heartbeat
+
+        BackgroundJobs.register(
+            PeriodicJob(
+                "replica_heartbeat",
+                settings.READ_REPLICA_HEARTBEAT_INTERVAL_SECONDS,
+                run_replica_heartbeat,
+            )
+        )
+    with startup.startup_phase("background_jobs"):
+        BackgroundJobs.start_all()
+    startup.mark_ready()
+    try:
+        yield
     finally:
-        db.close()
-
-create_default_admin()
-
-# تهيئة خدمة FCM
-print("=" * 60)
-print("Initializing FCM Service...")
-print("=" * 60)
-try:
-    from app.services.fcm_service import FCMService
-    FCMService.initialize()
-    if FCMService.is_initialized():
-        print("=" * 60)
-        print("✅ FCM Service is ready!")
-        print("=" * 60)
-    else:
-        print("=" * 60)
-        print("❌ FCM Service initialization failed. Check logs above for details.")
-        print("=" * 60)
-except Exception as e:
-    print(f"⚠️ CRITICAL: Failed to import or initialize FCM service: {e}")
-    import traceback
-    print(traceback.format_exc())
-    print("=" * 60)
+        BackgroundJobs.stop_all()
+        await dispose_async_engine()
+        from app.services.fcm_service import FCMService
+        FCMService.shutdown()
+        from app.services.image_processing import ImageProcessor
+        ImageProcessor.shutdown()
 
 app = FastAPI(
     title="نظام إدارة رخص السيارات والمخالفات",
     description="نظام شامل لإدارة رخص السيارات والمخالفات المرورية",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # إعدادات CORS
@@ -380,6 +114,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=PAGINATION_HEADERS,
 )
 
 # تضمين API routes
@@ -388,17 +123,35 @@ app.include_router(api_router, prefix="/api/v1")
 # خدمة الملفات الثابتة (Frontend)
 # app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# خدمة رفع الملفات
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# خدمة رفع الملفات (cache طويل، Range، وتفويض اختياري إلى nginx: app/services/upload_serving.py)
+app.mount("/uploads", UploadFiles(directory="uploads"), name="uploads")
 
 # @app.get("/")
 # async def read_root():
 #     return FileResponse("static/index.html")
 
+# صفحة فحص الرخصة تُقرأ من القرص مرة واحدة وتُخدم من الذاكرة مع ETag
+_verify_page: Optional[tuple] = None
+
+def _get_verify_page() -> tuple:
+    global _verify_page
+    if _verify_page is None:
+        with open("static/verify.html", "rb") as f:
+            content = f.read()
+        _verify_page = (content, make_etag(content))
+    return _verify_page
+
 @app.get("/verify/{barcode}")
-async def verify_license_page(barcode: str):
+async def verify_license_page(barcode: str, request: Request):
     """صفحة فحص الرخصة بالباركود"""
-    return FileResponse("static/verify.html")
+    content, etag = _get_verify_page()
+    return cached_response(
+        request,
+        content,
+        "text/html; charset=utf-8",
+        f"public, max-age={settings.VERIFY_PAGE_MAX_AGE_SECONDS}",
+        etag,
+    )
 
 @app.get("/test")
 async def test_connection():
@@ -518,7 +271,7 @@ async def test_fcm_send(fcm_token: str, title: str = "اختبار إشعار",
                 "message": "رمز FCM مطلوب"
             }
         
-        result = FCMService.send_notification(
+        result = await FCMService.send_notification_async(
             fcm_token=fcm_token,
             title=title,
             body=body,
@@ -538,6 +291,8 @@ async def test_fcm_send(fcm_token: str, title: str = "اختبار إشعار",
             "traceback": traceback.format_exc()
         }
 
+startup.mark_import_finished()
+
 if __name__ == "__main__":
     import uvicorn
     # للتطوير: استخدام reload=True
@@ -0,0 +1,20 @@
+"""
+إعداد الاختبارات: قاعدة SQLite مؤقتة وإيقاف المهام الخلفية قبل استيراد التطبيق.
+التشغيل من جذر المشروع:  python -m pytest -q
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# StaticFiles (/uploads) والمسارات النسبية في التطبيق تُحل من جذر المشروع
+os.chdir(ROOT)
+
+_db_dir = tempfile.mkdtemp(prefix="lmvs-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/test.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ["LICENSE_EXPIRY_SWEEP_ENABLED"] = "false"
+os.environ["NOTIFICATION_DISPATCHER_ENABLED"] = "false"
+os.environ["UPLOAD_GC_ENABLED"] = "false"
+os.environ["SYNC_CHANGES_COMPACTION_ENABLED"] = "false"
@@ -0,0 +1,150 @@
+"""
+قوائم LicenseResponse: عدد الاستعلامات ثابت مهما كان عدد الرخص في الصفحة
+(العلاقات تُحمّل بـ LicenseService.response_load_options وليس lazy لكل صف).
+"""
+import contextlib
+import io
+from datetime import date, datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.core.database import SessionLocal, engine, get_async_engine
+from app.core.security import create_access_token, get_password_hash
+from app.features.license.model import License
+from app.features.license_type.model import LicenseType as LicenseTypeModel, LicenseTypeCategory
+from app.features.user.model import User
+from app.models.enums import BloodType, Gender, LicenseStatus, LicenseType, UserRole
+
+SMALL, LARGE = 1, 50
+# المصادقة + الصفحة + العلاقات المحملة بـ selectinload
+MAX_QUERIES = 6
+
+ENDPOINTS = [
+    ("/api/v1/licenses/officer/all", UserRole.LICENSE_OFFICER),
+    ("/api/v1/licenses/pending/list", UserRole.LICENSE_OFFICER),
+    ("/api/v1/licenses/officer/printable", UserRole.LICENSE_OFFICER),
+    ("/api/v1/licenses/officer/dept-approval/queue", UserRole.LICENSE_OFFICER),
+    ("/api/v1/admin/licenses", UserRole.SUPER_ADMIN),
+]
+
+
+def _auth(user: User) -> dict:
+    token = create_access_token({"sub": str(user.id), "role": user.role.value})
+    return {"Authorization": f"Bearer {token}"}
+
+
+class _Seeder:
+    """لكل مواطن: رخصة قيد المراجعة، رخصة صادرة معتمدة (للطباعة)، ورخصة صادرة بانتظار الترحيل"""
+
+    def __init__(self, db):
+        self.db = db
+        self.count = 0
+        self.password_hash = get_password_hash("secret1")
+        self.officer = self._user(username="officer", role=UserRole.LICENSE_OFFICER)
+        self.admin = self._user(username="admin-test", role=UserRole.SUPER_ADMIN)
+        license_type = LicenseTypeModel(name="خاصة", has_categories=True)
+        db.add(license_type)
+        db.flush()
+        db.add(LicenseTypeCategory(license_type_id=license_type.id, code="A", allowed_vehicles="سيارات"))
+        self.license_type_id = license_type.id
+        db.commit()
+
+    def _user(self, **kwargs) -> User:
+        kwargs.setdefault("role", UserRole.CITIZEN)
+        user = User(phone="0910000000", password_hash=self.password_hash, is_active=True, **kwargs)
+        self.db.add(user)
+        self.db.flush()
+        return user
+
+    def seed_to(self, count: int):
+        for i in range(self.count, count):
+            citizen = self._user(national_id=f"1000{i:08d}")
+            for status, requested, approved in (
+                (LicenseStatus.PENDING, 0, 0),
+                (LicenseStatus.ISSUED, 1, 1),
+                (LicenseStatus.ISSUED, 0, 0),
+            ):
+                issued = status == LicenseStatus.ISSUED
+                self.db.add(License(
+                    user_id=citizen.id,
+                    license_number=f"L-{i}-{requested}-{status.value}",
+                    barcode=f"BC-{i}-{requested}-{status.value}",
+                    license_type=list(LicenseType)[0],
+                    license_type_id=self.license_type_id,
+                    license_category="A",
+                    full_name="مواطن",
+                    birth_date=date(1990, 1, 1),
+                    age=35,
+                    gender=list(Gender)[0],
+                    passport_number="P0",
+                    nationality="ليبي",
+                    blood_type=list(BloodType)[0],
+                    status=status,
+                    issued_by_user_id=self.officer.id if issued else None,
+                    issued_date=datetime.now() if issued else None,
+                    expiry_date=date.today() + timedelta(days=3650) if issued else None,
+                    dept_approval_requested=requested,
+                    dept_approval_approved=approved,
+                    dept_approval_requested_by_user_id=self.officer.id if requested else None,
+                    dept_approval_approved_by_user_id=self.admin.id if approved else None,
+                ))
+        self.db.commit()
+        self.count = count
+
+
+def _measure(client: TestClient, path: str, headers: dict) -> tuple:
+    """(عدد الاستعلامات، عدد العناصر) لطلب الصفحة الأولى"""
+    executed = []
+
+    def count(*args):
+        executed.append(args[2])
+
+    engines = [engine, get_async_engine().sync_engine]
+    for target in engines:
+        event.listen(target, "before_cursor_execute", count)
+    try:
+        response = client.get(path, params={"limit": 200}, headers=headers)
+    finally:
+        for target in engines:
+            event.remove(target, "before_cursor_execute", count)
+    assert response.status_code == 200, response.text
+    return len(executed), len(response.json())
+
+
+@pytest.fixture(scope="module")
+def query_counts():
+    import main
+    from app.core.startup import run_prestart
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_prestart()
+    db = SessionLocal()
+    try:
+        seeder = _Seeder(db)
+        headers = {
+            UserRole.LICENSE_OFFICER: _auth(seeder.officer),
+            UserRole.SUPER_ADMIN: _auth(seeder.admin),
+        }
+        results = {}
+        with TestClient(main.app) as client:
+            for size in (SMALL, LARGE):
+                seeder.seed_to(size)
+                for path, role in ENDPOINTS:
+                    # طلب أول للتسخين (cache المستخدم الحالي، تهيئة lazy)
+                    client.get(path, headers=headers[role])
+                    results[(path, size)] = _measure(client, path, headers[role])
+        yield results
+    finally:
+        db.close()
+
+
+@pytest.mark.parametrize("path", [path for path, _ in ENDPOINTS])
+def test_license_list_query_count_is_bounded(query_counts, path):
+    small_queries, small_items = query_counts[(path, SMALL)]
+    large_queries, large_items = query_counts[(path, LARGE)]
+    assert small_items >= SMALL
+    assert large_items >= LARGE
+    assert large_queries == small_queries
+    assert large_queries <= MAX_QUERIES
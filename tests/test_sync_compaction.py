@@ -0,0 +1,79 @@
+"""
+ضغط license_changes: حذف كل الصفوف ما عدا آخر تغيير لكل رخصة لا يغير نتيجة feed المزامنة لأي مؤشر.
+"""
+import asyncio
+import contextlib
+import io
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, insert
+
+from app.core.database import SessionLocal, dispose_async_engine, get_async_db
+from app.features.license.model import LicenseChange
+from app.features.license.service import LicenseService
+
+# رخص غير موجودة: تظهر في feed كـ deleted، والمهم هنا المؤشرات وترتيب الرخص
+LICENSE_IDS = [900001, 900002, 900003, 900004]
+
+
+@pytest.fixture(scope="module")
+def db():
+    from app.core.startup import run_prestart
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_prestart()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def _feeds(cursors, limit):
+    async def collect():
+        try:
+            results = {}
+            async for async_db in get_async_db():
+                for cursor in cursors:
+                    results[cursor] = await LicenseService.get_sync_changes_async(async_db, cursor, limit)
+            return results
+        finally:
+            await dispose_async_engine()
+
+    return asyncio.run(collect())
+
+
+def test_compaction_keeps_sync_feed_for_every_cursor(db):
+    old = datetime.now() - timedelta(hours=1)
+    order = [0, 1, 0, 2, 1, 1, 3, 0, 2, 0]
+    db.execute(
+        insert(LicenseChange),
+        [{"license_id": LICENSE_IDS[i], "changed_at": old + timedelta(seconds=n)} for n, i in enumerate(order)],
+    )
+    # تغيير حديث (ضمن SYNC_FEED_SETTLE_SECONDS) لم يُرسل بعد: الصف القديم قبله يبقى
+    db.execute(insert(LicenseChange), [{"license_id": LICENSE_IDS[3], "changed_at": datetime.now()}])
+    db.commit()
+
+    last_id = db.query(func.max(LicenseChange.id)).scalar()
+    cursors = list(range(0, last_id + 1))
+    before = {limit: _feeds(cursors, limit) for limit in (1, 2, 100)}
+
+    removed = LicenseService.compact_sync_changes(db)
+
+    assert removed >= len(order) - len(LICENSE_IDS)
+    counts = dict(
+        db.query(LicenseChange.license_id, func.count())
+        .filter(LicenseChange.license_id.in_(LICENSE_IDS))
+        .group_by(LicenseChange.license_id)
+        .all()
+    )
+    assert counts == {**{license_id: 1 for license_id in LICENSE_IDS}, LICENSE_IDS[3]: 2}
+    assert db.query(func.max(LicenseChange.id)).scalar() == last_id
+    for limit, feeds in before.items():
+        assert _feeds(cursors, limit) == feeds
+
+
+def test_compaction_is_idempotent(db):
+    LicenseService.compact_sync_changes(db)
+    assert LicenseService.compact_sync_changes(db) == 0
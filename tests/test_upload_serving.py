@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.services.upload_serving import cache_control_for, signed_upload_url, verify_upload_signature
+
+IMMUTABLE = f"public, max-age={settings.UPLOAD_CACHE_MAX_AGE_SECONDS}, immutable"
+MUTABLE = f"public, max-age={settings.UPLOAD_MUTABLE_CACHE_MAX_AGE_SECONDS}"
+
+SHA256 = "2e8e90f92bd92c3986251cd36a03494a04bee04a5894a754d069bd70f584613e"
+UUID = "80fe403a-2215-4c1e-9a3b-5d1f0c2e7a11"
+UUID_HEX = "80fe403a22154c1e9a3b5d1f0c2e7a11"
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        # المحتوى (SHA-256) ومشتقاته
+        f"{SHA256}.jpg",
+        f"{SHA256}.pdf",
+        f"{SHA256}_print.jpg",
+        f"{SHA256}_thumb.jpg",
+        # الرفع القديم: uuid4 بالشرطات، والامتداد من اسم الملف الأصلي أو بدونه
+        f"{UUID}.jpg",
+        f"{UUID}.JPG",
+        f"{UUID}.pdf",
+        UUID,
+        f"{UUID}_thumb.jpg",
+        f"{UUID}_print.jpg",
+        # uuid4.hex
+        f"{UUID_HEX}.png",
+        f"signature_12_{UUID_HEX}.png",
+        # صور التوقيع القديمة: signature_<id>_<uuid4().hex[:8]>
+        "signature_10_4ece1122.png",
+        "signature_10_4ece1122.jpeg",
+    ],
+)
+def test_content_and_uuid_names_are_immutable(name):
+    assert cache_control_for(name) == IMMUTABLE
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "logo.png",
+        "photo.jpg",
+        f"{SHA256[:40]}.jpg",
+        f"{UUID}_large.jpg",
+        "signature_10_latest.png",
+        f"{UUID}.jpg.part",
+    ],
+)
+def test_other_names_get_short_max_age(name):
+    assert cache_control_for(name) == MUTABLE
+
+
+def _query(path: str, expires: int) -> bytes:
+    return signed_upload_url(f"uploads/{path}", expires).split("?", 1)[1].encode()
+
+
+def test_valid_signature_is_accepted():
+    expires = int(time.time()) + 60
+    assert verify_upload_signature("photos/a.jpg", _query("photos/a.jpg", expires)) == expires
+
+
+@pytest.mark.parametrize(
+    "query_string",
+    [
+        b"expires=%C2%B2&sig=abc",  # '²': isdigit() صحيح لكن int() يفشل
+        b"expires=99999999999&sig=%C3%A9",  # توقيع غير ASCII
+        b"expires=9999999999999&sig=abc",  # أطول من 12 رقماً
+        b"expires=-1&sig=abc",
+        b"expires=&sig=",
+        b"",
+    ],
+)
+def test_malformed_signature_is_rejected(query_string):
+    assert verify_upload_signature("photos/a.jpg", query_string) is None
+
+
+def test_signature_is_bound_to_path_and_expiry():
+    expires = int(time.time()) + 60
+    query = _query("photos/a.jpg", expires)
+    assert verify_upload_signature("photos/b.jpg", query) is None
+    assert verify_upload_signature("photos/a.jpg", query.replace(str(expires).encode(), str(expires + 1).encode())) is None
+    assert verify_upload_signature("photos/a.jpg", _query("photos/a.jpg", int(time.time()) - 1)) is None